@@ -1,10 +1,19 @@
+from typing import Dict, Optional
+
+
 class BaseConfig:
     def __init__(
             self,
             task_info:dict,
             output_path,
-            verbose: bool=True
+            verbose: bool=True,
+            llm_prices: Optional[Dict[str, dict]] = None,
+            usage_log: bool = False
     ):
         self.task_info = task_info
         self.output_path = output_path
-        self.verbose = verbose
\ No newline at end of file
+        self.verbose = verbose
+        # {model: {'prompt': usd, 'completion': usd}} per million tokens, for the usage ledger costs
+        self.llm_prices = llm_prices or {}
+        # Append every raw usage dict to usage_log.jsonl next to run_state.json
+        self.usage_log = usage_log
@@ -1,17 +1,26 @@
 import os
+import json
+import time
+from collections import deque
 from abc import abstractmethod, ABC
-from typing import List, Type
+from typing import Any, Callable, List, Tuple, Type
 from evotool.task.base_task import Solution
 
 from .base_config import BaseConfig
 from .base_run_state_dict import BaseRunStateDict
+from .sampling_engine import SamplingEngine, SampleResult
 
 
 class Method(ABC):
     def __init__(self, config:BaseConfig):
         self.config = config
         self.run_state_dict = self._load_run_state_dict()
+        self.run_state_dict.usage_ledger.configure(
+            prices=config.llm_prices,
+            log_path=os.path.join(config.output_path, "usage_log.jsonl") if config.usage_log else None
+        )
         self._save_run_state_dict()
+        self._budget_reason = None
 
     @abstractmethod
     def run(self, *args):
@@ -43,6 +52,397 @@ class Method(ABC):
             right_dashes = "-" * (total_width - len(text) - padding)
             print(left_dashes + text + right_dashes)
 
+    def _get_generation_params(self, operator_name: str | None = None) -> dict:
+        """Generation parameters for an operator: adapter defaults, then config, then per-operator config"""
+        params = dict(self.config.adapter.get_generation_params(operator_name))
+        params.update(getattr(self.config, 'generation_params', {}))
+        if operator_name is not None:
+            params.update(getattr(self.config, 'operator_generation_params', {}).get(operator_name, {}))
+        return params
+
+    def _get_llm_kwargs(self, operator_name: str | None = None, stream: bool = True) -> dict:
+        """Extra keyword arguments for ``running_llm.get_response`` (a fresh stream parser per call)"""
+        kwargs = self._get_generation_params(operator_name)
+        if stream and getattr(self.config, 'stream_responses', False):
+            stream_parser = self.config.adapter.make_stream_parser()
+            if stream_parser is not None:
+                kwargs['stream_parser'] = stream_parser
+        return kwargs
+
+    def _group_prompts(self, prompts: list) -> List[Tuple[Any, int]]:
+        """Group identical prompts into (prompt, n) pairs when ``batch_identical_prompts`` is enabled"""
+        if not getattr(self.config, 'batch_identical_prompts', False):
+            return [(prompt, 1) for prompt in prompts]
+        groups = {}
+        for prompt in prompts:
+            key = json.dumps(prompt, sort_keys=True, default=str)
+            if key in groups:
+                groups[key][1] += 1
+            else:
+                groups[key] = [prompt, 1]
+        return [(prompt, n) for prompt, n in groups.values()]
+
+    def _sample_solutions(self, prompt_content, n: int = 1,
+                          operator_name: str | None = None) -> Tuple[List[Solution], dict]:
+        """Sample n solutions for one prompt; n > 1 is a single n-completion request"""
+        if n == 1:
+            response, usage = self.config.running_llm.get_response(
+                prompt_content, **self._get_llm_kwargs(operator_name)
+            )
+            return [self.config.adapter.parse_response(response)], usage
+        responses, usage = self.config.running_llm.get_responses(
+            prompt_content, n, **self._get_llm_kwargs(operator_name, stream=False)
+        )
+        return [self.config.adapter.parse_response(response) for response in responses], usage
+
+    @staticmethod
+    def _get_best_score(solutions: List[Solution]) -> float | None:
+        """Best score among the valid solutions, or None if there is none"""
+        scores = [sol.evaluation_res.score for sol in solutions
+                  if sol.evaluation_res and sol.evaluation_res.valid and sol.evaluation_res.score is not None]
+        return max(scores) if scores else None
+
+    def _record_usage(self, usage: dict, operator_name: str | None = None, stage: str = "sample",
+                      llm=None) -> None:
+        """Add the usage of one LLM call to the run's usage ledger"""
+        llm = llm if llm is not None else getattr(self.config, 'running_llm', None)
+        model = getattr(llm, '_model', None)
+        self.run_state_dict.usage_ledger.record(usage, stage, operator_name, model=model)
+        # Requests that lost a hedge (LlmRouter) were paid for as well
+        pop_late_usage = getattr(llm, 'pop_late_usage', None)
+        if pop_late_usage is not None:
+            for late_usage in pop_late_usage():
+                self.run_state_dict.usage_ledger.record(late_usage, stage, operator_name, model=model)
+
+    def _report_llm_outcome(self, usage: dict, solution: Solution, baseline_score: float | None) -> None:
+        """Count a candidate's evaluation in the usage ledger and feed it back to LLM clients that learn
+        from it (e.g. LlmPortfolio)"""
+        evaluation_res = solution.evaluation_res
+        self.run_state_dict.usage_ledger.record_solution(bool(evaluation_res and evaluation_res.valid))
+        record_outcome = getattr(self.config.running_llm, 'record_outcome', None)
+        if record_outcome is None or not usage:
+            return
+        record_outcome(
+            usage,
+            valid=bool(evaluation_res and evaluation_res.valid),
+            score=evaluation_res.score if evaluation_res else None,
+            baseline_score=baseline_score
+        )
+
+    def _release_llm_outcome(self, usage: dict) -> None:
+        """Tell LLM clients waiting for outcomes (e.g. LlmPortfolio) that a candidate won't be evaluated"""
+        release_outcome = getattr(self.config.running_llm, 'release_outcome', None)
+        if release_outcome is not None and usage:
+            release_outcome(usage)
+
+    def _make_sampling_engine(self, sample_fn: Callable[[Any], Tuple[List[Solution], dict]],
+                              evaluate_empty: bool = False) -> SamplingEngine:
+        """A SamplingEngine with the configured samplers and evaluators, running the config's evaluator"""
+        # Speculative tasks issued for the next generation, their early results,
+        # and tasks whose results are dropped
+        self._speculative_tasks = []
+        self._speculative_results = []
+        self._discarded_task_ids = set()
+        # Tasks still running when their generation's deadline passed
+        self._late_task_ids = set()
+        # An autotuner gets threads up to its maxima and moves the limits from the configured values
+        autotuner = getattr(self.config, 'autotuner', None)
+        num_samplers, num_evaluators = self.config.num_samplers, self.config.num_evaluators
+        if autotuner is not None:
+            num_samplers = max(autotuner.max_samplers, num_samplers)
+            num_evaluators = max(autotuner.max_evaluators, num_evaluators)
+        engine = SamplingEngine(
+            sample_fn,
+            self._timed_evaluation(self.config.evaluator.evaluate_code),
+            num_samplers=num_samplers,
+            num_evaluators=num_evaluators,
+            evaluate_empty=evaluate_empty,
+            close_timeout=getattr(self.config, 'generation_timeout', None),
+            sampler_limit=self.config.num_samplers,
+            evaluator_limit=self.config.num_evaluators,
+            name=type(self).__name__
+        )
+        if autotuner is not None:
+            autotuner.attach(engine)
+        return engine
+
+    def _timed_evaluation(self, evaluate_fn: Callable[[str], Any]) -> Callable[[str], Any]:
+        """Wrap an evaluation function to add its durations to the usage ledger, for evaluator-time budgets"""
+        ledger = self.run_state_dict.usage_ledger
+
+        def evaluate(code: str):
+            start = time.monotonic()
+            try:
+                return evaluate_fn(code)
+            finally:
+                ledger.record_evaluation(time.monotonic() - start)
+        return evaluate
+
+    def _budget_exhausted(self, initialization: bool = False) -> bool:
+        """Whether a limit of the config's ``budget`` is reached (its ``init_fraction`` share during
+        initialization)"""
+        budget = getattr(self.config, 'budget', None)
+        if budget is None:
+            return False
+        fraction = budget.init_fraction if initialization else 1.0
+        reason = budget.exceeded(self.run_state_dict.usage_ledger, fraction)
+        if reason is None:
+            return False
+        if reason != self._budget_reason:
+            self._budget_reason = reason
+            stage = "Initialization budget" if initialization else "Budget"
+            self.verbose_info(f"{stage} exhausted ({reason}): submitting no new samples, "
+                              f"draining in-flight work")
+        return True
+
+    def _init_sample_limit(self) -> int:
+        """Samples population initialization may use: the budget's ``init_fraction`` of ``max_sample_nums``"""
+        budget = getattr(self.config, 'budget', None)
+        if budget is None:
+            return self.config.max_sample_nums
+        return budget.init_sample_limit(self.config.max_sample_nums)
+
+    def _collect_sample_result(self, result: SampleResult, operator_name: str | None = None,
+                               baseline_score: float | None = None) -> Solution | None:
+        """Record the usage and outcome of a SamplingEngine result; returns its solution, or None if
+        sampling failed"""
+        if result.index == 0:
+            self._record_usage(result.usage, operator_name)
+        if result.discarded:
+            self.verbose_info(f"Discarded {operator_name or 'solution'} sample")
+            self._release_llm_outcome(result.usage)
+            return None
+        if result.solution is None:
+            self.verbose_info(f"Error generating {operator_name or 'solution'}: {str(result.error)}")
+            self._release_llm_outcome(result.usage)
+            return None
+        if result.error is not None:
+            self.verbose_info(f"Error evaluating {operator_name or 'solution'}: {str(result.error)}")
+        if result.cancelled:
+            self._release_llm_outcome(result.usage)
+        else:
+            self._report_llm_outcome(result.usage, result.solution, baseline_score)
+        return result.solution
+
+    def _run_generation(self, make_tasks: Callable[[], list], on_result: Callable[[SampleResult], None],
+                        initialization: bool = False) -> None:
+        """
+        Run one generation of tasks on the sampling engine, passing each result to ``on_result`` as it
+        completes.
+
+        With ``speculative_fraction`` set, once that fraction of the generation's tasks is done the next
+        generation's tasks are built against the population as it stands and issued on the freed samplers.
+        They count towards the next call: tasks whose parents were evicted in between are kept or, with
+        ``speculative_policy='discard'``, replaced and their results flagged ``discarded``. Hits are
+        counted in ``run_state_dict.speculation_stats``.
+
+        With ``generation_timeout`` set, the generation closes with whatever has finished when the deadline
+        passes. Tasks still queued are cancelled; running ones are abandoned to the engine's threads and their
+        results, arriving during a later call, are registered there (``late_results='carry'``) or flagged
+        ``discarded`` (``'drop'``, which also cancels queued evaluations). Counts go to
+        ``run_state_dict.straggler_stats``.
+
+        If the config's ``budget`` runs out during the generation, its queued tasks are cancelled and
+        the running ones drain.
+
+        :param make_tasks: Builds a full generation of tasks against the current population.
+        :param on_result: Registers a result.
+        :param initialization: A population initialization batch: never speculative, and checked against
+            the initialization share of the budget.
+        """
+        engine = self._sampling_engine
+        fraction = getattr(self.config, 'speculative_fraction', None)
+        policy = getattr(self.config, 'speculative_policy', 'accept')
+        timeout = getattr(self.config, 'generation_timeout', None)
+        drop_late = getattr(self.config, 'late_results', 'carry') == 'drop'
+
+        # Settle the tasks issued speculatively during the previous generation
+        accepted = []
+        if self._speculative_tasks:
+            stats = self.run_state_dict.speculation_stats
+            hits = 0
+            for task_id, task in self._speculative_tasks:
+                hit = all(self._is_parent_alive(parent) for parent in self._get_task_parents(task))
+                hits += hit
+                if hit or policy == 'accept':
+                    accepted.append(task_id)
+                else:
+                    self._discarded_task_ids.add(task_id)
+            stats['issued'] += len(self._speculative_tasks)
+            stats['hits'] += hits
+            stats['discarded'] += len(self._speculative_tasks) - len(accepted)
+            self.verbose_info(
+                f"Speculation: {hits}/{len(self._speculative_tasks)} hits this generation, "
+                f"{stats['hits']}/{stats['issued']} overall ({stats['hits'] / stats['issued']:.0%})"
+            )
+            self._speculative_tasks = []
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        pending = set(accepted)
+        for task in make_tasks()[len(accepted):]:
+            pending.add(engine.submit(task))
+        total = len(pending)
+        results = deque(self._speculative_results)
+        self._speculative_results = []
+
+        # Only speculate if the budget leaves room for another generation
+        max_generations = getattr(self.config, 'max_generations', None)
+        speculate = (
+            not initialization and fraction is not None and total > 0
+            and self.run_state_dict.tot_sample_nums + self.config.num_samplers < self.config.max_sample_nums
+            and (max_generations is None or self.run_state_dict.generation + 1 < max_generations)
+        )
+        speculative_ids = set()
+        next_tasks = None
+        done = 0
+        budget_exhausted = False
+        while pending or results:
+            if results:
+                result = results.popleft()
+            else:
+                wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+                result = engine.next_result(wait)
+                if result is None:
+                    self._abandon_generation(pending, done, total, drop_late)
+                    break
+            if result.task_id in self._late_task_ids:
+                # Straggler of an earlier generation
+                if result.task_done:
+                    self._late_task_ids.discard(result.task_id)
+                self.run_state_dict.straggler_stats['dropped' if drop_late else 'carried'] += 1
+                result.discarded = drop_late
+                on_result(result)
+                continue
+            if result.task_id in self._discarded_task_ids:
+                if result.task_done:
+                    self._discarded_task_ids.discard(result.task_id)
+                result.discarded = True
+                on_result(result)
+                continue
+            if result.task_id in speculative_ids:
+                # Belongs to the next generation
+                self._speculative_results.append(result)
+                continue
+            if result.task_done:
+                pending.discard(result.task_id)
+                done += 1
+            on_result(result)
+
+            if not budget_exhausted and self._budget_exhausted(initialization):
+                # Stop sampling: drop the tasks no sampler has started and let the running ones finish
+                budget_exhausted = True
+                cancelled = {task_id for task_id, _ in engine.cancel_pending(evaluations=False)}
+                pending -= cancelled
+                # No generation follows: running speculative tasks drain into this one
+                pending |= {task_id for task_id, _ in self._speculative_tasks} - cancelled
+                results.extend(self._speculative_results)
+                self._speculative_tasks = []
+                self._speculative_results = []
+                speculative_ids = set()
+                speculate = False
+
+            if speculate and next_tasks is None and done >= fraction * total:
+                next_tasks = make_tasks()
+            # One speculative task per finished task keeps the samplers busy without oversubscribing them
+            while (speculate and next_tasks is not None
+                   and len(self._speculative_tasks) < min(done, len(next_tasks))):
+                task = next_tasks[len(self._speculative_tasks)]
+                task_id = engine.submit(task)
+                speculative_ids.add(task_id)
+                self._speculative_tasks.append((task_id, task))
+
+    def _abandon_generation(self, pending: set, done: int, total: int, drop_late: bool) -> None:
+        """Close a generation at its deadline: cancel queued tasks and mark the running ones late"""
+        stats = self.run_state_dict.straggler_stats
+        cancelled = {task_id for task_id, _ in self._sampling_engine.cancel_pending(evaluations=drop_late)}
+        # Speculative tasks that never started are rebuilt by the next generation
+        self._speculative_tasks = [(task_id, task) for task_id, task in self._speculative_tasks
+                                   if task_id not in cancelled]
+        abandoned = pending - cancelled
+        self._late_task_ids |= abandoned
+        stats['deadlines'] += 1
+        stats['cancelled'] += len(cancelled)
+        stats['abandoned'] += len(abandoned)
+        self.verbose_info(
+            f"Generation deadline of {self.config.generation_timeout}s passed: "
+            f"{done}/{total} tasks finished, {len(cancelled)} cancelled, {len(abandoned)} abandoned "
+            f"(late results will be {'dropped' if drop_late else 'carried over'})"
+        )
+
+    def _get_task_parents(self, task) -> List[Solution]:
+        """Solutions a task's prompt was built from, checked when a speculative task is settled"""
+        return []
+
+    def _is_parent_alive(self, parent: Solution) -> bool:
+        """Whether a parent is still in the population"""
+        return any(member is parent for member in self.run_state_dict.population)
+
+    def _run_steady_state(self, make_task: Callable[[int], Any],
+                          on_result: Callable[[SampleResult, float | None], None],
+                          best_score: Callable[[], float | None] | None = None,
+                          on_generation: Callable[[], None] | None = None) -> None:
+        """
+        Steady-state loop on the sampling engine: keep as many single-sample tasks in flight as the engine's
+        sampler limit (``num_samplers`` unless an autotuner moves it) and hand each result to ``on_result`` as
+        soon as it is evaluated, until ``max_sample_nums`` or the budget is reached.
+
+        :param make_task: Builds the i-th task against the current population.
+        :param on_result: Registers a result; also gets the best score from when its task was issued.
+        :param best_score: The current best score; defaults to the best score of the population.
+        :param on_generation: Called for every ``num_samplers`` registered samples; defaults to counting
+            a generation.
+        """
+        if best_score is None:
+            def best_score():
+                return self._get_best_score(self.run_state_dict.population)
+        if on_generation is None:
+            def on_generation():
+                self.run_state_dict.generation += 1
+        engine = self._sampling_engine
+        baselines = {}  # task_id -> best population score when issued, for tasks not yet registered
+        issued = 0
+        registered = 0
+        try:
+            while True:
+                # Refill the free sampler slots without overshooting the sample budget
+                while (len(baselines) < engine.sampler_limit
+                       and self.run_state_dict.tot_sample_nums + len(baselines) < self.config.max_sample_nums
+                       and not self._budget_exhausted()):
+                    task_id = engine.submit(make_task(issued))
+                    baselines[task_id] = best_score()
+                    issued += 1
+                if not baselines:
+                    break
+
+                result = engine.next_result()
+                if result.task_id in self._late_task_ids:
+                    # Straggler of an initialization generation closed at its deadline
+                    if result.task_done:
+                        self._late_task_ids.discard(result.task_id)
+                    drop_late = getattr(self.config, 'late_results', 'carry') == 'drop'
+                    self.run_state_dict.straggler_stats['dropped' if drop_late else 'carried'] += 1
+                    result.discarded = drop_late
+                # Carried-over stragglers were issued by an earlier generation and have no baseline here
+                if result.task_done:
+                    baseline_score = baselines.pop(result.task_id, None)
+                else:
+                    baseline_score = baselines.get(result.task_id)
+                samples_before = self.run_state_dict.tot_sample_nums
+                try:
+                    on_result(result, baseline_score)
+                except Exception as e:
+                    self.verbose_info(f"Evolution error: {str(e)}")
+
+                # A generation ends with every num_samplers registered offspring
+                registered += self.run_state_dict.tot_sample_nums - samples_before
+                if registered >= self.config.num_samplers:
+                    registered -= self.config.num_samplers
+                    on_generation()
+                self._save_run_state_dict()
+        except KeyboardInterrupt:
+            self.verbose_info("Evolution interrupted by user")
+            engine.close(wait=False)
+
     def _save_run_state_dict(self):
         """Save run state to file"""
         self.run_state_dict.to_json_file(os.path.join(self.config.output_path, "run_state.json"))
@@ -82,4 +482,4 @@ class Method(ABC):
     @abstractmethod
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
         """Return the algorithm-specific RunStateDict class"""
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from .usage_ledger import UsageLedger
+
+
+class Budget:
+    """Stopping criteria in wall time, tokens, dollars and evaluator time, on top of ``max_sample_nums``.
+
+    Usage is read from the run's UsageLedger, so a resumed run continues counting against the same
+    budget. Once a limit is reached the methods submit no new samples and let the ones in flight drain.
+    """
+
+    def __init__(self, max_wall_seconds: Optional[float] = None, max_total_tokens: Optional[int] = None,
+                 max_cost: Optional[float] = None, max_evaluator_seconds: Optional[float] = None,
+                 init_fraction: float = 1.0):
+        """
+        :param max_wall_seconds: Wall-clock seconds the run may be active, summed over resumed sessions.
+        :param max_total_tokens: LLM tokens (prompt and completion) over all calls.
+        :param max_cost: Estimated cost in USD, priced with the config's ``llm_prices``.
+        :param max_evaluator_seconds: Seconds spent in the evaluator, summed over concurrent evaluations.
+        :param init_fraction: Share of every limit, and of ``max_sample_nums``, that population
+            initialization may use; the rest is left for evolution.
+        """
+        self.max_wall_seconds = max_wall_seconds
+        self.max_total_tokens = max_total_tokens
+        self.max_cost = max_cost
+        self.max_evaluator_seconds = max_evaluator_seconds
+        self.init_fraction = init_fraction
+
+    def exceeded(self, ledger: UsageLedger, fraction: float = 1.0) -> Optional[str]:
+        """
+        The first limit ``ledger`` has reached, or None.
+
+        :param fraction: Scale the limits, e.g. by ``init_fraction`` during initialization.
+        :return: A description of the reached limit.
+        """
+        totals = ledger.totals()
+        usage = (
+            ('wall time', ledger.elapsed, self.max_wall_seconds, 's'),
+            ('total tokens', totals['total_tokens'], self.max_total_tokens, ''),
+            ('estimated cost', totals['cost'], self.max_cost, ' USD'),
+            ('evaluator time', ledger.evaluator_seconds, self.max_evaluator_seconds, 's'),
+        )
+        for name, used, limit, unit in usage:
+            if limit is not None and used >= limit * fraction:
+                return f"{name} {used:.6g}{unit} reached the limit of {limit * fraction:.6g}{unit}"
+        return None
+
+    def init_sample_limit(self, max_sample_nums: int) -> int:
+        """The number of samples population initialization may use."""
+        return int(max_sample_nums * self.init_fraction)
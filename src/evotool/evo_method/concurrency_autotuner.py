@@ -0,0 +1,158 @@
+import math
+import time
+import threading
+from typing import Optional
+
+from .sampling_engine import SamplingEngine
+
+
+class _StageWindow:
+    """Completions of one engine stage since the last decision."""
+
+    def __init__(self):
+        self.count = 0
+        self.busy = 0.0
+        self.items = 0
+        self.failures = 0
+
+    def add(self, seconds: float, items: int, failed: bool) -> None:
+        self.count += 1
+        self.busy += seconds
+        self.items += items
+        self.failures += failed
+
+    @property
+    def service_time(self) -> Optional[float]:
+        return self.busy / self.count if self.count else None
+
+    @property
+    def error_rate(self) -> float:
+        return self.failures / self.count if self.count else 0.0
+
+
+class ConcurrencyAutotuner:
+    """Adjusts the in-flight limits of a SamplingEngine's sampler and evaluator stages while it runs.
+
+    Every ``interval`` seconds the completions of both stages are turned into rates. By Little's law the
+    evaluators need ``arrival_rate * eval_time`` slots to keep up with the samplers. The steady-state and
+    continuous loops keep one task per sampler slot in flight until its candidates are evaluated, so the
+    samplers need ``evaluator_capacity * (sample_time + eval_time) / candidates_per_sample`` slots to keep
+    the evaluators fed. A limit moves one step towards its target per decision (additive increase) and is cut by
+    ``backoff`` when the stage's error rate exceeds ``error_threshold`` (multiplicative decrease). The
+    bottleneck stage thus stays saturated without queueing more work on the provider or the evaluator
+    host than it can absorb. Each decision is logged.
+
+    Pass it as ``autotuner`` in a method's config: the engine then starts ``max_samplers`` /
+    ``max_evaluators`` threads, with the configured ``num_samplers`` / ``num_evaluators`` as the
+    initial limits.
+    """
+
+    def __init__(self, max_samplers: int = 16, max_evaluators: int = 16, min_samplers: int = 1,
+                 min_evaluators: int = 1, interval: float = 10.0, error_threshold: float = 0.1,
+                 backoff: float = 0.5, headroom: float = 1.2, verbose: bool = True):
+        """
+        :param max_samplers: Upper limit (and thread count) of the sampler stage.
+        :param max_evaluators: Upper limit (and thread count) of the evaluator stage.
+        :param min_samplers: Lower limit of the sampler stage.
+        :param min_evaluators: Lower limit of the evaluator stage.
+        :param interval: Seconds of completions each decision is based on.
+        :param error_threshold: Error rate of a stage above which its limit is cut.
+        :param backoff: Factor a limit is multiplied by when it is cut.
+        :param headroom: Factor applied to the Little's law targets to absorb rate fluctuations.
+        :param verbose: Log every decision.
+        """
+        self.max_samplers = max_samplers
+        self.max_evaluators = max_evaluators
+        self.min_samplers = min_samplers
+        self.min_evaluators = min_evaluators
+        self.interval = interval
+        self.error_threshold = error_threshold
+        self.backoff = backoff
+        self.headroom = headroom
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._engine = None
+        self._reset_window()
+
+    def attach(self, engine: SamplingEngine) -> None:
+        """Observe ``engine`` and adjust its limits from now on."""
+        with self._lock:
+            self._engine = engine
+            engine.observer = self.observe
+            self._reset_window()
+
+    def observe(self, stage: str, seconds: float, items: int, failed: bool) -> None:
+        """SamplingEngine observer: record a completion and decide once ``interval`` has passed."""
+        with self._lock:
+            window = self._sample if stage == 'sample' else self._evaluate
+            window.add(seconds, items, failed)
+            if self._engine is None or time.monotonic() - self._window_start < self.interval:
+                return
+            message = self._decide()
+        if self.verbose:
+            print(message)
+
+    def _reset_window(self) -> None:
+        self._sample = _StageWindow()
+        self._evaluate = _StageWindow()
+        self._window_start = time.monotonic()
+
+    def _decide(self) -> str:
+        """Set the engine's new limits and start the next window; returns the log line of the decision"""
+        engine = self._engine
+        # A zero ``interval`` can decide twice within one clock tick
+        elapsed = max(time.monotonic() - self._window_start, 1e-6)
+        sample, evaluate = self._sample, self._evaluate
+        samplers, evaluators = engine.sampler_limit, engine.evaluator_limit
+
+        # Evaluators: Little's law on the rate at which the samplers hand them candidates
+        arrival_rate = sample.items / elapsed
+        if evaluate.error_rate > self.error_threshold:
+            new_evaluators = math.floor(evaluators * self.backoff)
+            evaluator_reason = f"eval errors {evaluate.error_rate:.0%}"
+        elif evaluate.service_time is not None:
+            evaluator_target = math.ceil(self.headroom * arrival_rate * evaluate.service_time)
+            new_evaluators = self._step(evaluators, evaluator_target)
+            evaluator_reason = f"target {evaluator_target}"
+        else:
+            new_evaluators = evaluators
+            evaluator_reason = "no evaluations"
+        new_evaluators = max(self.min_evaluators, min(new_evaluators, self.max_evaluators))
+
+        # Samplers: enough concurrent samples to keep the evaluators busy at their limit
+        if sample.error_rate > self.error_threshold:
+            new_samplers = math.floor(samplers * self.backoff)
+            sampler_reason = f"sample errors {sample.error_rate:.0%}"
+        elif sample.service_time is not None and evaluate.service_time:
+            items_per_sample = max(sample.items / sample.count, 1.0)
+            evaluator_capacity = new_evaluators / evaluate.service_time
+            round_trip = sample.service_time + evaluate.service_time
+            sampler_target = math.ceil(self.headroom * evaluator_capacity * round_trip / items_per_sample)
+            new_samplers = self._step(samplers, sampler_target)
+            sampler_reason = f"target {sampler_target}"
+        elif sample.service_time is not None:
+            # Nothing evaluated in the window: the evaluators are not holding the samplers back
+            new_samplers = samplers + 1
+            sampler_reason = "evaluators idle"
+        else:
+            new_samplers = samplers
+            sampler_reason = "no samples"
+        new_samplers = max(self.min_samplers, min(new_samplers, self.max_samplers))
+
+        engine.set_limits(samplers=new_samplers, evaluators=new_evaluators)
+        self._reset_window()
+        sample_time = f"{sample.service_time:.2f}s" if sample.service_time is not None else "-"
+        evaluate_time = f"{evaluate.service_time:.2f}s" if evaluate.service_time is not None else "-"
+        return (f"ConcurrencyAutotuner: samplers {samplers} -> {engine.sampler_limit} ({sampler_reason}), "
+                f"evaluators {evaluators} -> {engine.evaluator_limit} ({evaluator_reason}) | "
+                f"{sample.count} samples in {elapsed:.1f}s, sample time {sample_time}, "
+                f"eval arrivals {arrival_rate:.2f}/s, eval time {evaluate_time}")
+
+    @staticmethod
+    def _step(limit: int, target: int) -> int:
+        """One additive step from ``limit`` towards ``target``"""
+        if target > limit:
+            return limit + 1
+        if target < limit:
+            return limit - 1
+        return limit
@@ -1,4 +1,3 @@
-import concurrent.futures
 from typing import List, Type
 
 from .run_config import EohConfig
@@ -17,9 +16,6 @@ class Eoh(Method):
         """Main EoH algorithm execution"""
         self.verbose_title("EOH ALGORITHM STARTED")
 
-        if "sample" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["sample"] = []
-
         # Initialize with seed solution if sol_history is empty
         if len(self.run_state_dict.sol_history) == 0:
             initial_sol = self.config.adapter.make_init_sol()
@@ -28,43 +24,51 @@ class Eoh(Method):
             self._save_run_state_dict()
             self.verbose_info(f"Initialized with baseline solution (score: {initial_sol.evaluation_res.score if initial_sol.evaluation_res else 'None'})")
 
-        # Initialize population if starting from scratch
-        if self.run_state_dict.generation == 0:
-            self._initialize_population()
+        # Sampler and evaluator threads shared by all generations
+        with self._make_sampling_engine(self._sample_task) as self._sampling_engine:
+            # Initialize population if starting from scratch
+            if self.run_state_dict.generation == 0:
+                self._initialize_population()
             
-        # Check if we have enough individuals for selection
-        valid_population = self._get_valid_population(self.run_state_dict.population)
-        if len(valid_population) < self.config.selection_num:
-            self.verbose_info(f'The search is terminated since EoH unable to obtain {self.config.selection_num} feasible algorithms during initialization.')
-            return
+            # Check if we have enough individuals for selection
+            valid_population = self._get_valid_population(self.run_state_dict.population)
+            if len(valid_population) < self.config.selection_num:
+                self.verbose_info(f'The search is terminated since EoH unable to obtain {self.config.selection_num} feasible algorithms during initialization.')
+                return
         
-        # Main evolution loop - moved loop control logic here
-        while (self.run_state_dict.generation < self.config.max_generations) and (self.run_state_dict.tot_sample_nums < self.config.max_sample_nums):
-            try:
-                self.verbose_info(f"Generation {self.run_state_dict.generation} - Sample {self.run_state_dict.tot_sample_nums + 1} - {self.run_state_dict.tot_sample_nums + self.config.num_samplers} / {self.config.max_sample_nums or 'unlimited'}")
+            if self.config.steady_state:
+                # Insert each offspring as soon as it is evaluated, keeping num_samplers requests in flight
+                self._run_steady_state(self._make_steady_state_task, self._register_steady_state_result)
+            else:
+                # Main evolution loop - moved loop control logic here
+                while ((self.run_state_dict.generation < self.config.max_generations)
+                       and (self.run_state_dict.tot_sample_nums < self.config.max_sample_nums)
+                       and not self._budget_exhausted()):
+                    try:
+                        self.verbose_info(f"Generation {self.run_state_dict.generation} - Sample {self.run_state_dict.tot_sample_nums + 1} - {self.run_state_dict.tot_sample_nums + self.config.num_samplers} / {self.config.max_sample_nums or 'unlimited'}")
                 
-                # Apply operators in parallel for this generation
-                new_solutions = self._apply_operators_parallel()
+                        # Apply operators in parallel for this generation
+                        new_solutions = self._apply_operators_parallel()
                 
-                # Add new solutions to both sol_history and population
-                for sol in new_solutions:
-                    self.run_state_dict.sol_history.append(sol)
-                    self.run_state_dict.population.append(sol)
-                    self.run_state_dict.tot_sample_nums += 1
+                        # Add new solutions to both sol_history and population
+                        for sol in new_solutions:
+                            self.run_state_dict.sol_history.append(sol)
+                            self.run_state_dict.population.append(sol)
+                            self.run_state_dict.tot_sample_nums += 1
                 
-                # Manage population size - keep only the best pop_size individuals
-                self._manage_population_size()
+                        # Manage population size - keep only the best pop_size individuals
+                        self._manage_population_size()
                 
-                self.run_state_dict.generation += 1
-                self._save_run_state_dict()
+                        self.run_state_dict.generation += 1
+                        self._save_run_state_dict()
                 
-            except KeyboardInterrupt:
-                self.verbose_info("Evolution interrupted by user")
-                break
-            except Exception as e:
-                self.verbose_info(f"Evolution error: {str(e)}")
-                continue
-        
+                    except KeyboardInterrupt:
+                        self.verbose_info("Evolution interrupted by user")
+                        break
+                    except Exception as e:
+                        self.verbose_info(f"Evolution error: {str(e)}")
+                        continue
+
         # Mark as done and save final state
         self.run_state_dict.is_done = True
         self._save_run_state_dict()
@@ -73,11 +77,12 @@ class Eoh(Method):
         """Initialize population using i1 prompt - keep generating until we have enough valid solutions"""
         self.verbose_info("Initializing population...")
         
-        initial_sample_limit = self.config.max_sample_nums # Reasonable limit
+        initial_sample_limit = self._init_sample_limit()  # Leaves the rest of the budget for evolution
         
         # Keep generating until we have pop_size valid solutions or hit sample limit
         while (len(self._get_valid_population(self.run_state_dict.population)) < self.config.pop_size and 
-               self.run_state_dict.tot_sample_nums < initial_sample_limit):
+               self.run_state_dict.tot_sample_nums < initial_sample_limit and
+               not self._budget_exhausted(initialization=True)):
             
             # Generate and immediately evaluate solutions in parallel
             evaluated_solutions = self._generate_and_evaluate_initial_solutions()
@@ -106,79 +111,30 @@ class Eoh(Method):
             self.verbose_info(f"Warning: Only {len(valid_population)} valid solutions obtained, need at least {self.config.selection_num}")
 
     def _generate_and_evaluate_initial_solutions(self) -> List[Solution]:
-        """Generate and immediately evaluate initial solutions using single executor"""
+        """Generate and evaluate one batch of initial solutions on the sampling engine"""
         evaluated_solutions = []
         
-        # Single executor for both generation and evaluation
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_samplers + self.config.num_evaluators) as executor:
-            # Submit all generation tasks
-            generate_futures = []
-            eval_futures = []
-            
-            for sampler_id in range(self.config.num_samplers):
-                future = executor.submit(self._generate_single_initial_solution, sampler_id)
-                generate_futures.append(future)
-            
-            # Process generations as they complete and immediately submit for evaluation
-            for future in concurrent.futures.as_completed(generate_futures):
-                try:
-                    new_sol, usage = future.result()
-                    self.run_state_dict.usage_history["sample"].append(usage)
-                    
-                    # Immediately submit for evaluation without waiting
-                    if new_sol.sol_string.strip():  # Only evaluate non-empty solutions
-                        eval_future = executor.submit(self.config.evaluator.evaluate_code, new_sol.sol_string)
-                        eval_futures.append((eval_future, new_sol))
-                    else:
-                        evaluated_solutions.append(new_sol)
-                except Exception as e:
-                    self.verbose_info(f"Initial solution generation failed: {str(e)}")
-                    continue
-            
-            # Collect evaluation results
-            for eval_future, solution in eval_futures:
-                try:
-                    evaluation_res = eval_future.result()
-                    solution.evaluation_res = evaluation_res
-                    evaluated_solutions.append(solution)
-                except Exception as e:
-                    self.verbose_info(f"Evaluation failed: {str(e)}")
-                    evaluated_solutions.append(solution)  # Add with no evaluation result
-                    continue
-                    
+        prompts = [self.config.adapter.get_prompt_i1() for _ in range(self.config.num_samplers)]
+        tasks = [("I1", prompt_content, n, sampler_id, [])
+                 for sampler_id, (prompt_content, n) in enumerate(self._group_prompts(prompts))]
+        
+        def on_result(result):
+            solution = self._collect_sample_result(result, "I1")
+            if solution is not None:
+                evaluated_solutions.append(solution)
+        
+        self._run_generation(lambda: tasks, on_result, initialization=True)
         return evaluated_solutions
     
-    def _generate_single_initial_solution(self, sampler_id: int) -> tuple[Solution, dict]:
-        """Generate a single initial solution"""
+    def _generate_initial_solutions(self, prompt_content: List[dict], n: int, sampler_id: int) -> tuple[List[Solution], dict]:
+        """Generate n initial solutions from one i1 prompt"""
         try:
-            prompt_content = self.config.adapter.get_prompt_i1()
-            response, usage = self.config.running_llm.get_response(prompt_content)
-            new_sol = self.config.adapter.parse_response(response)
-            self.verbose_info(f"Sampler {sampler_id}: Generated initial solution")
-            return new_sol, usage
+            new_sols, usage = self._sample_solutions(prompt_content, n, "I1")
+            self.verbose_info(f"Sampler {sampler_id}: Generated initial solution" + (f" x{n}" if n > 1 else ""))
+            return new_sols, usage
         except Exception as e:
             self.verbose_info(f"Sampler {sampler_id}: Failed to generate initial solution - {str(e)}")
-            return Solution(""), {}
-    
-    def _evaluate_solutions(self, solutions: List[Solution]) -> List[Solution]:
-        """Evaluate solutions using multithreading"""
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_evaluators) as executor:
-            futures = []
-            for i, solution in enumerate(solutions):
-                if solution.sol_string.strip():  # Only evaluate non-empty solutions
-                    future = executor.submit(self.config.evaluator.evaluate_code, solution.sol_string)
-                    futures.append((future, i))
-            
-            # Collect results
-            for future, i in futures:
-                try:
-                    evaluation_res = future.result()
-                    solutions[i].evaluation_res = evaluation_res
-                except Exception as e:
-                    self.verbose_info(f"Evaluation failed: {str(e)}")
-                    continue
-        
-        return solutions
+            return [Solution("") for _ in range(n)], {}
     
     def _get_valid_population(self, population: List[Solution]) -> List[Solution]:
         """Get valid solutions from population"""
@@ -195,104 +151,110 @@ class Eoh(Method):
     def _apply_operators_parallel(self) -> List[Solution]:
         """Apply all operators in parallel and return new solutions"""
         new_solutions = []
+        baseline_score = self._get_best_score(self.run_state_dict.population)
+        
+        def on_result(result):
+            operator_name = result.task[0]
+            solution = self._collect_sample_result(result, operator_name, baseline_score)
+            if solution is None:
+                return
+            new_solutions.append(solution)
+            
+            # Log result
+            score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
+            valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
+            self.verbose_info(f"{operator_name} Gen {self.run_state_dict.generation} - Score: {score_str} ({valid_str})")
         
+        # Generate and evaluate on the sampling engine
+        self._run_generation(self._make_generation_tasks, on_result)
+        
+        return new_solutions
+    
+    def _make_generation_tasks(self) -> List[tuple]:
+        """One generation of (operator, prompt, n, sampler_id, parents) tasks against the current population"""
         # Prepare operator tasks
         operator_tasks = []
+        for operator_name in self._get_operator_names():
+            selected_individuals = self._select_parents(operator_name)
+            if selected_individuals:
+                prompt_content = self._make_operator_prompt(operator_name, selected_individuals)
+                operator_tasks.append((operator_name, prompt_content, selected_individuals))
+        if not operator_tasks:
+            return []
+        
+        # Calculate samples per operator to maintain balanced distribution
+        num_operators = len(operator_tasks)
+        
+        # Calculate target samples: multiple of num_operators, not exceeding num_samplers
+        max_multiplier = self.config.num_samplers // num_operators
+        target_samples = max_multiplier * num_operators  # Largest multiple of num_operators <= num_samplers
+        samples_per_operator = target_samples // num_operators  # This equals max_multiplier
         
-        # E1 operator - crossover
-        selected_individuals = self._select_individuals(self.config.selection_num)
-        if selected_individuals:
-            prompt_content = self.config.adapter.get_prompt_e1(selected_individuals)
-            operator_tasks.append(("E1", prompt_content))
+        # Generate samples: each operator gets exactly samples_per_operator samples
+        tasks = []
+        for operator_name, prompt_content, selected_individuals in operator_tasks:
+            for grouped_prompt, n in self._group_prompts([prompt_content] * samples_per_operator):
+                tasks.append((operator_name, grouped_prompt, n, len(tasks), selected_individuals))
+        return tasks
+    
 
-        # E2 operator - guided crossover
+    def _get_operator_names(self) -> List[str]:
+        """Names of the enabled operators, in application order"""
+        operator_names = ["E1"]
         if self.config.use_e2_operator:
-            selected_individuals = self._select_individuals(self.config.selection_num)
-            if selected_individuals:
-                prompt_content = self.config.adapter.get_prompt_e2(selected_individuals)
-                operator_tasks.append(("E2", prompt_content))
-
-        # M1 operator - mutation
+            operator_names.append("E2")
         if self.config.use_m1_operator:
-            selected_individuals = self._select_individuals(1)
-            if selected_individuals:
-                selected_individual = selected_individuals[0]
-                prompt_content = self.config.adapter.get_prompt_m1(selected_individual)
-                operator_tasks.append(("M1", prompt_content))
-
-        # M2 operator - parameter mutation
+            operator_names.append("M1")
         if self.config.use_m2_operator:
-            selected_individuals = self._select_individuals(1)
-            if selected_individuals:
-                selected_individual = selected_individuals[0]
-                prompt_content = self.config.adapter.get_prompt_m2(selected_individual)
-                operator_tasks.append(("M2", prompt_content))
-        
-        # Execute operators and evaluate in parallel using single executor
-        if operator_tasks:
-            # Single executor for both generation and evaluation
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_samplers + self.config.num_evaluators) as executor:
-                generate_futures = []
-                eval_futures = []
-                
-                # Calculate samples per operator to maintain balanced distribution
-                num_operators = len(operator_tasks)
-                
-                # Calculate target samples: multiple of num_operators, not exceeding num_samplers
-                max_multiplier = self.config.num_samplers // num_operators
-                target_samples = max_multiplier * num_operators  # Largest multiple of num_operators <= num_samplers
-                samples_per_operator = target_samples // num_operators  # This equals max_multiplier
-                
-                # Generate samples: each operator gets exactly samples_per_operator samples
-                sample_id = 0
-                for operator_name, prompt_content in operator_tasks:
-                    for _ in range(samples_per_operator):
-                        future = executor.submit(self._generate_single_operator_solution, prompt_content, operator_name, sample_id)
-                        generate_futures.append((operator_name, future))
-                        sample_id += 1
-                
-                # Process generations as they complete and immediately submit for evaluation
-                future_to_operator = {future: operator_name for operator_name, future in generate_futures}
-                for future in concurrent.futures.as_completed([f for _, f in generate_futures]):
-                    operator_name = future_to_operator[future]
-                    try:
-                        solution, usage = future.result()
-                        
-                        # Add usage history
-                        self.run_state_dict.usage_history["sample"].append(usage)
-                        
-                        # Immediately submit for evaluation without waiting
-                        if solution.sol_string.strip():
-                            eval_future = executor.submit(self.config.evaluator.evaluate_code, solution.sol_string)
-                            eval_futures.append((eval_future, solution, operator_name))
-                        else:
-                            new_solutions.append(solution)
-                            # Log result for empty solution
-                            self.verbose_info(f"{operator_name} Gen {self.run_state_dict.generation} - Score: None (Invalid)")
-                        
-                    except Exception as e:
-                        self.verbose_info(f"Error generating {operator_name}: {str(e)}")
-                        continue
-                
-                # Collect evaluation results
-                for eval_future, solution, operator_name in eval_futures:
-                    try:
-                        evaluation_res = eval_future.result()
-                        solution.evaluation_res = evaluation_res
-                        new_solutions.append(solution)
-                        
-                        # Log result
-                        score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
-                        valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
-                        self.verbose_info(f"{operator_name} Gen {self.run_state_dict.generation} - Score: {score_str} ({valid_str})")
-                        
-                    except Exception as e:
-                        self.verbose_info(f"Error evaluating {operator_name}: {str(e)}")
-                        new_solutions.append(solution)  # Add with no evaluation result
-                        continue
-        
-        return new_solutions
-    
+            operator_names.append("M2")
+        return operator_names
+
+    def _select_parents(self, operator_name: str) -> List[Solution]:
+        """Select the individuals an operator is applied to: selection_num for E1/E2, one for M1/M2"""
+        if operator_name in ("E1", "E2"):
+            return self._select_individuals(self.config.selection_num)
+        return self._select_individuals(1)
+
+    def _make_operator_prompt(self, operator_name: str, selected_individuals: List[Solution]) -> List[dict]:
+        """Build the prompt of an operator for the selected individuals"""
+        if operator_name == "E1":
+            # E1 - crossover
+            return self.config.adapter.get_prompt_e1(selected_individuals)
+        if operator_name == "E2":
+            # E2 - guided crossover
+            return self.config.adapter.get_prompt_e2(selected_individuals)
+        if operator_name == "M1":
+            # M1 - mutation
+            return self.config.adapter.get_prompt_m1(selected_individuals[0])
+        # M2 - parameter mutation
+        return self.config.adapter.get_prompt_m2(selected_individuals[0])
+
+    def _make_steady_state_task(self, task_index: int) -> tuple:
+        """Steady-state task: the next operator in turn, applied to the current population"""
+        operator_names = self._get_operator_names()
+        operator_name = operator_names[task_index % len(operator_names)]
+        selected_individuals = self._select_parents(operator_name)
+        prompt_content = self._make_operator_prompt(operator_name, selected_individuals) if selected_individuals else None
+        return operator_name, prompt_content, 1, task_index, selected_individuals
+
+    def _get_task_parents(self, task: tuple) -> List[Solution]:
+        return task[4]
+
+    def _register_steady_state_result(self, result, baseline_score: float | None):
+        """Insert a steady-state offspring into the population and trim it right away"""
+        operator_name = result.task[0]
+        solution = self._collect_sample_result(result, operator_name, baseline_score)
+        if solution is None:
+            return
+        self.run_state_dict.sol_history.append(solution)
+        self.run_state_dict.population.append(solution)
+        self.run_state_dict.tot_sample_nums += 1
+
+        score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
+        valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
+        self.verbose_info(f"{operator_name} Sample {self.run_state_dict.tot_sample_nums} / {self.config.max_sample_nums} - Score: {score_str} ({valid_str})")
+
+        self._manage_population_size()
 
     def _manage_population_size(self):
         """Manage population size - keep only the best pop_size individuals"""
@@ -360,16 +322,22 @@ class Eoh(Method):
         return selected
 
     
-    def _generate_single_operator_solution(self, prompt_content: List[dict], operator_type: str, sampler_id: int) -> tuple[Solution, dict]:
-        """Generate a single solution for an operator"""
+    def _sample_task(self, task: tuple) -> tuple[List[Solution], dict]:
+        """Sampling engine callback: sample the solutions of an (operator, prompt, n, sampler_id, parents) task"""
+        operator_name, prompt_content, n, sampler_id, _ = task
+        if operator_name == "I1":
+            return self._generate_initial_solutions(prompt_content, n, sampler_id)
+        return self._generate_operator_solutions(prompt_content, operator_name, n, sampler_id)
+
+    def _generate_operator_solutions(self, prompt_content: List[dict], operator_type: str, n: int, sampler_id: int) -> tuple[List[Solution], dict]:
+        """Generate n solutions for an operator from one prompt"""
         try:
-            response, usage = self.config.running_llm.get_response(prompt_content)
-            new_sol = self.config.adapter.parse_response(response)
-            self.verbose_info(f"Sampler {sampler_id}: Generated {operator_type} solution")
-            return new_sol, usage
+            new_sols, usage = self._sample_solutions(prompt_content, n, operator_type)
+            self.verbose_info(f"Sampler {sampler_id}: Generated {operator_type} solution" + (f" x{n}" if n > 1 else ""))
+            return new_sols, usage
         except Exception as e:
             self.verbose_info(f"Sampler {sampler_id}: Failed to generate {operator_type} solution - {str(e)}")
-            return Solution(""), {}
+            return [Solution("") for _ in range(n)], {}
 
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
-        return EohRunStateDict
\ No newline at end of file
+        return EohRunStateDict
@@ -1,7 +1,9 @@
 from evotool.tools.llm import HttpsApi
 from evotool.task.base_task import BaseEvaluator, EohAdapter
 from ..base_config import BaseConfig
-from typing import Optional, Literal
+from ..concurrency_autotuner import ConcurrencyAutotuner
+from ..budget import Budget
+from typing import Dict, Optional
 
 class EohConfig(BaseConfig):
     def __init__(
@@ -20,9 +22,22 @@ class EohConfig(BaseConfig):
             use_m2_operator: bool = True,
             num_samplers: int = 5,
             num_evaluators: int = 5,
+            steady_state: bool = False,
+            speculative_fraction: Optional[float] = None,
+            speculative_policy: str = 'accept',
+            generation_timeout: Optional[float] = None,
+            late_results: str = 'carry',
+            autotuner: Optional[ConcurrencyAutotuner] = None,
+            budget: Optional[Budget] = None,
+            stream_responses: bool = False,
+            batch_identical_prompts: bool = False,
+            generation_params: Optional[dict] = None,
+            operator_generation_params: Optional[Dict[str, dict]] = None,
+            llm_prices: Optional[Dict[str, dict]] = None,
+            usage_log: bool = False,
             verbose: bool = True
     ):
-        super().__init__(task_info, output_path, verbose)
+        super().__init__(task_info, output_path, verbose, llm_prices, usage_log)
         self.running_llm = running_llm
         self.evaluator = evaluator
         self.adapter = adapter
@@ -34,4 +49,15 @@ class EohConfig(BaseConfig):
         self.use_m1_operator = use_m1_operator
         self.use_m2_operator = use_m2_operator
         self.num_samplers = num_samplers
-        self.num_evaluators = num_evaluators
\ No newline at end of file
+        self.num_evaluators = num_evaluators
+        self.steady_state = steady_state
+        self.speculative_fraction = speculative_fraction
+        self.speculative_policy = speculative_policy
+        self.generation_timeout = generation_timeout
+        self.late_results = late_results
+        self.autotuner = autotuner
+        self.budget = budget
+        self.stream_responses = stream_responses
+        self.batch_identical_prompts = batch_identical_prompts
+        self.generation_params = generation_params or {}
+        self.operator_generation_params = operator_generation_params or {}
@@ -1,4 +1,3 @@
-import concurrent.futures
 from typing import Type
 
 from .run_config import Es1p1Config
@@ -17,9 +16,6 @@ class Es1p1(Method):
         """Main ES(1+1) algorithm execution"""
         self.verbose_title("ES(1+1) ALGORITHM STARTED")
 
-        if "sample" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["sample"] = []
-
         if len(self.run_state_dict.sol_history) == 0:
             # Try to create and evaluate initial solution up to 3 times
             init_sol = None
@@ -44,82 +40,72 @@ class Es1p1(Method):
             self.run_state_dict.sol_history.append(init_sol)
             self._save_run_state_dict()
         
-        # Main evolution loop
-        while self.run_state_dict.tot_sample_nums < self.config.max_sample_nums:
-            try:
-                start_sample = self.run_state_dict.tot_sample_nums + 1
-                end_sample = self.run_state_dict.tot_sample_nums + self.config.num_samplers
-                self.verbose_info(
-                    f"Samples  {start_sample} - {end_sample} / {self.config.max_sample_nums or 'unlimited'} "
-                )
-
-                best_sol = self._get_best_sol(self.run_state_dict.sol_history)
+        # Sampler and evaluator threads shared by all batches
+        with self._make_sampling_engine(self._sample_task, evaluate_empty=True) as self._sampling_engine:
+            # Main evolution loop
+            while self.run_state_dict.tot_sample_nums < self.config.max_sample_nums and not self._budget_exhausted():
+                try:
+                    start_sample = self.run_state_dict.tot_sample_nums + 1
+                    end_sample = self.run_state_dict.tot_sample_nums + self.config.num_samplers
+                    self.verbose_info(
+                        f"Samples  {start_sample} - {end_sample} / {self.config.max_sample_nums or 'unlimited'} "
+                    )
 
-                # Async propose and evaluate - single executor for both
-                with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_samplers + self.config.num_evaluators) as executor:
-                    # Submit all propose tasks
-                    propose_futures = []
-                    eval_futures = []
+                    best_sol = self._get_best_sol(self.run_state_dict.sol_history)
+                    baseline_score = self._get_best_score([best_sol]) if best_sol else None
+                
+                    # Add samples to history as their evaluations complete
+                    def on_result(result):
+                        sol = self._collect_sample_result(result, baseline_score=baseline_score)
+                        if sol is None or result.error is not None:
+                            return
+                        score_str = "None" if sol.evaluation_res.score is None else f"{sol.evaluation_res.score}"
+                        self.verbose_info(f"Sample evaluated - Score: {score_str}")
                     
-                    for i in range(self.config.num_samplers):
-                        future = executor.submit(self._propose_sample, best_sol, i)
-                        propose_futures.append(future)
-                    
-                    # Process proposals as they complete and immediately submit for evaluation
-                    for future in concurrent.futures.as_completed(propose_futures):
-                        try:
-                            new_sol, usage = future.result()
-                            self.run_state_dict.usage_history["sample"].append(usage)
-                            
-                            # Immediately submit for evaluation without waiting
-                            eval_future = executor.submit(self.config.evaluator.evaluate_code, new_sol.sol_string)
-                            eval_futures.append((eval_future, new_sol))
-                        except Exception as e:
-                            self.verbose_info(f"Propose failed: {str(e)}")
-                            continue
-                    
-                    # Collect evaluation results as they complete
-                    for eval_future, sol in eval_futures:
-                        try:
-                            evaluation_res = eval_future.result()
-                            sol.evaluation_res = evaluation_res
-                            score_str = "None" if evaluation_res.score is None else f"{evaluation_res.score}"
-                            self.verbose_info(f"Sample evaluated - Score: {score_str}")
-                            
-                            # Add to history
-                            self.run_state_dict.sol_history.append(sol)
-                            self.run_state_dict.tot_sample_nums += 1
-                            self._save_run_state_dict()
-                        except Exception as e:
-                            self.verbose_info(f"Evaluation failed: {str(e)}")
-                            continue
+                        # Add to history
+                        self.run_state_dict.sol_history.append(sol)
+                        self.run_state_dict.tot_sample_nums += 1
+                        self._save_run_state_dict()
+                
+                    self._run_generation(self._make_generation_tasks, on_result)
 
-                            
+                except KeyboardInterrupt:
+                    self.verbose_info("Interrupted by user")
+                    break
+                except Exception as e:
+                    self.verbose_info(f"Sampling error: {str(e)}")
+                    continue
 
-            except KeyboardInterrupt:
-                self.verbose_info("Interrupted by user")
-                break
-            except Exception as e:
-                self.verbose_info(f"Sampling error: {str(e)}")
-                continue
-        
         # Mark as done and save final state
         self.run_state_dict.is_done = True
         self._save_run_state_dict()
     
-    def _propose_sample(self, best_sol: Solution, sampler_id: int) -> tuple[Solution, dict]:
-        try:
-            prompt_content = self.config.adapter.get_prompt(best_sol)
+    def _make_generation_tasks(self) -> list[tuple]:
+        """One batch of (prompt, n, sampler_id, parent) tasks mutating the current best solution"""
+        best_sol = self._get_best_sol(self.run_state_dict.sol_history)
+        prompts = [self.config.adapter.get_prompt(best_sol) for _ in range(self.config.num_samplers)]
+        return [(prompt_content, n, i, best_sol) for i, (prompt_content, n) in enumerate(self._group_prompts(prompts))]
+
+    def _sample_task(self, task: tuple) -> tuple[list[Solution], dict]:
+        """Sampling engine callback: sample the solutions of a (prompt, n, sampler_id, parent) task"""
+        return self._propose_samples(*task[:3])
 
-            response, usage = self.config.running_llm.get_response(prompt_content)
+    def _get_task_parents(self, task: tuple) -> list[Solution]:
+        return [task[3]]
 
-            new_sol = self.config.adapter.parse_response(response)
+    def _is_parent_alive(self, parent: Solution) -> bool:
+        """The single parent of ES(1+1) survives while it is still the best solution"""
+        return parent is self._get_best_sol(self.run_state_dict.sol_history)
+
+    def _propose_samples(self, prompt_content: list[dict], n: int, sampler_id: int) -> tuple[list[Solution], dict]:
+        try:
+            new_sols, usage = self._sample_solutions(prompt_content, n)
 
-            self.verbose_info(f"Sampler {sampler_id}: Generated a sample.")
-            return new_sol, usage
+            self.verbose_info(f"Sampler {sampler_id}: Generated {'a sample' if n == 1 else f'{n} samples'}.")
+            return new_sols, usage
         except Exception as e:
             self.verbose_info(f"Sampler {sampler_id}: Failed to generate a samples - {str(e)}")
-            return Solution(""), {}
+            return [Solution("") for _ in range(n)], {}
 
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
         return Es1p1RunStateDict
@@ -1,7 +1,9 @@
 from evotool.tools.llm import HttpsApi
 from evotool.task.base_task import BaseEvaluator, Es1p1Adapter
 from ..base_config import BaseConfig
-from typing import List, Optional
+from ..concurrency_autotuner import ConcurrencyAutotuner
+from ..budget import Budget
+from typing import Dict, List, Optional
 
 class Es1p1Config(BaseConfig):
     def __init__(
@@ -14,12 +16,34 @@ class Es1p1Config(BaseConfig):
             max_sample_nums: int = 45,
             num_samplers: int = 5,
             num_evaluators: int = 5,
+            speculative_fraction: Optional[float] = None,
+            speculative_policy: str = 'accept',
+            generation_timeout: Optional[float] = None,
+            late_results: str = 'carry',
+            autotuner: Optional[ConcurrencyAutotuner] = None,
+            budget: Optional[Budget] = None,
+            stream_responses: bool = False,
+            batch_identical_prompts: bool = False,
+            generation_params: Optional[dict] = None,
+            operator_generation_params: Optional[Dict[str, dict]] = None,
+            llm_prices: Optional[Dict[str, dict]] = None,
+            usage_log: bool = False,
             verbose: bool = True
     ):
-        super().__init__(task_info, output_path, verbose)
+        super().__init__(task_info, output_path, verbose, llm_prices, usage_log)
         self.evaluator = evaluator
         self.running_llm = running_llm
         self.adapter = adapter
         self.max_sample_nums = max_sample_nums
         self.num_samplers = num_samplers
-        self.num_evaluators = num_evaluators
\ No newline at end of file
+        self.num_evaluators = num_evaluators
+        self.speculative_fraction = speculative_fraction
+        self.speculative_policy = speculative_policy
+        self.generation_timeout = generation_timeout
+        self.late_results = late_results
+        self.autotuner = autotuner
+        self.budget = budget
+        self.stream_responses = stream_responses
+        self.batch_identical_prompts = batch_identical_prompts
+        self.generation_params = generation_params or {}
+        self.operator_generation_params = operator_generation_params or {}
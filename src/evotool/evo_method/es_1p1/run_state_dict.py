@@ -1,4 +1,5 @@
 from ..base_run_state_dict import BaseRunStateDict
+from ..usage_ledger import UsageLedger
 from evotool.task.base_task import Solution
 
 class Es1p1RunStateDict(BaseRunStateDict):
@@ -14,7 +15,9 @@ class Es1p1RunStateDict(BaseRunStateDict):
         self.tot_sample_nums = tot_sample_nums
         self.is_done = is_done
         self.sol_history = sol_history or []
-        self.usage_history = {}
+        self.usage_ledger = UsageLedger()
+        self.speculation_stats = {'issued': 0, 'hits': 0, 'discarded': 0}  # Speculative next-generation tasks
+        self.straggler_stats = {'deadlines': 0, 'cancelled': 0, 'abandoned': 0, 'carried': 0, 'dropped': 0}  # Generation deadlines and late results
         
     def to_json(self) -> dict:
         """Convert the run state to JSON-serializable dictionary"""
@@ -39,7 +42,9 @@ class Es1p1RunStateDict(BaseRunStateDict):
             'sol_history': sol_history_json,
             'tot_sample_nums': self.tot_sample_nums,
             'is_done': self.is_done,
-            'usage_history': self.usage_history
+            'usage_ledger': self.usage_ledger.to_json(),
+            'speculation_stats': self.speculation_stats,
+            'straggler_stats': self.straggler_stats
         }
         
     @classmethod
@@ -72,5 +77,7 @@ class Es1p1RunStateDict(BaseRunStateDict):
             sol_history=sol_history,
             is_done=data.get('is_done', False),
         )
-        instance.usage_history = data.get('usage_history', {})
+        instance.usage_ledger = UsageLedger.from_run_state_json(data)
+        instance.speculation_stats = data.get('speculation_stats', instance.speculation_stats)
+        instance.straggler_stats = data.get('straggler_stats', instance.straggler_stats)
         return instance
@@ -1,4 +1,3 @@
-import concurrent.futures
 from typing import List, Type
 
 from .run_config import EvoEngineerConfig
@@ -17,9 +16,6 @@ class EvoEngineer(Method):
         """Main EvoEngineer algorithm execution"""
         self.verbose_title("EvoEngineer ALGORITHM STARTED")
 
-        if "sample" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["sample"] = []
-
         # Initialize with seed solution if sol_history is empty
         if len(self.run_state_dict.sol_history) == 0:
             initial_sol = self.config.adapter.make_init_sol()
@@ -29,37 +25,45 @@ class EvoEngineer(Method):
             self._save_run_state_dict()
             self.verbose_info(f"Initialized with baseline solution (score: {initial_sol.evaluation_res.score if initial_sol.evaluation_res else 'None'})")
 
-        # Initialize population if starting from scratch
-        if self.run_state_dict.generation == 0:
-            self._initialize_population()
+        # Sampler and evaluator threads shared by initialization and all generations
+        with self._make_sampling_engine(self._sample_task) as self._sampling_engine:
+            # Initialize population if starting from scratch
+            if self.run_state_dict.generation == 0:
+                self._initialize_population()
             
-        # Check if we have enough individuals for selection
-        valid_population = self._get_valid_population(self.run_state_dict.population)
-        if len(valid_population) < 2:  # Need at least 2 for selection
-            self.verbose_info(f'The search is terminated since EvoEngineer unable to obtain 2 feasible algorithms during initialization.')
-            return
+            # Check if we have enough individuals for selection
+            valid_population = self._get_valid_population(self.run_state_dict.population)
+            if len(valid_population) < 2:  # Need at least 2 for selection
+                self.verbose_info(f'The search is terminated since EvoEngineer unable to obtain 2 feasible algorithms during initialization.')
+                return
         
-        # Main evolution loop - moved loop control logic here
-        while (self.run_state_dict.generation < self.config.max_generations) and (self.run_state_dict.tot_sample_nums < self.config.max_sample_nums):
-            try:
-                self.verbose_info(f"Generation {self.run_state_dict.generation} - Sample {self.run_state_dict.tot_sample_nums + 1} - {self.run_state_dict.tot_sample_nums + self.config.num_samplers} / {self.config.max_sample_nums or 'unlimited'}")
+            if self.config.steady_state:
+                # Insert each offspring as soon as it is evaluated, keeping num_samplers requests in flight
+                self._run_steady_state(self._make_steady_state_task, self._register_steady_state_result)
+            else:
+                # Main evolution loop - moved loop control logic here
+                while ((self.run_state_dict.generation < self.config.max_generations)
+                       and (self.run_state_dict.tot_sample_nums < self.config.max_sample_nums)
+                       and not self._budget_exhausted()):
+                    try:
+                        self.verbose_info(f"Generation {self.run_state_dict.generation} - Sample {self.run_state_dict.tot_sample_nums + 1} - {self.run_state_dict.tot_sample_nums + self.config.num_samplers} / {self.config.max_sample_nums or 'unlimited'}")
                 
-                # Apply offspring operators in parallel for this generation
-                self._apply_operators_parallel(self.config.get_offspring_operators(), f"Gen {self.run_state_dict.generation}")
+                        # Apply offspring operators in parallel for this generation
+                        self._apply_operators_parallel(self.config.get_offspring_operators(), f"Gen {self.run_state_dict.generation}")
                 
-                # Manage population size - keep only the best pop_size individuals
-                self._manage_population_size()
+                        # Manage population size - keep only the best pop_size individuals
+                        self._manage_population_size()
                 
-                self.run_state_dict.generation += 1
-                self._save_run_state_dict()
+                        self.run_state_dict.generation += 1
+                        self._save_run_state_dict()
                 
-            except KeyboardInterrupt:
-                self.verbose_info("Evolution interrupted by user")
-                break
-            except Exception as e:
-                self.verbose_info(f"Evolution error: {str(e)}")
-                continue
-        
+                    except KeyboardInterrupt:
+                        self.verbose_info("Evolution interrupted by user")
+                        break
+                    except Exception as e:
+                        self.verbose_info(f"Evolution error: {str(e)}")
+                        continue
+
         # Mark as done and save final state
         self.run_state_dict.is_done = True
         self._save_run_state_dict()
@@ -68,14 +72,15 @@ class EvoEngineer(Method):
         """Initialize population using init operators - keep generating until we have enough valid solutions"""
         self.verbose_info("Initializing population...")
         
-        initial_sample_limit = self.config.max_sample_nums # Reasonable limit
+        initial_sample_limit = self._init_sample_limit()  # Leaves the rest of the budget for evolution
         
         # Keep generating until we have pop_size valid solutions or hit sample limit
         while (len(self._get_valid_population(self.run_state_dict.population)) < self.config.pop_size and 
-               self.run_state_dict.tot_sample_nums < initial_sample_limit):
+               self.run_state_dict.tot_sample_nums < initial_sample_limit and
+               not self._budget_exhausted(initialization=True)):
             
             # Apply init operators in parallel
-            self._apply_operators_parallel(self.config.get_init_operators(), "Init")
+            self._apply_operators_parallel(self.config.get_init_operators(), "Init", initialization=True)
             
             valid_count = len(self._get_valid_population(self.run_state_dict.population))
             self.verbose_info(f"Valid solutions: {valid_count}/{self.config.pop_size}")
@@ -109,73 +114,69 @@ class EvoEngineer(Method):
         self.run_state_dict.population.append(solution)
         self.run_state_dict.tot_sample_nums += 1
 
-    def _apply_operators_parallel(self, operators: List, generation_label: str = ""):
+    def _apply_operators_parallel(self, operators: List, generation_label: str = "", initialization: bool = False):
         """Apply operators in parallel and register solutions"""
         if not operators:
             return
+        baseline_score = self._get_best_score(self.run_state_dict.population)
             
-        # Single executor for both generation and evaluation
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_samplers + self.config.num_evaluators) as executor:
-            generate_futures = []
-            eval_futures = []
-
-            # Calculate target samples: multiple of num_operators, not exceeding num_samplers
-            num_operators = len(operators)
-            
-            max_multiplier = self.config.num_samplers // num_operators
-            target_samples = max_multiplier * num_operators  # Largest multiple of num_operators <= num_samplers
-            samples_per_operator = target_samples // num_operators  # This equals max_multiplier
-            
-            # Generate samples: each operator gets exactly samples_per_operator samples
-            sample_id = 0
+        # Calculate target samples: multiple of num_operators, not exceeding num_samplers
+        num_operators = len(operators)
+        
+        max_multiplier = self.config.num_samplers // num_operators
+        target_samples = max_multiplier * num_operators  # Largest multiple of num_operators <= num_samplers
+        samples_per_operator = target_samples // num_operators  # This equals max_multiplier
+        
+        # Generate samples: each operator gets exactly samples_per_operator samples
+        def make_tasks():
+            tasks = []
             for operator in operators:
+                prompts = []
+                parents = {}
                 for _ in range(samples_per_operator):
                     selected_individuals = self._select_individuals_for_operator(operator)
-                    future = executor.submit(self._generate_single_solution, operator, selected_individuals, sample_id)
-                    generate_futures.append((operator.name, future))
-                    sample_id += 1
-            
-            # Process generations as they complete and immediately submit for evaluation
-            future_to_operator = {future: operator_name for operator_name, future in generate_futures}
-            for future in concurrent.futures.as_completed([f for _, f in generate_futures]):
-                operator_name = future_to_operator[future]
-                try:
-                    solution, usage = future.result()
-                    
-                    # Add usage history
-                    self.run_state_dict.usage_history["sample"].append(usage)
-                    
-                    # Immediately submit for evaluation without waiting
-                    if solution.sol_string.strip():
-                        eval_future = executor.submit(self.config.evaluator.evaluate_code, solution.sol_string)
-                        eval_futures.append((eval_future, solution, operator_name))
-                    else:
-                        self._register_solution(solution)
-                        # Log result for empty solution
-                        self.verbose_info(f"{operator_name} {generation_label} - Score: None (Invalid)")
-                    
-                except Exception as e:
-                    self.verbose_info(f"Error generating {operator_name}: {str(e)}")
-                    continue
+                    prompt_content = self._make_operator_prompt(operator, selected_individuals)
+                    prompts.append(prompt_content)
+                    parents.setdefault(id(prompt_content), selected_individuals)
+                for prompt_content, n in self._group_prompts(prompts):
+                    tasks.append((operator, prompt_content, n, len(tasks), parents[id(prompt_content)]))
+            return tasks
+        
+        # Register solutions as their evaluations complete
+        def on_result(result):
+            operator_name = result.task[0].name
+            solution = self._collect_sample_result(result, operator_name, baseline_score)
+            if solution is None:
+                return
+            self._register_solution(solution)
             
-            # Collect evaluation results
-            eval_future_to_info = {eval_future: (solution, operator_name) for eval_future, solution, operator_name in eval_futures}
-            for eval_future in concurrent.futures.as_completed([ef for ef, _, _ in eval_futures]):
-                solution, operator_name = eval_future_to_info[eval_future]
-                try:
-                    evaluation_res = eval_future.result()
-                    solution.evaluation_res = evaluation_res
-                    self._register_solution(solution)
-                    
-                    # Log result
-                    score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
-                    valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
-                    self.verbose_info(f"{operator_name} {generation_label} - Score: {score_str} ({valid_str})")
-                    
-                except Exception as e:
-                    self.verbose_info(f"Error evaluating {operator_name}: {str(e)}")
-                    self._register_solution(solution)  # Add with no evaluation result
-                    continue
+            # Log result
+            score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
+            valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
+            self.verbose_info(f"{operator_name} {generation_label} - Score: {score_str} ({valid_str})")
+        
+        self._run_generation(make_tasks, on_result, initialization)
+
+    def _make_steady_state_task(self, task_index: int) -> tuple:
+        """Steady-state task: the next offspring operator in turn, applied to the current population"""
+        operators = self.config.get_offspring_operators()
+        operator = operators[task_index % len(operators)]
+        selected_individuals = self._select_individuals_for_operator(operator)
+        return operator, self._make_operator_prompt(operator, selected_individuals), 1, task_index, selected_individuals
+
+    def _register_steady_state_result(self, result, baseline_score: float | None):
+        """Register a steady-state offspring and trim the population right away"""
+        operator_name = result.task[0].name
+        solution = self._collect_sample_result(result, operator_name, baseline_score)
+        if solution is None:
+            return
+        self._register_solution(solution)
+
+        score_str = "None" if not solution.evaluation_res or solution.evaluation_res.score is None else f"{solution.evaluation_res.score}"
+        valid_str = "Valid" if solution.evaluation_res and solution.evaluation_res.valid else "Invalid"
+        self.verbose_info(f"{operator_name} Sample {self.run_state_dict.tot_sample_nums} / {self.config.max_sample_nums} - Score: {score_str} ({valid_str})")
+
+        self._manage_population_size()
 
     def _manage_population_size(self):
         """Manage population size - keep only the best pop_size individuals"""
@@ -239,19 +240,34 @@ class EvoEngineer(Method):
         
         return selected
 
-    def _generate_single_solution(self, operator, selected_individuals: List[Solution], sampler_id: int) -> tuple[Solution, dict]:
-        """Generate a single solution using an operator"""
+    def _make_operator_prompt(self, operator, selected_individuals: List[Solution]) -> List[dict] | None:
+        """Build the prompt of an operator for the selected individuals (None if that fails)"""
         try:
             current_best_sol = self._get_best_sol(self.run_state_dict.population)
             random_3_thought = self._get_n_random_thought(3)
-            prompt_content = self.config.adapter.get_operator_prompt(operator.name, selected_individuals, current_best_sol, random_3_thought)
-            response, usage = self.config.running_llm.get_response(prompt_content)
-            new_sol = self.config.adapter.parse_response(response)
-            self.verbose_info(f"Sampler {sampler_id}: Generated {operator.name} solution")
-            return new_sol, usage
+            return self.config.adapter.get_operator_prompt(operator.name, selected_individuals, current_best_sol, random_3_thought)
+        except Exception as e:
+            self.verbose_info(f"Failed to build {operator.name} prompt - {str(e)}")
+            return None
+
+    def _sample_task(self, task: tuple) -> tuple[List[Solution], dict]:
+        """Sampling engine callback: sample the solutions of an (operator, prompt, n, sampler_id, parents) task"""
+        return self._generate_solutions(*task[:4])
+
+    def _get_task_parents(self, task: tuple) -> List[Solution]:
+        return task[4]
+
+    def _generate_solutions(self, operator, prompt_content: List[dict], n: int, sampler_id: int) -> tuple[List[Solution], dict]:
+        """Generate n solutions from one operator prompt"""
+        if prompt_content is None:
+            return [Solution("") for _ in range(n)], {}
+        try:
+            new_sols, usage = self._sample_solutions(prompt_content, n, operator.name)
+            self.verbose_info(f"Sampler {sampler_id}: Generated {operator.name} solution" + (f" x{n}" if n > 1 else ""))
+            return new_sols, usage
         except Exception as e:
             self.verbose_info(f"Sampler {sampler_id}: Failed to generate {operator.name} solution - {str(e)}")
-            return Solution(""), {}
+            return [Solution("") for _ in range(n)], {}
 
     def _get_n_random_thought(self, n: int) -> List[str]:
         """Get n random thoughts from solutions in the current population"""
@@ -272,4 +288,4 @@ class EvoEngineer(Method):
         # Randomly sample n thoughts without replacement
         return random.sample(thoughts, n)
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
-        return EvoEngineerRunStateDict
\ No newline at end of file
+        return EvoEngineerRunStateDict
@@ -1,7 +1,9 @@
 from evotool.tools.llm import HttpsApi
 from evotool.task.base_task import BaseEvaluator, EvoEngineerAdapter, Operator
 from ..base_config import BaseConfig
-from typing import Optional, Literal, List
+from ..concurrency_autotuner import ConcurrencyAutotuner
+from ..budget import Budget
+from typing import Dict, Optional, List
 
 class EvoEngineerConfig(BaseConfig):
     def __init__(
@@ -16,9 +18,22 @@ class EvoEngineerConfig(BaseConfig):
             pop_size: int = 4,
             num_samplers: int = 5,
             num_evaluators: int = 5,
+            steady_state: bool = False,
+            speculative_fraction: Optional[float] = None,
+            speculative_policy: str = 'accept',
+            generation_timeout: Optional[float] = None,
+            late_results: str = 'carry',
+            autotuner: Optional[ConcurrencyAutotuner] = None,
+            budget: Optional[Budget] = None,
+            stream_responses: bool = False,
+            batch_identical_prompts: bool = False,
+            generation_params: Optional[dict] = None,
+            operator_generation_params: Optional[Dict[str, dict]] = None,
+            llm_prices: Optional[Dict[str, dict]] = None,
+            usage_log: bool = False,
             verbose: bool = True
     ):
-        super().__init__(task_info, output_path, verbose)
+        super().__init__(task_info, output_path, verbose, llm_prices, usage_log)
         self.running_llm = running_llm
         self.evaluator = evaluator
         self.adapter = adapter
@@ -27,6 +42,17 @@ class EvoEngineerConfig(BaseConfig):
         self.pop_size = pop_size
         self.num_samplers = num_samplers
         self.num_evaluators = num_evaluators
+        self.steady_state = steady_state
+        self.speculative_fraction = speculative_fraction
+        self.speculative_policy = speculative_policy
+        self.generation_timeout = generation_timeout
+        self.late_results = late_results
+        self.autotuner = autotuner
+        self.budget = budget
+        self.stream_responses = stream_responses
+        self.batch_identical_prompts = batch_identical_prompts
+        self.generation_params = generation_params or {}
+        self.operator_generation_params = operator_generation_params or {}
         
         # Get operators from adapter
         self.init_operators = adapter.get_init_operators()
@@ -53,4 +79,4 @@ class EvoEngineerConfig(BaseConfig):
     
     def get_all_operators(self) -> List[Operator]:
         """Get all operators"""
-        return self.init_operators + self.offspring_operators
\ No newline at end of file
+        return self.init_operators + self.offspring_operators
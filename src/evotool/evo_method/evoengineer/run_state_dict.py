@@ -1,4 +1,5 @@
 from ..base_run_state_dict import BaseRunStateDict
+from ..usage_ledger import UsageLedger
 from evotool.task.base_task import Solution
 
 class EvoEngineerRunStateDict(BaseRunStateDict):
@@ -18,7 +19,9 @@ class EvoEngineerRunStateDict(BaseRunStateDict):
         self.is_done = is_done
         self.sol_history = sol_history or []  # Complete history of all solutions
         self.population = population or []     # Current generation population
-        self.usage_history = {}
+        self.usage_ledger = UsageLedger()
+        self.speculation_stats = {'issued': 0, 'hits': 0, 'discarded': 0}  # Speculative next-generation tasks
+        self.straggler_stats = {'deadlines': 0, 'cancelled': 0, 'abandoned': 0, 'carried': 0, 'dropped': 0}  # Generation deadlines and late results
         
     def to_json(self) -> dict:
         """Convert the run state to JSON-serializable dictionary"""
@@ -60,7 +63,9 @@ class EvoEngineerRunStateDict(BaseRunStateDict):
             'sol_history': sol_history_json,
             'population': population_json,
             'is_done': self.is_done,
-            'usage_history': self.usage_history
+            'usage_ledger': self.usage_ledger.to_json(),
+            'speculation_stats': self.speculation_stats,
+            'straggler_stats': self.straggler_stats
         }
         
     @classmethod
@@ -114,5 +119,7 @@ class EvoEngineerRunStateDict(BaseRunStateDict):
             population=population,
             is_done=data.get('is_done', False),
         )
-        instance.usage_history = data.get('usage_history', {})
-        return instance
\ No newline at end of file
+        instance.usage_ledger = UsageLedger.from_run_state_json(data)
+        instance.speculation_stats = data.get('speculation_stats', instance.speculation_stats)
+        instance.straggler_stats = data.get('straggler_stats', instance.straggler_stats)
+        return instance
@@ -1,4 +1,3 @@
-import concurrent.futures
 from typing import Type
 
 from .run_config import FunSearchConfig
@@ -20,10 +19,6 @@ class FunSearch(Method):
         """Main FunSearch algorithm execution"""
         self.verbose_title("FUNSEARCH ALGORITHM STARTED")
         
-        # Initialize usage history
-        if "sample" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["sample"] = []
-        
         # Initialize or restore programs database
         if self.run_state_dict.has_database_state(self.config.output_path):
             # Restore from saved database file
@@ -86,91 +81,51 @@ class FunSearch(Method):
                     if solution.evaluation_res and solution.evaluation_res.valid:
                         programs_db.register_solution(solution)
         
-        # Main sampling loop
-        while self.run_state_dict.tot_sample_nums < self.config.max_sample_nums:
-            try:
-                start_sample = self.run_state_dict.tot_sample_nums + 1
-                end_sample = self.run_state_dict.tot_sample_nums + self.config.num_samplers
-                self.verbose_info(
-                    f"Samples {start_sample} - {end_sample} / {self.config.max_sample_nums or 'unlimited'}"
-                )
-                
-                # Get prompt solutions from random island
-                prompt_solutions, island_id = programs_db.get_prompt_solutions()
-                if not prompt_solutions:
-                    self.verbose_info("No solutions available for prompting")
-                    continue
-                
-                self.verbose_info(f"Selected {len(prompt_solutions)} solutions from island {island_id}")
-                
-                # Async generate and evaluate programs - single executor for both
-                with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.num_samplers + self.config.num_evaluators) as executor:
-                    # Submit all generate tasks
-                    generate_futures = []
-                    eval_futures = []
-                    
-                    for sampler_id in range(self.config.num_samplers):
-                        future = executor.submit(self._generate_single_program, prompt_solutions, sampler_id)
-                        generate_futures.append(future)
-                    
-                    # Process generated programs as they complete and immediately submit for evaluation
-                    for future in concurrent.futures.as_completed(generate_futures):
-                        try:
-                            new_program, usage = future.result()
-                            self.run_state_dict.usage_history["sample"].append(usage)
-                            
-                            # Immediately submit for evaluation without waiting
-                            eval_future = executor.submit(self.config.evaluator.evaluate_code, new_program.sol_string)
-                            eval_futures.append((eval_future, new_program))
-                        except Exception as e:
-                            self.verbose_info(f"Program generation failed: {str(e)}")
-                            continue
-                    
-                    # Collect evaluation results as they complete
-                    for eval_future, program in eval_futures:
-                        try:
-                            evaluation_res = eval_future.result()
-                            program.evaluation_res = evaluation_res
-                            score_str = "None" if evaluation_res.score is None else f"{evaluation_res.score}"
-                            self.verbose_info(f"Program evaluated - Score: {score_str}")
-                        except Exception as e:
-                            self.verbose_info(f"Program evaluation failed: {str(e)}")
+        # Sampler and evaluator threads shared by all batches
+        sample_fn = self._sample_island_task if self.config.continuous else self._sample_task
+        with self._make_sampling_engine(sample_fn, evaluate_empty=True) as self._sampling_engine:
+            if self.config.continuous:
+                # Every sampler picks its own island and prompts from the live database
+                self._run_continuous(programs_db)
+            else:
+                # Main sampling loop
+                while self.run_state_dict.tot_sample_nums < self.config.max_sample_nums and not self._budget_exhausted():
+                    try:
+                        start_sample = self.run_state_dict.tot_sample_nums + 1
+                        end_sample = self.run_state_dict.tot_sample_nums + self.config.num_samplers
+                        self.verbose_info(
+                            f"Samples {start_sample} - {end_sample} / {self.config.max_sample_nums or 'unlimited'}"
+                        )
+                        
+                        # Get prompt solutions from random island
+                        prompt_solutions, island_id = programs_db.get_prompt_solutions()
+                        if not prompt_solutions:
+                            self.verbose_info("No solutions available for prompting")
                             continue
-                
-                        # Process each evaluated program immediately
-                        # Add ALL programs (valid/invalid) to sol_history
-                        self.run_state_dict.sol_history.append(program)
-                        self.run_state_dict.tot_sample_nums += 1
                         
-                        # Only register valid programs to the database/island
-                        if program.evaluation_res and program.evaluation_res.valid:
-                            programs_db.register_solution(program, island_id)
-                            
-                            score_str = f"{program.evaluation_res.score:.6f}" if program.evaluation_res.score is not None else "None"
-                            self.verbose_info(f"Registered valid program to island {island_id} (score: {score_str})")
-                        else:
-                            self.verbose_info(f"Added invalid program to history (sample {self.run_state_dict.tot_sample_nums})")
-                
-                # Log current best
-                best_solution = programs_db.get_best_solution()
-                if best_solution and best_solution.evaluation_res:
-                    best_score_str = f"{best_solution.evaluation_res.score:.6f}" if best_solution.evaluation_res.score is not None else "None"
-                    self.verbose_info(f"Current best score: {best_score_str}")
-                
-                # Show database statistics periodically
-                if self.run_state_dict.tot_sample_nums % 50 == 0:
-                    stats = programs_db.get_statistics()
-                    self.verbose_info(f"Database stats: {stats['total_programs']} total programs, {stats['num_islands']} islands, best score: {stats['global_best_score']:.6f}")
-                
-                self._save_run_state_dict_with_database(programs_db)
-                
-            except KeyboardInterrupt:
-                self.verbose_info("Interrupted by user")
-                break
-            except Exception as e:
-                self.verbose_info(f"Sampling error: {str(e)}")
-                continue
-        
+                        self.verbose_info(f"Selected {len(prompt_solutions)} solutions from island {island_id}")
+                        baseline_score = self._get_database_best_score(programs_db)
+                        
+                        prompts = [self.config.adapter.get_prompt(prompt_solutions) for _ in range(self.config.num_samplers)]
+                        tasks = [(prompt_content, n, sampler_id, island_id, baseline_score)
+                                 for sampler_id, (prompt_content, n) in enumerate(self._group_prompts(prompts))]
+                        
+                        # Process each evaluated program as soon as it completes; late ones keep their own island
+                        self._run_generation(
+                            lambda: tasks,
+                            lambda result: self._register_program(result, programs_db, *result.task[3:])
+                        )
+                        
+                        self._log_database_progress(programs_db)
+                        self._save_run_state_dict_with_database(programs_db)
+                        
+                    except KeyboardInterrupt:
+                        self.verbose_info("Interrupted by user")
+                        break
+                    except Exception as e:
+                        self.verbose_info(f"Sampling error: {str(e)}")
+                        continue
+
         # Mark as done and save final state with database
         self.run_state_dict.is_done = True
         self._save_run_state_dict_with_database(programs_db)
@@ -179,6 +134,63 @@ class FunSearch(Method):
         final_stats = programs_db.get_statistics()
         self.verbose_info(f"Final stats: {final_stats['total_programs']} programs, best score: {final_stats['global_best_score']:.6f}")
     
+    def _run_continuous(self, programs_db: ProgramsDatabase):
+        """Continuous sampling: the steady-state loop over island tasks, each registering its program to its island"""
+        self._programs_db = programs_db
+
+        def on_generation():
+            # Save and report once per num_samplers programs, as the batch loop does
+            self._log_database_progress(programs_db)
+            self._save_run_state_dict_with_database(programs_db)
+
+        self._run_steady_state(
+            lambda task_index: {'sampler_id': task_index % self.config.num_samplers},
+            lambda result, baseline_score: self._register_program(result, programs_db,
+                                                                   result.task.get('island_id'), baseline_score),
+            best_score=lambda: self._get_database_best_score(programs_db),
+            on_generation=on_generation
+        )
+
+    def _get_database_best_score(self, programs_db: ProgramsDatabase) -> float | None:
+        """Score of the best program in the database, the baseline of new samples"""
+        best_solution = programs_db.get_best_solution()
+        return self._get_best_score([best_solution]) if best_solution else None
+    
+    def _register_program(self, result, programs_db: ProgramsDatabase, island_id: int | None,
+                          baseline_score: float | None):
+        """Add an evaluated program to sol_history and, if valid, to its island"""
+        program = self._collect_sample_result(result, baseline_score=baseline_score)
+        if program is None or result.error is not None:
+            return
+        score_str = "None" if program.evaluation_res.score is None else f"{program.evaluation_res.score}"
+        self.verbose_info(f"Program evaluated - Score: {score_str}")
+        
+        # Add ALL programs (valid/invalid) to sol_history
+        self.run_state_dict.sol_history.append(program)
+        self.run_state_dict.tot_sample_nums += 1
+        
+        # Only register valid programs to the database/island
+        if program.evaluation_res and program.evaluation_res.valid:
+            programs_db.register_solution(program, island_id)
+            
+            score_str = f"{program.evaluation_res.score:.6f}" if program.evaluation_res.score is not None else "None"
+            self.verbose_info(f"Registered valid program to island {island_id} (score: {score_str})")
+        else:
+            self.verbose_info(f"Added invalid program to history (sample {self.run_state_dict.tot_sample_nums})")
+    
+    def _log_database_progress(self, programs_db: ProgramsDatabase):
+        """Log the current best score and, periodically, database statistics"""
+        # Log current best
+        best_solution = programs_db.get_best_solution()
+        if best_solution and best_solution.evaluation_res:
+            best_score_str = f"{best_solution.evaluation_res.score:.6f}" if best_solution.evaluation_res.score is not None else "None"
+            self.verbose_info(f"Current best score: {best_score_str}")
+        
+        # Show database statistics periodically
+        if self.run_state_dict.tot_sample_nums % 50 == 0:
+            stats = programs_db.get_statistics()
+            self.verbose_info(f"Database stats: {stats['total_programs']} total programs, {stats['num_islands']} islands, best score: {stats['global_best_score']:.6f}")
+    
     def _save_run_state_dict_with_database(self, programs_db):
         """Override base method to also save database state"""
         # Save database state first
@@ -189,21 +201,31 @@ class FunSearch(Method):
         # Show database file location
         self.verbose_info(f"Programs database saved to: {self.run_state_dict.database_file}")
     
-    def _generate_single_program(self, prompt_solutions: list[Solution], sampler_id: int) -> tuple[Solution, dict]:
-        """Generate single program variant using LLM based on prompt solutions"""
-        usage = {}
+    def _sample_task(self, task: tuple) -> tuple[list[Solution], dict]:
+        """Sampling engine callback: sample the programs of a (prompt, n, sampler_id, island_id, baseline_score) task"""
+        return self._generate_programs(*task[:3])
+    
+    def _sample_island_task(self, task: dict) -> tuple[list[Solution], dict]:
+        """Continuous-mode sampling engine callback: pick an island and build the prompt from the live database.
+
+        The island is stored in the task, so the program is registered to it.
+        """
+        prompt_solutions, island_id = self._programs_db.get_prompt_solutions()
+        task['island_id'] = island_id
+        if not prompt_solutions:
+            raise ValueError(f"No solutions available for prompting on island {island_id}")
+        prompt_content = self.config.adapter.get_prompt(prompt_solutions)
+        return self._generate_programs(prompt_content, 1, task['sampler_id'])
+    
+    def _generate_programs(self, prompt_content: list[dict], n: int, sampler_id: int) -> tuple[list[Solution], dict]:
+        """Generate n program variants using LLM from one prompt built on the selected solutions"""
         try:
-            # Get prompt from adapter based on selected solutions
-            prompt_content = self.config.adapter.get_prompt(prompt_solutions)
-            
-            response, usage = self.config.running_llm.get_response(prompt_content)
-            
-            new_sol = self.config.adapter.parse_response(response)
-            self.verbose_info(f"Sampler {sampler_id}: Generated a program variant.")
-            return new_sol, usage
+            new_sols, usage = self._sample_solutions(prompt_content, n)
+            self.verbose_info(f"Sampler {sampler_id}: Generated {'a program variant' if n == 1 else f'{n} program variants'}.")
+            return new_sols, usage
         except Exception as e:
             self.verbose_info(f"Sampler {sampler_id}: Failed to generate program - {str(e)}")
-            return Solution(""), {}  # Return usage even if failed
+            return [Solution("") for _ in range(n)], {}
     
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
-        return FunSearchRunStateDict
\ No newline at end of file
+        return FunSearchRunStateDict
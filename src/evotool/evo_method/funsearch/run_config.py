@@ -1,7 +1,9 @@
 from evotool.tools.llm import HttpsApi
 from evotool.task.base_task import BaseEvaluator
 from ..base_config import BaseConfig
-from typing import Optional
+from ..concurrency_autotuner import ConcurrencyAutotuner
+from ..budget import Budget
+from typing import Dict, Optional
 
 
 class FunSearchConfig(BaseConfig):
@@ -17,10 +19,21 @@ class FunSearchConfig(BaseConfig):
             max_population_size: int = 1000,
             num_samplers: int = 5,
             num_evaluators: int = 5,
+            continuous: bool = False,
+            generation_timeout: Optional[float] = None,
+            late_results: str = 'carry',
+            autotuner: Optional[ConcurrencyAutotuner] = None,
+            budget: Optional[Budget] = None,
             programs_per_prompt: int = 2,
+            stream_responses: bool = False,
+            batch_identical_prompts: bool = False,
+            generation_params: Optional[dict] = None,
+            operator_generation_params: Optional[Dict[str, dict]] = None,
+            llm_prices: Optional[Dict[str, dict]] = None,
+            usage_log: bool = False,
             verbose: bool = True
     ):
-        super().__init__(task_info, output_path, verbose)
+        super().__init__(task_info, output_path, verbose, llm_prices, usage_log)
         self.evaluator = evaluator
         self.running_llm = running_llm
         self.adapter = adapter
@@ -29,4 +42,13 @@ class FunSearchConfig(BaseConfig):
         self.max_population_size = max_population_size
         self.num_samplers = num_samplers
         self.num_evaluators = num_evaluators
-        self.programs_per_prompt = programs_per_prompt
\ No newline at end of file
+        self.continuous = continuous
+        self.generation_timeout = generation_timeout
+        self.late_results = late_results
+        self.autotuner = autotuner
+        self.budget = budget
+        self.programs_per_prompt = programs_per_prompt
+        self.stream_responses = stream_responses
+        self.batch_identical_prompts = batch_identical_prompts
+        self.generation_params = generation_params or {}
+        self.operator_generation_params = operator_generation_params or {}
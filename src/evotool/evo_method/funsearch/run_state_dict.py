@@ -1,6 +1,7 @@
 import os
 import json
 from ..base_run_state_dict import BaseRunStateDict
+from ..usage_ledger import UsageLedger
 from evotool.task.base_task import Solution
 
 class FunSearchRunStateDict(BaseRunStateDict):
@@ -18,7 +19,8 @@ class FunSearchRunStateDict(BaseRunStateDict):
         self.sol_history = sol_history or []  # All solutions (valid/invalid)
         self.database_file = database_file  # Path to database JSON file
         self.is_done = is_done
-        self.usage_history = {}
+        self.usage_ledger = UsageLedger()
+        self.straggler_stats = {'deadlines': 0, 'cancelled': 0, 'abandoned': 0, 'carried': 0, 'dropped': 0}  # Batch deadlines and late results
         
     def to_json(self) -> dict:
         """Convert the run state to JSON-serializable dictionary"""
@@ -44,7 +46,8 @@ class FunSearchRunStateDict(BaseRunStateDict):
             'database_file': self.database_file,
             'tot_sample_nums': self.tot_sample_nums,
             'is_done': self.is_done,
-            'usage_history': self.usage_history
+            'usage_ledger': self.usage_ledger.to_json(),
+            'straggler_stats': self.straggler_stats
         }
         
     @classmethod
@@ -78,7 +81,8 @@ class FunSearchRunStateDict(BaseRunStateDict):
             database_file=data.get('database_file'),
             is_done=data.get('is_done', False),
         )
-        instance.usage_history = data.get('usage_history', {})
+        instance.usage_ledger = UsageLedger.from_run_state_json(data)
+        instance.straggler_stats = data.get('straggler_stats', instance.straggler_stats)
         return instance
     
     def save_database_state(self, database_dict: dict, output_path: str) -> None:
@@ -123,4 +127,4 @@ class FunSearchRunStateDict(BaseRunStateDict):
         if not os.path.isabs(database_path):
             database_path = os.path.join(output_path, database_path)
         
-        return os.path.exists(database_path)
\ No newline at end of file
+        return os.path.exists(database_path)
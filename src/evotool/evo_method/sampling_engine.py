@@ -0,0 +1,345 @@
+import time
+import queue
+import itertools
+import threading
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from evotool.task.base_task import Solution, EvaluationResult
+
+
+_STOP = object()
+
+
+class SampleResult:
+    """One evaluated (or failed) candidate coming out of a SamplingEngine.
+
+    :param task_id: Id returned by ``submit`` for the task that produced the candidate.
+    :param task: The submitted task.
+    :param solution: The candidate, with ``evaluation_res`` set if it was evaluated. None if
+        sampling failed or returned no candidate.
+    :param usage: Usage of the LLM call that produced the candidate (shared by all candidates
+        of the same task).
+    :param index: Position of the candidate among the candidates of its task.
+    :param task_done: Whether this is the last result of its task.
+    :param error: The exception raised by sampling or evaluation, if any.
+
+    ``discarded`` is set by callers that decide not to register the result (e.g. a speculative
+    sample whose parents were evicted). ``cancelled`` marks a candidate whose queued evaluation was
+    dropped by ``cancel_pending``.
+    """
+
+    def __init__(self, task_id: int, task: Any, solution: Optional[Solution], usage: Optional[dict],
+                 index: int = 0, task_done: bool = True, error: Optional[BaseException] = None):
+        self.task_id = task_id
+        self.task = task
+        self.solution = solution
+        self.usage = usage
+        self.index = index
+        self.task_done = task_done
+        self.error = error
+        self.discarded = False
+        self.cancelled = False
+
+
+class SamplingEngine:
+    def __init__(self, sample_fn: Callable[[Any], Tuple[List[Solution], dict]],
+                 evaluate_fn: Callable[[str], EvaluationResult], num_samplers: int, num_evaluators: int,
+                 max_queued_tasks: Optional[int] = None, max_queued_evaluations: Optional[int] = None,
+                 evaluate_empty: bool = False, close_timeout: Optional[float] = None,
+                 sampler_limit: Optional[int] = None, evaluator_limit: Optional[int] = None,
+                 observer: Optional[Callable[[str, float, int, bool], None]] = None, name: str = 'SamplingEngine'):
+        """
+        Long-lived sampler and evaluator threads joined by bounded queues.
+
+        ``submit`` hands a task to the samplers, which call ``sample_fn(task) -> (solutions, usage)``;
+        every candidate is queued for the evaluators, which call ``evaluate_fn(sol_string)``. Results
+        come back in completion order through ``next_result``. Both queues are bounded, so a full
+        evaluation queue holds the samplers back and a full task queue blocks ``submit``.
+
+        :param sample_fn: Builds the prompt for a task and samples candidates; runs on sampler threads.
+        :param evaluate_fn: Evaluates a candidate's code; runs on evaluator threads.
+        :param num_samplers: Number of sampler threads (concurrent LLM requests).
+        :param num_evaluators: Number of evaluator threads.
+        :param max_queued_tasks: Tasks waiting for a sampler before ``submit`` blocks; defaults to
+            ``num_samplers``.
+        :param max_queued_evaluations: Candidates waiting for an evaluator before samplers block;
+            defaults to ``2 * num_evaluators``.
+        :param evaluate_empty: Also evaluate candidates whose code is empty.
+        :param close_timeout: Longest time ``close(wait=True)`` waits for each thread; threads still busy
+            after that are abandoned and exit once their current item finishes.
+        :param sampler_limit: Samples allowed in flight at once, at most ``num_samplers``; defaults to
+            ``num_samplers``. Can be changed while running with ``set_limits``.
+        :param evaluator_limit: Evaluations allowed in flight at once, at most ``num_evaluators``; defaults
+            to ``num_evaluators``.
+        :param observer: Called on the worker thread after every sample and evaluation with
+            ``(stage, seconds, items, failed)``; ``stage`` is ``'sample'`` or ``'evaluate'`` and ``items`` the
+            number of candidates produced. A sample fails if ``sample_fn`` raises or returns only empty
+            candidates and no billed tokens; an evaluation fails if ``evaluate_fn`` raises.
+        :param name: Prefix of the thread names.
+        """
+        self.sample_fn = sample_fn
+        self.evaluate_fn = evaluate_fn
+        self.evaluate_empty = evaluate_empty
+        self.close_timeout = close_timeout
+        self.observer = observer
+        self.name = name
+        self.max_queued_tasks = max_queued_tasks or num_samplers
+        self.max_queued_evaluations = max_queued_evaluations or 2 * num_evaluators
+
+        self._cond = threading.Condition()
+        self._task_queue = queue.Queue()
+        self._eval_queue = queue.Queue()
+        self._result_queue = queue.Queue()
+        self._queued_tasks = 0
+        self._queued_evaluations = 0
+        self._remaining = {}  # task_id -> results still to deliver (None until sampled)
+        self._ids = itertools.count()
+        self._closed = False
+        self.sampler_limit = min(sampler_limit or num_samplers, num_samplers)
+        self.evaluator_limit = min(evaluator_limit or num_evaluators, num_evaluators)
+        self._active_samples = 0
+        self._active_evaluations = 0
+
+        self._samplers = [self._start_thread(self._sampler_loop, f'{name}-sampler-{i}')
+                          for i in range(num_samplers)]
+        self._evaluators = [self._start_thread(self._evaluator_loop, f'{name}-evaluator-{i}')
+                            for i in range(num_evaluators)]
+
+    def _start_thread(self, target, name: str) -> threading.Thread:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def __enter__(self) -> 'SamplingEngine':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Abandon running work when leaving on an exception (e.g. KeyboardInterrupt)
+        self.close(wait=exc_type is None)
+
+    @property
+    def in_flight(self) -> int:
+        """Tasks submitted whose results have not all been delivered yet."""
+        with self._cond:
+            return len(self._remaining)
+
+    @property
+    def num_samplers(self) -> int:
+        return len(self._samplers)
+
+    @property
+    def num_evaluators(self) -> int:
+        return len(self._evaluators)
+
+    def set_limits(self, samplers: Optional[int] = None, evaluators: Optional[int] = None) -> None:
+        """Change the in-flight limits of the two stages, clamped to between 1 and the number of threads.
+
+        Lowering a limit lets running items finish; no new item starts until the stage is under the limit.
+        """
+        with self._cond:
+            if samplers is not None:
+                self.sampler_limit = max(1, min(samplers, self.num_samplers))
+            if evaluators is not None:
+                self.evaluator_limit = max(1, min(evaluators, self.num_evaluators))
+            self._cond.notify_all()
+
+    def submit(self, task: Any, block: bool = True, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Queue a task for the samplers.
+
+        :return: The task id, or None if the task queue stayed full (``block=False`` or ``timeout``).
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f'{self.name} is closed')
+            if not self._cond.wait_for(lambda: self._queued_tasks < self.max_queued_tasks,
+                                       timeout if block else 0):
+                return None
+            task_id = next(self._ids)
+            self._queued_tasks += 1
+            self._remaining[task_id] = None
+        self._task_queue.put((task_id, task))
+        return task_id
+
+    def next_result(self, timeout: Optional[float] = None) -> Optional[SampleResult]:
+        """The next finished result in completion order, or None if none arrived within ``timeout``."""
+        try:
+            return self._result_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run_batch(self, tasks: Iterable[Any], on_result: Callable[[SampleResult], None]) -> None:
+        """Submit ``tasks`` and pass every result to ``on_result`` on the calling thread until all are done."""
+        pending = {self.submit(task) for task in tasks}
+        while pending:
+            result = self.next_result()
+            if result.task_done:
+                pending.discard(result.task_id)
+            on_result(result)
+
+    def cancel_pending(self, evaluations: bool = True) -> List[Tuple[int, Any]]:
+        """Drop the tasks and candidates still waiting in the queues; running work is not interrupted.
+
+        :param evaluations: Also drop sampled candidates waiting for an evaluator; they are delivered
+            with an error.
+        :return: ``(task_id, task)`` of the tasks that had not reached a sampler.
+        """
+        cancelled = []
+        while True:
+            try:
+                item = self._task_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._task_queue.put(item)
+                break
+            task_id, task = item
+            cancelled.append((task_id, task))
+            with self._cond:
+                self._queued_tasks -= 1
+                self._remaining.pop(task_id, None)
+                self._cond.notify_all()
+        while evaluations:
+            try:
+                item = self._eval_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._eval_queue.put(item)
+                break
+            with self._cond:
+                self._queued_evaluations -= 1
+                self._cond.notify_all()
+            result = SampleResult(*item[:5], error=RuntimeError('evaluation cancelled'))
+            result.cancelled = True
+            self._deliver(result)
+        return cancelled
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the engine. Queued work is cancelled.
+
+        :param wait: Wait for running samples and their evaluations to finish (at most ``close_timeout``
+            per thread); otherwise the threads finish their current item in the background and exit.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self.cancel_pending()
+        for _ in self._samplers:
+            self._task_queue.put(_STOP)
+        if wait:
+            for thread in self._samplers:
+                thread.join(self.close_timeout)
+        for _ in self._evaluators:
+            self._eval_queue.put(_STOP)
+        if wait:
+            for thread in self._evaluators:
+                thread.join(self.close_timeout)
+
+    def _deliver(self, result: SampleResult) -> None:
+        with self._cond:
+            remaining = self._remaining.get(result.task_id)
+            if remaining is None or remaining <= 1:
+                self._remaining.pop(result.task_id, None)
+                result.task_done = True
+            else:
+                self._remaining[result.task_id] = remaining - 1
+                result.task_done = False
+        self._result_queue.put(result)
+
+    def _acquire_slot(self, stage: str) -> None:
+        """Wait until the stage is under its in-flight limit (or the engine closes) and take a slot"""
+        with self._cond:
+            if stage == 'sample':
+                self._cond.wait_for(lambda: self._closed or self._active_samples < self.sampler_limit)
+                self._active_samples += 1
+            else:
+                self._cond.wait_for(lambda: self._closed or self._active_evaluations < self.evaluator_limit)
+                self._active_evaluations += 1
+
+    def _release_slot(self, stage: str) -> None:
+        with self._cond:
+            if stage == 'sample':
+                self._active_samples -= 1
+            else:
+                self._active_evaluations -= 1
+            self._cond.notify_all()
+
+    def _observe(self, stage: str, start: float, items: int, failed: bool) -> None:
+        if self.observer is None:
+            return
+        # A failing observer must not lose the result or end the worker thread
+        try:
+            self.observer(stage, time.monotonic() - start, items, failed)
+        except Exception as e:
+            print(f"{self.name}: observer failed on {stage} - {e}")
+
+    def _sampler_loop(self) -> None:
+        while True:
+            self._acquire_slot('sample')
+            try:
+                item = self._task_queue.get()
+                if item is _STOP:
+                    return
+                self._sample(*item)
+            finally:
+                self._release_slot('sample')
+
+    def _sample(self, task_id: int, task: Any) -> None:
+        with self._cond:
+            self._queued_tasks -= 1
+            self._cond.notify_all()
+        start = time.monotonic()
+        try:
+            solutions, usage = self.sample_fn(task)
+        except Exception as e:
+            self._observe('sample', start, 0, True)
+            self._deliver(SampleResult(task_id, task, None, None, error=e))
+            return
+        # Methods turn LLM errors into empty candidates without billed tokens
+        self._observe('sample', start, len(solutions or []),
+                      not (usage or {}).get('total_tokens')
+                      and not any(solution.sol_string.strip() for solution in solutions or []))
+        if not solutions:
+            self._deliver(SampleResult(task_id, task, None, usage))
+            return
+        with self._cond:
+            self._remaining[task_id] = len(solutions)
+        for index, solution in enumerate(solutions):
+            if not (self.evaluate_empty or solution.sol_string.strip()):
+                self._deliver(SampleResult(task_id, task, solution, usage, index))
+                continue
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._queued_evaluations < self.max_queued_evaluations
+                )
+                self._queued_evaluations += 1
+            self._eval_queue.put((task_id, task, solution, usage, index))
+
+    def _evaluator_loop(self) -> None:
+        while True:
+            self._acquire_slot('evaluate')
+            try:
+                item = self._eval_queue.get()
+                if item is _STOP:
+                    return
+                self._evaluate(*item)
+            finally:
+                self._release_slot('evaluate')
+
+    def _evaluate(self, task_id: int, task: Any, solution: Solution, usage: Optional[dict], index: int) -> None:
+        with self._cond:
+            self._queued_evaluations -= 1
+            self._cond.notify_all()
+        start = time.monotonic()
+        try:
+            solution.evaluation_res = self.evaluate_fn(solution.sol_string)
+        except Exception as e:
+            self._observe('evaluate', start, 1, True)
+            self._deliver(SampleResult(task_id, task, solution, usage, index, error=e))
+            return
+        self._observe('evaluate', start, 1, False)
+        self._deliver(SampleResult(task_id, task, solution, usage, index))
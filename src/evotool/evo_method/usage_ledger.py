@@ -0,0 +1,205 @@
+import json
+import time
+import threading
+from typing import Dict, List, Optional
+
+
+# Token counters summed by the ledger
+TOKEN_FIELDS = ('prompt_tokens', 'completion_tokens', 'total_tokens')
+# Counters of responses replayed by a CachedLlm, which cost nothing and stay out of the token totals
+CACHED_FIELDS = ('cached_calls', 'cached_tokens')
+
+
+class UsageLedger:
+    """Running LLM usage totals of a run, grouped by stage, operator and model.
+
+    Replaces the per-call ``usage_history`` lists of the run states: only the totals
+    are saved with ``run_state.json``, while raw per-call records can go to an
+    append-only JSONL side log. Costs are computed from the price table at query
+    time, so prices can be set or corrected when a run is resumed.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, dict]] = None, log_path: Optional[str] = None):
+        """
+        :param prices: Price table ``{model: {'prompt': usd, 'completion': usd}}`` in USD per million
+            tokens. Models without an entry cost nothing.
+        :param log_path: Optional JSONL file that every recorded usage dict is appended to.
+        """
+        self.prices = prices or {}
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._totals: Dict[tuple, dict] = {}
+        self._solutions = 0
+        self._valid_solutions = 0
+        self._elapsed = 0.0
+        self._evaluator_seconds = 0.0
+        self._session_start = time.monotonic()
+
+    def configure(self, prices: Optional[Dict[str, dict]] = None, log_path: Optional[str] = None) -> None:
+        """Set the price table and side log of a ledger loaded from a run state."""
+        if prices is not None:
+            self.prices = prices
+        self.log_path = log_path
+
+    def record(self, usage: Optional[dict], stage: str = 'sample', operator: Optional[str] = None,
+               model: Optional[str] = None) -> None:
+        """
+        Add the usage of one LLM call.
+
+        :param usage: The usage dict returned with the response. A ``model`` key overrides ``model``;
+            usage of a CascadeLlm is split over the models of its tiers. Usage flagged ``cached``
+            (and the ``cached_usage`` of a partly cached call) was replayed by a CachedLlm: it only
+            goes to the cached counters, not to the tokens, cost and budgets.
+        :param stage: The stage of the run (``sample`` for the evolutionary methods).
+        :param operator: The operator the call was made for, if any.
+        :param model: The model that served the call, if the usage does not say.
+        """
+        usage = usage or {}
+        if usage.get('tiers'):
+            parts = [(tier.get('usage') or {}, tier.get('model')) for tier in usage['tiers']]
+        else:
+            parts = [(usage, usage.get('model') or model)]
+        with self._lock:
+            for part, part_model in parts:
+                key = (stage, operator, part_model or 'unknown')
+                totals = self._totals.get(key)
+                if totals is None:
+                    totals = self._totals[key] = dict(
+                        {field: 0 for field in TOKEN_FIELDS + CACHED_FIELDS}, calls=0
+                    )
+                replayed = [part.get('cached_usage') or {}]
+                if part.get('cached') or usage.get('cached'):
+                    totals['cached_calls'] = totals.get('cached_calls', 0) + 1
+                    replayed.append(part)
+                else:
+                    totals['calls'] += 1
+                    for field in TOKEN_FIELDS:
+                        value = part.get(field)
+                        if isinstance(value, (int, float)):
+                            totals[field] += value
+                for replayed_part in replayed:
+                    value = replayed_part.get('total_tokens')
+                    if isinstance(value, (int, float)):
+                        totals['cached_tokens'] = totals.get('cached_tokens', 0) + value
+            if self.log_path:
+                record = {'time': time.time(), 'stage': stage, 'operator': operator,
+                          'model': usage.get('model') or model, 'usage': usage}
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + '\n')
+
+    def record_solution(self, valid: bool) -> None:
+        """Count an evaluated candidate, for ``cost_per_valid_solution``."""
+        with self._lock:
+            self._solutions += 1
+            self._valid_solutions += int(bool(valid))
+
+    def record_evaluation(self, seconds: float) -> None:
+        """Add the duration of one evaluation."""
+        with self._lock:
+            self._evaluator_seconds += seconds
+
+    def _cost(self, model: str, totals: dict) -> float:
+        price = self.prices.get(model)
+        if not price:
+            return 0.0
+        return (totals['prompt_tokens'] * price.get('prompt', 0.0)
+                + totals['completion_tokens'] * price.get('completion', 0.0)) / 1e6
+
+    def totals(self, stage: Optional[str] = None, operator: Optional[str] = None,
+               model: Optional[str] = None) -> dict:
+        """Calls, tokens and cost summed over the entries matching the given stage/operator/model."""
+        result = dict({field: 0 for field in TOKEN_FIELDS + CACHED_FIELDS}, calls=0, cost=0.0)
+        with self._lock:
+            for (entry_stage, entry_operator, entry_model), totals in self._totals.items():
+                if ((stage is not None and entry_stage != stage)
+                        or (operator is not None and entry_operator != operator)
+                        or (model is not None and entry_model != model)):
+                    continue
+                for field in ('calls',) + TOKEN_FIELDS:
+                    result[field] += totals[field]
+                for field in CACHED_FIELDS:
+                    result[field] += totals.get(field, 0)
+                result['cost'] += self._cost(entry_model, totals)
+        return result
+
+    def breakdown(self, by: str = 'model') -> Dict[str, dict]:
+        """Totals grouped by ``stage``, ``operator`` or ``model``."""
+        index = ('stage', 'operator', 'model').index(by)
+        with self._lock:
+            keys = {key[index] for key in self._totals}
+        return {str(key): self.totals(**{by: key}) for key in keys}
+
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock seconds the run has been active, summed over resumed sessions."""
+        return self._elapsed + time.monotonic() - self._session_start
+
+    @property
+    def evaluator_seconds(self) -> float:
+        """Seconds spent evaluating candidates, summed over concurrent evaluations and resumed sessions."""
+        with self._lock:
+            return self._evaluator_seconds
+
+    def tokens_per_second(self) -> float:
+        return self.totals()['total_tokens'] / max(self.elapsed, 1e-9)
+
+    def cost_per_valid_solution(self) -> Optional[float]:
+        """Total cost divided by the number of valid candidates, or None before the first one."""
+        with self._lock:
+            valid = self._valid_solutions
+        return self.totals()['cost'] / valid if valid else None
+
+    def summary(self) -> dict:
+        totals = self.totals()
+        with self._lock:
+            solutions, valid = self._solutions, self._valid_solutions
+        return dict(
+            totals,
+            elapsed=self.elapsed,
+            evaluator_seconds=self.evaluator_seconds,
+            tokens_per_second=self.tokens_per_second(),
+            solutions=solutions,
+            valid_solutions=valid,
+            cost_per_valid_solution=totals['cost'] / valid if valid else None,
+        )
+
+    def to_json(self) -> dict:
+        with self._lock:
+            totals = [dict(stage=stage, operator=operator, model=model, **entry)
+                      for (stage, operator, model), entry in self._totals.items()]
+            return {
+                'totals': totals,
+                'solutions': self._solutions,
+                'valid_solutions': self._valid_solutions,
+                'elapsed': self.elapsed,
+                'evaluator_seconds': self._evaluator_seconds,
+            }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'UsageLedger':
+        ledger = cls()
+        for entry in data.get('totals', []):
+            entry = dict(entry)
+            key = (entry.pop('stage'), entry.pop('operator'), entry.pop('model'))
+            ledger._totals[key] = entry
+        ledger._solutions = data.get('solutions', 0)
+        ledger._valid_solutions = data.get('valid_solutions', 0)
+        ledger._elapsed = data.get('elapsed', 0.0)
+        ledger._evaluator_seconds = data.get('evaluator_seconds', 0.0)
+        return ledger
+
+    @classmethod
+    def from_usage_history(cls, usage_history: Dict[str, List[dict]]) -> 'UsageLedger':
+        """Build a ledger from the ``usage_history`` lists saved by earlier versions (stage -> usages)."""
+        ledger = cls()
+        for stage, usages in (usage_history or {}).items():
+            for usage in usages:
+                ledger.record(usage, stage=stage)
+        return ledger
+
+    @classmethod
+    def from_run_state_json(cls, data: dict) -> 'UsageLedger':
+        """The ledger stored in a run state JSON, migrated from ``usage_history`` if needed."""
+        if 'usage_ledger' in data:
+            return cls.from_json(data['usage_ledger'])
+        return cls.from_usage_history(data.get('usage_history'))
@@ -2,4 +2,5 @@ from .base_evaluator import BaseEvaluator, Solution, EvaluationResult
 from .es_1p1_adapter import Es1p1Adapter
 from .funsearch_adapter import FunSearchAdapter
 from .eoh_adapter import EohAdapter
-from .evoengineer_adapter import EvoEngineerAdapter, Operator
\ No newline at end of file
+from .evoengineer_adapter import EvoEngineerAdapter, Operator
+from .stream_parser import StreamParser, CodeBlockStreamParser, SchemaStreamParser
@@ -1,6 +1,7 @@
 import abc
 from abc import abstractmethod
 from .base_evaluator import Solution
+from .stream_parser import StreamParser
 
 
 class BaseAdapter(abc.ABC):
@@ -27,4 +28,18 @@ class BaseAdapter(abc.ABC):
 
     @abstractmethod
     def parse_response(self, response_str: str) -> Solution:
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    def make_stream_parser(self) -> StreamParser | None:
+        """Create an incremental parser that tells a streaming LLM client when the answer is complete.
+
+        Returns None if responses of this adapter cannot be terminated early.
+        """
+        return None
+
+    def get_generation_params(self, operator_name: str | None = None) -> dict:
+        """Generation parameters (max_tokens, stop, top_p, seed, response_format, ...) for an operator.
+
+        Config-level settings override these; an empty dict leaves the LLM defaults unchanged.
+        """
+        return {}
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 from .base_evaluator import Solution
 from .base_adapter import BaseAdapter
+from .stream_parser import StreamParser, CodeBlockStreamParser
 
 
 class EohAdapter(BaseAdapter):
@@ -15,6 +16,10 @@ class EohAdapter(BaseAdapter):
         init_sol = self.make_init_sol_wo_other_info()
         init_sol.other_info = other_info
         return init_sol
+
+    def make_stream_parser(self) -> StreamParser:
+        """The answer is complete once the code block after the algorithm description closes"""
+        return CodeBlockStreamParser()
     
     @abstractmethod
     def get_prompt_i1(self) -> List[dict]:
@@ -39,4 +44,4 @@ class EohAdapter(BaseAdapter):
     @abstractmethod
     def get_prompt_m2(self, individual: Solution) -> List[dict]:
         """Generate M2 (parameter mutation) prompt"""
-        pass
\ No newline at end of file
+        pass
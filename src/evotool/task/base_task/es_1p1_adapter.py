@@ -4,6 +4,7 @@ from abc import abstractmethod
 
 from .base_evaluator import Solution, EvaluationResult
 from .base_adapter import BaseAdapter
+from .stream_parser import StreamParser, CodeBlockStreamParser
 
 
 
@@ -15,6 +16,10 @@ class Es1p1Adapter(BaseAdapter):
     def make_init_sol(self) -> Solution:
         return self.make_init_sol_wo_other_info()
 
+    def make_stream_parser(self) -> StreamParser:
+        """The answer is complete once the proposed code block closes"""
+        return CodeBlockStreamParser()
+
     @abstractmethod
     def get_prompt(self, best_sol:Solution) -> List[dict]:
         raise NotImplementedError()
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 from .base_evaluator import Solution
 from .base_adapter import BaseAdapter
+from .stream_parser import StreamParser, SchemaStreamParser
 
 
 class Operator:
@@ -23,6 +24,10 @@ class EvoEngineerAdapter(BaseAdapter):
         init_sol = self.make_init_sol_wo_other_info()
         init_sol.other_info = other_info
         return init_sol
+
+    def make_stream_parser(self) -> StreamParser:
+        """The answer is complete once the name/code/thought schema has been received"""
+        return SchemaStreamParser()
     
     @abstractmethod
     def get_init_operators(self) -> List[Operator]:
@@ -44,4 +49,4 @@ class EvoEngineerAdapter(BaseAdapter):
             **kwargs: Additional operator-specific parameters
             :param current_best_sol:
         """
-        pass
\ No newline at end of file
+        pass
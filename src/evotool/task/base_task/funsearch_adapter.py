@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List
 from .base_evaluator import Solution
 from .base_adapter import BaseAdapter
+from .stream_parser import StreamParser, CodeBlockStreamParser
 
 
 
@@ -13,6 +14,10 @@ class FunSearchAdapter(BaseAdapter):
 
     def make_init_sol(self) -> Solution:
         return self.make_init_sol_wo_other_info()
+
+    def make_stream_parser(self) -> StreamParser:
+        """The answer is complete once the proposed code block closes"""
+        return CodeBlockStreamParser()
     
     @abstractmethod
     def get_prompt(self, solutions: List[Solution]) -> List[dict]:
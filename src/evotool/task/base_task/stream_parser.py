@@ -0,0 +1,129 @@
+import re
+
+
+class StreamParser:
+    """Incremental parser fed with response chunks while an LLM response is streamed.
+
+    ``feed`` returns True once the response received so far already contains a
+    complete answer, which lets the LLM client cancel the rest of the generation.
+    Subclasses either implement ``is_complete`` on the whole text or override
+    ``feed`` to look only at what is new.
+    """
+
+    def __init__(self):
+        self.text = ""
+
+    def reset(self) -> None:
+        """Forget everything fed so far (the client calls this before retrying a request)"""
+        self.text = ""
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        return self.is_complete(self.text)
+
+    def is_complete(self, text: str) -> bool:
+        return False
+
+
+class _FencedBlocks:
+    """Finds closed fenced code blocks in a growing text, scanning every character about once."""
+
+    _closing_fence = re.compile(r'\n\s*```')
+
+    def __init__(self):
+        self.blocks = []  # (start of the opening fence, end of the closing fence)
+        self._open = None  # Start of the opening fence and of the block's body, while inside a block
+        self._pos = 0
+
+    def advance(self, text: str) -> None:
+        while True:
+            if self._open is None:
+                start = text.find('```', self._pos)
+                if start < 0:
+                    # A fence may be split over two chunks
+                    self._pos = max(self._pos, len(text) - 2)
+                    return
+                body = text.find('\n', start + 3)
+                if body < 0:
+                    self._pos = start
+                    return
+                self._open = (start, body + 1)
+                self._pos = body + 1
+            match = self._closing_fence.search(text, self._pos)
+            if match is None:
+                # A closing fence can only start at the last newline or later
+                self._pos = max(self._pos, text.rfind('\n', self._pos))
+                return
+            self.blocks.append((self._open[0], match.end()))
+            self._open = None
+            self._pos = match.end()
+
+
+class CodeBlockStreamParser(StreamParser):
+    """Complete as soon as the first fenced code block has been closed.
+
+    The adapters' ``parse_response`` take the longest of all code blocks, which is only known once the
+    response ends. A response that opens with a short snippet (a signature, an example) is therefore cut
+    after the snippet, so ``stream_responses`` suits prompts that ask for the answer in a single block.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._blocks = _FencedBlocks()
+
+    def reset(self) -> None:
+        super().reset()
+        self._blocks = _FencedBlocks()
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        self._blocks.advance(self.text)
+        return bool(self._blocks.blocks)
+
+    def is_complete(self, text: str) -> bool:
+        return type(self)().feed(text)
+
+
+class SchemaStreamParser(StreamParser):
+    """Complete once a ``name`` / ``code`` / ``thought`` answer has been fully received.
+
+    The thought is the last field of the schema, so it is considered finished at
+    the first blank line after it. A response wrapped in a single ```json block is
+    complete when that block closes. The code is the first block after ``code``, so
+    as with CodeBlockStreamParser a short snippet there ends the answer early.
+    """
+
+    _code_label = re.compile(r'(?:code|Code|CODE)\s*:?\s*\Z')
+    _name_label = re.compile(r'name|Name|NAME')
+    _thought = re.compile(r'(?:thought|Thought|THOUGHT)\s*:?\s*\S[^\n]*\n\s*\n')
+
+    def __init__(self):
+        super().__init__()
+        self.reset()
+
+    def reset(self) -> None:
+        super().reset()
+        self._blocks = _FencedBlocks()
+        self._checked_blocks = 0
+        self._code_end = None  # End of the code block labelled ``code`` after a ``name``
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        text = self.text
+        self._blocks.advance(text)
+        blocks = self._blocks.blocks
+        if blocks and not text[:blocks[0][0]].strip() and text.startswith('```json', blocks[0][0]):
+            return True
+        for start, end in blocks[self._checked_blocks:] if self._code_end is None else []:
+            self._checked_blocks += 1
+            label = self._code_label.search(text, max(0, start - 64), start)
+            if label is not None and self._name_label.search(text, 0, label.start()):
+                self._code_end = end
+                break
+        # Only the text after the code block is searched, and only when a line has ended
+        if self._code_end is None or '\n' not in chunk:
+            return False
+        return self._thought.search(text, self._code_end) is not None
+
+    def is_complete(self, text: str) -> bool:
+        return type(self)().feed(text)
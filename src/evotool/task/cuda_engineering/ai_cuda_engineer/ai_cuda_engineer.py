@@ -3,19 +3,23 @@ import time
 from typing import Type
 
 import numpy as np
-from concurrent import futures
 
 from evotool.evo_method.base_run_state_dict import BaseRunStateDict
+from evotool.evo_method.sampling_engine import SamplingEngine
+from evotool.task.base_task import Solution, EvaluationResult
 from .prompt_maker import PromptMaker
 from .response_parser import ResponseParser
 from .run_state_dict import AiCudaEngineerRunStateDict
 from .run_config import AiCudaEngineerConfig
 from evotool.evo_method.base_method import Method
+from evotool.tools.llm_portfolio import LlmPortfolio
 
 class AiCudaEngineer(Method):
     def __init__(self, config:AiCudaEngineerConfig):
         super().__init__(config)
-
+        self.evo_portfolio = LlmPortfolio(
+            config.evo_llm_list, strategy=config.portfolio_strategy, cost=config.portfolio_cost
+        ) if config.use_llm_portfolio else None
 
     def run(self, hist_best_kernel_list):
         self.verbose_title("AI CUDA ENGINEER STARTED")
@@ -41,13 +45,12 @@ class AiCudaEngineer(Method):
             error_msg = None
             error_restart = 0
             convert_success = False
-            self.run_state_dict.usage_history["0"] = []
             self.verbose_info("Converting the function into functional code...")
             while not convert_success:
                 convert_prompt = PromptMaker.make_convert_prompt(self.run_state_dict.task_info["org_py_code"], parsed_convert_response, error_msg)
                 convert_response, convert_usage = self.config.conversion_llm.get_response(convert_prompt)
                 parsed_convert_response = ResponseParser.parse_convert_response(convert_response)
-                self.run_state_dict.usage_history["0"].append(convert_usage)
+                self._record_usage(convert_usage, stage="0", llm=self.config.conversion_llm)
                 convert_result_dict = self.config.evaluator.compare_py_code_sandbox(self.run_state_dict.task_info["org_py_code"], parsed_convert_response)
                 convert_success, error_msg = convert_result_dict["correctness"], convert_result_dict["error_msg"]
 
@@ -84,7 +87,6 @@ class AiCudaEngineer(Method):
             error_msg = None
             error_summary = None
             error_restart = 0
-            self.run_state_dict.usage_history["1"] = []
             while not translate_success:
                 if error_msg is not None:
                     error_summary_prompt = PromptMaker.make_translate_error_summary_prompt(
@@ -93,14 +95,14 @@ class AiCudaEngineer(Method):
                         error_msg
                     )
                     error_summary, error_summary_usage = self.config.translation_llm.get_response(error_summary_prompt)
-                    self.run_state_dict.usage_history["1"].append(error_summary_usage)
+                    self._record_usage(error_summary_usage, "error_summary", stage="1", llm=self.config.translation_llm)
                 cuda_code_prompt = PromptMaker.make_translate_prompt(
                     self.run_state_dict.task_info["func_py_code"],
                     parsed_translate_response,
                     error_msg,
                     error_summary)
                 translate_response, translate_usage = self.config.translation_llm.get_response(cuda_code_prompt)
-                self.run_state_dict.usage_history["1"].append(translate_usage)
+                self._record_usage(translate_usage, "translate", stage="1", llm=self.config.translation_llm)
                 parsed_translate_response = ResponseParser.parse_translate_response(translate_response)
                 evaluate_cuda_dict = self.config.evaluator.compare_func_cuda_sandbox(
                     self.run_state_dict.task_info["func_py_code"], parsed_translate_response
@@ -148,49 +150,47 @@ class AiCudaEngineer(Method):
         if len(self.run_state_dict.optimization_history) == 0:
             self.run_state_dict.optimization_history.append(self.run_state_dict.task_info["cuda_info"])
             self._save_run_state_dict()
-        if "2" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["2"] = []
-
-        for gen_i in range(self.run_state_dict.evo_gen_i, 10):
-            self.verbose_gen(f"Gen {gen_i + 1}")
-            top_5_kernel = self._get_valid_top_5_from_slow_to_fast(self.run_state_dict.optimization_history)
-            best_kernel = self._get_best_valid_kernel(self.run_state_dict.optimization_history)
-            
-            # Use best kernel or baseline for optimization
-            cuda_individual = best_kernel if best_kernel else self.run_state_dict.task_info["cuda_info"]
-
-            # Parallel processing with evo_llm_list
-            llm_list_len = len(self.config.evo_llm_list)
-            
-            with futures.ThreadPoolExecutor(max_workers=llm_list_len) as executor:
-                # Submit tasks to each LLM - each thread handles both propose AND evaluate
-                future_to_index = {}
-                for i in range(llm_list_len):
-                    future = executor.submit(self._process_llm_proposal_and_evaluate, i, top_5_kernel, cuda_individual)
-                    future_to_index[future] = i
-                
-                # Collect completed proposal+evaluation results
-                for future in futures.as_completed(future_to_index):
-                    i = future_to_index[future]
-                    try:
-                        new_entry, usage = future.result()
-                        self.run_state_dict.usage_history["2"].append(usage)
-                        if new_entry is not None:
-                            self.run_state_dict.optimization_history.append(new_entry)
-                            runtime_str = f"{new_entry['runtime']:.4f} ms" if new_entry['runtime'] is not None else "Failed"
-                            self.verbose_info(f"LLM {i}: {new_entry['name']}, runtime: {runtime_str}, temp_str: {new_entry['temp_str']}")
-                        else:
-                            self.verbose_info(f"LLM {i}: Failed to generate valid proposal")
-
-                    except Exception as e:
-                        self.verbose_info(f"LLM {i}: Error processing proposal - {str(e)}")
-
-            # Update generation info
-            self.run_state_dict.evo_gen_i = gen_i + 1
-            
-            self.verbose_info(f"Generation {gen_i + 1} completed. Total entries: {len(self.run_state_dict.optimization_history)}")
-            
-            self._save_run_state_dict()
+
+        llm_list_len = len(self.config.evo_llm_list)
+        if self.run_state_dict.evo_sample_i == 0 and self.run_state_dict.evo_gen_i > 0:
+            # Run state saved by the generational loop
+            self.run_state_dict.evo_sample_i = self.run_state_dict.evo_gen_i * llm_list_len
+
+        # Proposals keep num_proposers (or the autotuned limit) LLM requests in flight; each one is built against the kernels
+        # known when it is issued, so the next proposals start while earlier kernels are benchmarked
+        with self._make_kernel_engine() as engine:
+            pending = 0
+            issued = self.run_state_dict.evo_sample_i
+            while True:
+                while (pending < engine.sampler_limit
+                       and self.run_state_dict.evo_sample_i + pending < self.config.evo_sample_nums
+                       and not self._budget_exhausted()):
+                    engine.submit(self._make_evo_task(issued % llm_list_len))
+                    issued += 1
+                    pending += 1
+                if pending == 0:
+                    break
+
+                result = engine.next_result()
+                pending -= 1
+                llm_index, best_kernel = result.task[1], result.task[3]
+                new_entry = self._make_kernel_entry(result)
+                self._record_usage(result.usage, stage="2", llm=self.config.evo_llm_list[llm_index])
+                self.run_state_dict.usage_ledger.record_solution(new_entry["runtime"] is not None)
+                if self.evo_portfolio is not None:
+                    self._report_portfolio_outcome(new_entry, result.usage, best_kernel)
+                self.run_state_dict.optimization_history.append(new_entry)
+                runtime_str = f"{new_entry['runtime']:.4f} ms" if new_entry['runtime'] is not None else "Failed"
+                self.verbose_info(f"LLM {llm_index}: {new_entry['name']}, runtime: {runtime_str}, temp_str: {new_entry['temp_str']}")
+
+                # Update progress; a generation is one proposal per evo LLM
+                self.run_state_dict.evo_sample_i += 1
+                if self.run_state_dict.evo_sample_i % llm_list_len == 0:
+                    self.run_state_dict.evo_gen_i = self.run_state_dict.evo_sample_i // llm_list_len
+                    self.verbose_gen(f"Gen {self.run_state_dict.evo_gen_i}")
+                    self.verbose_info(f"Generation {self.run_state_dict.evo_gen_i} completed. Total entries: {len(self.run_state_dict.optimization_history)}")
+
+                self._save_run_state_dict()
 
         self.run_state_dict.run_stage = "3"
         self._save_run_state_dict()
@@ -199,13 +199,22 @@ class AiCudaEngineer(Method):
         assert isinstance(self.config, AiCudaEngineerConfig)
 
         self.verbose_stage("Stage 4: RAG Evolving the cuda code")
+        if self._budget_exhausted():
+            self.run_state_dict.run_stage = "4"
+            self.run_state_dict.is_done = True
+            self._save_run_state_dict()
+            return
         embedding_llm = self.config.embedding_llm
         if hist_best_kernel_list:
-            embedding_database_list = [embedding_llm.get_embedding(term["task_info"]["func_py_code"]) for term in
-                                       hist_best_kernel_list]
-            current_embedding = embedding_llm.get_embedding(
-                self.run_state_dict.task_info["func_py_code"]
-            )
+            texts = ([term["task_info"]["func_py_code"] for term in hist_best_kernel_list]
+                     + [self.run_state_dict.task_info["func_py_code"]])
+            if hasattr(embedding_llm, "get_embeddings"):
+                # One batched (and cached) call for the history plus the current task
+                all_embeddings = embedding_llm.get_embeddings(texts)
+            else:
+                all_embeddings = [embedding_llm.get_embedding(text) for text in texts]
+            embedding_database_list = all_embeddings[:-1]
+            current_embedding = all_embeddings[-1]
 
             embedding_database_list = np.array(embedding_database_list)  # N x 1536
             current_embedding = np.array(current_embedding)[np.newaxis, :]  # 1 x 1536
@@ -223,41 +232,7 @@ class AiCudaEngineer(Method):
         best_kernel = self._get_best_valid_kernel(self.run_state_dict.optimization_history)
         cuda_individual = best_kernel if best_kernel else self.run_state_dict.task_info["cuda_info"]
         
-        if "3" not in self.run_state_dict.usage_history:
-            self.run_state_dict.usage_history["3"] = []
-
         RAG_TIMES = 5
-        # Parallel processing with rag_llm for RAG evolution
-        
-        with futures.ThreadPoolExecutor(max_workers=RAG_TIMES) as executor:
-            # Submit RAG_TIMES tasks - each thread handles both RAG propose AND evaluate
-            future_to_index = {}
-            for i in range(RAG_TIMES):
-                future = executor.submit(self._process_rag_proposal_and_evaluate, i, similar_codes, cuda_individual)
-                future_to_index[future] = i
-            
-            # Collect completed RAG proposal+evaluation results
-            for future in futures.as_completed(future_to_index):
-                i = future_to_index[future]
-                try:
-                    new_entry, usage = future.result()
-                    self.run_state_dict.usage_history["3"].append(usage)
-                    if new_entry is not None:
-                        self.run_state_dict.optimization_history.append(new_entry)
-                        runtime_str = f"{new_entry['runtime']:.4f} ms" if new_entry['runtime'] is not None else "Failed"
-                        self.verbose_info(f"RAG {i}: {new_entry['name']}, runtime: {runtime_str}, temp_str: {new_entry['temp_str']}")
-                    else:
-                        self.verbose_info(f"RAG {i}: Failed to generate valid proposal")
-                except Exception as e:
-                    self.verbose_info(f"RAG {i}: Error processing proposal - {str(e)}")
-        
-        self.run_state_dict.run_stage = "4"
-        self.run_state_dict.is_done = True
-        self._save_run_state_dict()
-    
-    def _process_rag_proposal_and_evaluate(self, task_index, similar_codes, cuda_individual):
-        """Process a single RAG LLM proposal AND evaluate it completely in one thread."""
-        # Use RAG prompt with similar codes as optimization history
         prompt = PromptMaker.make_rag_prompt(
             gpu_type=self.run_state_dict.task_info['gpu_type'],
             cuda_version=self.run_state_dict.task_info['cuda_version'],
@@ -265,72 +240,153 @@ class AiCudaEngineer(Method):
             func_runtime=self.run_state_dict.task_info["func_runtime"],
             cuda_indiv=cuda_individual
         )
-        return self._process_proposal_and_evaluate_common(task_index, prompt, "RAG", use_rag_llm=True)
+
+        def on_result(result):
+            i = result.task[1]
+            new_entry = self._make_kernel_entry(result)
+            self._record_usage(result.usage, stage="3", llm=self.config.rag_llm)
+            self.run_state_dict.usage_ledger.record_solution(new_entry["runtime"] is not None)
+            self.run_state_dict.optimization_history.append(new_entry)
+            runtime_str = f"{new_entry['runtime']:.4f} ms" if new_entry['runtime'] is not None else "Failed"
+            self.verbose_info(f"RAG {i}: {new_entry['name']}, runtime: {runtime_str}, temp_str: {new_entry['temp_str']}")
+
+        # RAG proposals and their evaluations overlap on the proposal and evaluation pools
+        with self._make_kernel_engine() as engine:
+            engine.run_batch([("RAG", i, prompt, best_kernel) for i in range(RAG_TIMES)], on_result)
+        
+        self.run_state_dict.run_stage = "4"
+        self.run_state_dict.is_done = True
+        self._save_run_state_dict()
     
-    def _process_proposal_and_evaluate_common(self, llm_index, prompt, prompt_type, use_rag_llm=False):
-        assert isinstance(self.config, AiCudaEngineerConfig)
+    def _make_kernel_engine(self) -> SamplingEngine:
+        """Proposal pool sized to LLM capacity feeding an evaluation pool sized to compile/GPU capacity"""
+        autotuner = self.config.autotuner
+        engine = SamplingEngine(
+            self._propose_kernel,
+            self._timed_evaluation(self._evaluate_kernel),
+            num_samplers=max(autotuner.max_samplers, self.config.num_proposers) if autotuner else self.config.num_proposers,
+            num_evaluators=max(autotuner.max_evaluators, self.config.num_evaluators) if autotuner else self.config.num_evaluators,
+            sampler_limit=self.config.num_proposers,
+            evaluator_limit=self.config.num_evaluators,
+            name="AiCudaEngineer"
+        )
+        if autotuner is not None:
+            autotuner.attach(engine)
+        return engine
+
+    def _make_evo_task(self, llm_index):
+        """Evolution task for an evo LLM, prompting with the top 5 kernels known now"""
+        top_5_kernel = self._get_valid_top_5_from_slow_to_fast(self.run_state_dict.optimization_history)
+        best_kernel = self._get_best_valid_kernel(self.run_state_dict.optimization_history)
 
-        """Common function for processing LLM proposals and evaluating them."""
+        # Use best kernel or baseline for optimization
+        cuda_individual = best_kernel if best_kernel else self.run_state_dict.task_info["cuda_info"]
+        prompt = PromptMaker.make_evo_prompt(
+            self.run_state_dict.task_info['gpu_type'],
+            self.run_state_dict.task_info['cuda_version'],
+            top_5_kernel,
+            self.run_state_dict.task_info["func_runtime"],
+            cuda_individual
+        )
+        return "EVO", llm_index, prompt, best_kernel
+
+    def _propose_kernel(self, task):
+        """Proposal stage: get and parse one LLM proposal for a (prompt type, index, prompt, best kernel) task"""
+        prompt_type, llm_index, prompt, _ = task
         try:
-            # Step 1: Get response from LLM
-            if use_rag_llm:
+            if prompt_type == "RAG":
                 response, usage = self.config.rag_llm.get_response(prompt)
             else:
-                response, usage = self.config.evo_llm_list[llm_index].get_response(prompt)
-            
-            # Step 2: Parse the response
+                evo_llm = self.evo_portfolio or self.config.evo_llm_list[llm_index]
+                response, usage = evo_llm.get_response(prompt)
+        except Exception as e:
+            self.verbose_info(f"{prompt_type} LLM {llm_index}: Exception in proposal generation - {str(e)}")
+            return [self._failed_proposal(e)], {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        # The request succeeded, so its usage is billed (and reported to the portfolio) even if parsing fails
+        try:
             parsed_response = ResponseParser.parse_evo_response(response)
-            
-            # Step 3: Create new entry structure
-            new_entry = {
-                "name": parsed_response["name"],
-                "thought": parsed_response["thought"],
-                "code": parsed_response["code"],
-                "temp_str": None,
-                "runtime": None,
-                "prof_string": None,
-                "compilation_error": False,
-                "comparison_error": False,
-                "error_msg": None
-            }
-            
-            # Step 4: Evaluate CUDA code correctness
-            cuda_comparison_result = self.config.evaluator.compare_func_cuda_sandbox(
+        except Exception as e:
+            self.verbose_info(f"{prompt_type} LLM {llm_index}: Failed to parse proposal - {str(e)}")
+            return [self._failed_proposal(e)], usage
+        return [Solution(parsed_response["code"], other_info={
+            "name": parsed_response["name"],
+            "thought": parsed_response["thought"]
+        })], usage
+
+    @staticmethod
+    def _failed_proposal(error: Exception) -> Solution:
+        """Placeholder for a proposal whose request or parsing failed"""
+        return Solution("", other_info={"name": "failed_proposal", "thought": f"Failed due to exception: {str(error)}"})
+
+    def _evaluate_kernel(self, code) -> EvaluationResult:
+        """Evaluation stage: check a kernel against the functional code and, if correct, measure its runtime"""
+        entry = {
+            "temp_str": None,
+            "runtime": None,
+            "prof_string": None,
+            "compilation_error": False,
+            "comparison_error": False,
+            "error_msg": None
+        }
+        cuda_comparison_result = self.config.evaluator.compare_func_cuda_sandbox(
+            self.run_state_dict.task_info["func_py_code"],
+            code
+        )
+        entry["temp_str"] = cuda_comparison_result.get("temp_str")
+        entry["error_msg"] = cuda_comparison_result.get("error_msg")
+
+        # If correct, measure runtime performance
+        if cuda_comparison_result["correctness"]:
+            cuda_runtime_result = self.config.evaluator.get_cuda_runtime_sandbox(
                 self.run_state_dict.task_info["func_py_code"],
-                parsed_response["code"]
+                code,
+                cuda_comparison_result.get("temp_str")
             )
-            new_entry["temp_str"] = cuda_comparison_result.get("temp_str")
-            new_entry["error_msg"] = cuda_comparison_result.get("error_msg")
-
-            # Step 5: If correct, measure runtime performance
-            if cuda_comparison_result["correctness"]:
-                cuda_runtime_result = self.config.evaluator.get_cuda_runtime_sandbox(
-                    self.run_state_dict.task_info["func_py_code"],
-                    parsed_response["code"],
-                    cuda_comparison_result.get("temp_str")
-                )
-                new_entry["runtime"] = cuda_runtime_result["runtime"]
-                new_entry["prof_string"] = cuda_runtime_result["prof_string"]
-                new_entry["error_msg"] = cuda_runtime_result.get("error_msg")
-            else:
-                new_entry["comparison_error"] = True
-                new_entry["compilation_error"] = cuda_comparison_result["compilation_error"]
-            
-            return new_entry, usage
-            
-        except Exception as e:
-            self.verbose_info(f"{prompt_type} LLM {llm_index}: Exception in proposal generation and evaluation - {str(e)}")
+            entry["runtime"] = cuda_runtime_result["runtime"]
+            entry["prof_string"] = cuda_runtime_result["prof_string"]
+            entry["error_msg"] = cuda_runtime_result.get("error_msg")
+        else:
+            entry["comparison_error"] = True
+            entry["compilation_error"] = cuda_comparison_result["compilation_error"]
+
+        valid = entry["runtime"] is not None and entry["runtime"] != float('inf')
+        return EvaluationResult(valid=valid, score=-entry["runtime"] if valid else None, additional_info=entry)
+
+    def _make_kernel_entry(self, result):
+        """Optimization history entry for a proposal coming out of the kernel engine"""
+        solution = result.solution
+        evaluation_res = solution.evaluation_res if solution is not None else None
+        if evaluation_res is None:
+            other_info = solution.other_info if solution is not None and solution.other_info else {}
+            reason = str(result.error) if result.error is not None else "empty proposal"
             return {
-                "name": "failed_proposal",
-                "thought": f"Failed due to exception: {str(e)}",
-                "code": "",
+                "name": other_info.get("name", "failed_proposal"),
+                "thought": other_info.get("thought", f"Failed due to exception: {reason}"),
+                "code": solution.sol_string if solution is not None else "",
                 "temp_str": None,
                 "runtime": None,
                 "prof_string": None,
                 "compilation_error": True,
                 "comparison_error": True,
-                "error_msg": "Unknown"
-            }, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                "error_msg": reason if result.error is not None else "Unknown"
+            }
+        return dict(
+            name=solution.other_info["name"],
+            thought=solution.other_info["thought"],
+            code=solution.sol_string,
+            **evaluation_res.additional_info
+        )
+
+    def _report_portfolio_outcome(self, new_entry, usage, best_kernel):
+        """Reward the portfolio arm by runtime reduction against the best kernel of the generation"""
+        runtime = new_entry["runtime"] if new_entry else None
+        valid = runtime is not None and runtime != float('inf')
+        self.evo_portfolio.record_outcome(
+            usage,
+            valid=valid,
+            score=-runtime if valid else None,
+            baseline_score=-best_kernel["runtime"] if best_kernel else -self.run_state_dict.task_info["cuda_info"]["runtime"]
+        )
 
     def _get_valid_top_5_from_slow_to_fast(self, optimization_history):
         valid_individuals = []
@@ -361,17 +417,5 @@ class AiCudaEngineer(Method):
         best_kernel = min(valid_kernels, key=lambda x: x["runtime"])
         return best_kernel
     
-    def _process_llm_proposal_and_evaluate(self, llm_index, top_5_kernel, cuda_individual):
-        """Process a single LLM proposal AND evaluate it completely in one thread."""
-        # Use evolution prompt with top 5 kernels as optimization history
-        prompt = PromptMaker.make_evo_prompt(
-            self.run_state_dict.task_info['gpu_type'],
-            self.run_state_dict.task_info['cuda_version'],
-            top_5_kernel,
-            self.run_state_dict.task_info["func_runtime"],
-            cuda_individual
-        )
-        return self._process_proposal_and_evaluate_common(llm_index, prompt, "EVO")
-
     def _get_run_state_class(self) -> Type[BaseRunStateDict]:
-        return AiCudaEngineerRunStateDict
\ No newline at end of file
+        return AiCudaEngineerRunStateDict
@@ -1,7 +1,9 @@
 from evotool.tools.llm import HttpsApi
 from ..evaluator import Evaluator
 from evotool.evo_method.base_config import BaseConfig
-from typing import List
+from evotool.evo_method.concurrency_autotuner import ConcurrencyAutotuner
+from evotool.evo_method.budget import Budget
+from typing import Dict, List, Optional
 class AiCudaEngineerConfig(BaseConfig):
     def __init__(
             self,
@@ -13,13 +15,35 @@ class AiCudaEngineerConfig(BaseConfig):
             evo_llm_list: List[HttpsApi],
             embedding_llm: HttpsApi,
             rag_llm: HttpsApi,
-            conversion_retry: int=10
+            conversion_retry: int=10,
+            evo_sample_nums: Optional[int]=None,
+            num_proposers: Optional[int]=None,
+            num_evaluators: int=1,
+            autotuner: Optional[ConcurrencyAutotuner]=None,
+            budget: Optional[Budget]=None,
+            use_llm_portfolio: bool=False,
+            portfolio_strategy: str='ucb',
+            portfolio_cost: str='tokens',
+            llm_prices: Optional[Dict[str, dict]]=None,
+            usage_log: bool=False
     ):
-        super().__init__(task_info, output_path)
+        super().__init__(task_info, output_path, llm_prices=llm_prices, usage_log=usage_log)
         self.evaluator = evaluator
         self.conversion_retry = conversion_retry
         self.conversion_llm = conversion_llm
         self.translation_llm = translation_llm
         self.evo_llm_list = evo_llm_list
         self.embedding_llm = embedding_llm
-        self.rag_llm = rag_llm
\ No newline at end of file
+        self.rag_llm = rag_llm
+        # Evolution proposals in total (default: 10 per evo LLM), LLM requests in flight and concurrent kernel evaluations
+        self.evo_sample_nums = evo_sample_nums or 10 * len(evo_llm_list)
+        self.num_proposers = num_proposers or len(evo_llm_list)
+        self.num_evaluators = num_evaluators
+        # Optionally move the proposer and evaluator limits with the measured LLM and benchmark latencies
+        self.autotuner = autotuner
+        # Wall time, token, cost and evaluator-time limits on the evolution stages
+        self.budget = budget
+        # Let a bandit pick which evo LLM serves each proposal instead of one proposal per LLM
+        self.use_llm_portfolio = use_llm_portfolio
+        self.portfolio_strategy = portfolio_strategy
+        self.portfolio_cost = portfolio_cost
@@ -1,6 +1,7 @@
 from typing import Literal
 
 from evotool.evo_method.base_run_state_dict import BaseRunStateDict
+from evotool.evo_method.usage_ledger import UsageLedger
 
 class AiCudaEngineerRunStateDict(BaseRunStateDict):
     def __init__(
@@ -8,8 +9,9 @@ class AiCudaEngineerRunStateDict(BaseRunStateDict):
             task_info:dict,
             run_stage: Literal["0", "1", "2"] = "0",
             evo_gen_i: int = 0,
+            evo_sample_i: int = 0,
             optimization_history: list = None,
-            usage_history: dict = None,
+            usage_ledger: UsageLedger = None,
             is_done: bool=False
     ):
         super().__init__(task_info)
@@ -17,9 +19,10 @@ class AiCudaEngineerRunStateDict(BaseRunStateDict):
         self.run_stage = run_stage  # 0: conversion, 1:translation
 
         self.evo_gen_i = evo_gen_i
+        self.evo_sample_i = evo_sample_i  # Evolution proposals evaluated so far
         self.optimization_history = optimization_history or []
 
-        self.usage_history = usage_history or {}
+        self.usage_ledger = usage_ledger or UsageLedger()
 
         self.is_done = is_done
 
@@ -27,9 +30,10 @@ class AiCudaEngineerRunStateDict(BaseRunStateDict):
         """Convert the run state to JSON-serializable dictionary"""
         return {
             'task_info': self.task_info,
-            'usage_history': self.usage_history,
+            'usage_ledger': self.usage_ledger.to_json(),
             'run_stage': self.run_stage,
             'evo_gen_i': self.evo_gen_i,
+            'evo_sample_i': self.evo_sample_i,
             'optimization_history': self.optimization_history,
             'is_done': self.is_done
         }
@@ -41,9 +45,9 @@ class AiCudaEngineerRunStateDict(BaseRunStateDict):
             task_info=data['task_info'],
             run_stage=data.get('run_stage', "0"),  # type: ignore
             evo_gen_i=data.get('evo_gen_i', 0),
+            evo_sample_i=data.get('evo_sample_i', 0),
             optimization_history=data.get('optimization_history', []),
-            usage_history=data.get('usage_history', {}),
+            usage_ledger=UsageLedger.from_run_state_json(data),
             is_done=data.get('is_done', False)
         )
-        instance.usage_history = data.get('usage_history', {})
         return instance
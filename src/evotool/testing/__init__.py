@@ -0,0 +1,2 @@
+from .mock_llm import MockLlm
+from .mock_server import MockLlmServer
@@ -0,0 +1,173 @@
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from ..tools.retry import decode_json_body
+
+
+class MockLlm:
+    def __init__(self, responses: Sequence[str] | Callable[[Any], str | Tuple[str, dict]] = None, adapter=None,
+                 transcript: str | Sequence = None, latency: float | Tuple[float, float] | Callable = 0.0,
+                 timeout_rate: float = 0.0, malformed_rate: float = 0.0, hang_seconds: float = 0.0,
+                 embedding_dim: int = 16, model: str = 'mock', seed: Optional[int] = None):
+        """
+        Offline stand-in for HttpsApi with the same ``get_response``/``get_embedding`` contract.
+
+        Responses come from the first source given: a recorded ``transcript`` replayed in order,
+        ``responses`` (a list cycled through, or a callable of the prompt), or the ``adapter``'s
+        initial solution wrapped in a response every adapter can parse.
+
+        :param responses: Canned responses, or ``fn(prompt) -> response`` / ``(response, usage)``.
+        :param adapter: Task adapter whose ``make_init_sol_wo_other_info`` provides the code.
+        :param transcript: A JSONL file of ``{"response": ..., "usage": ...}`` records, a SQLite file
+            written by CachedLlm, or a list of such records or plain strings.
+        :param latency: Seconds per request: a constant, a ``(low, high)`` uniform range, or
+            ``fn(rng) -> seconds`` for any other distribution.
+        :param timeout_rate: Probability that a request hangs for ``hang_seconds`` and raises TimeoutError.
+        :param malformed_rate: Probability that a request fails with a MalformedResponseError, as a
+            truncated API response would.
+        :param hang_seconds: How long an injected timeout blocks before raising.
+        :param embedding_dim: Length of the deterministic pseudo-embeddings.
+        :param model: Model name reported in the usage.
+        :param seed: Seed of the random generator driving latency and fault injection.
+        """
+        self._model = model
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._latency = latency
+        self.timeout_rate = timeout_rate
+        self.malformed_rate = malformed_rate
+        self.hang_seconds = hang_seconds
+        self.embedding_dim = embedding_dim
+
+        self._responses = None
+        self._response_fn = None
+        if transcript is not None:
+            self._responses = self._load_transcript(transcript)
+        elif callable(responses):
+            self._response_fn = responses
+        elif responses is not None:
+            self._responses = [(response, None) for response in responses]
+        elif adapter is not None:
+            code = adapter.make_init_sol_wo_other_info().sol_string
+            self._response_fn = lambda prompt: self.make_solution_response(code)
+        else:
+            raise ValueError('MockLlm needs responses, a transcript or an adapter')
+        if self._responses is not None and not self._responses:
+            raise ValueError('MockLlm got an empty list of responses')
+        self._next_index = 0
+        self._stats = {'requests': 0, 'timeouts': 0, 'malformed': 0}
+
+    @staticmethod
+    def make_solution_response(code: str, name: str = 'mock solution') -> str:
+        """Wrap code in the name/code/thought layout parsed by the EoH, FunSearch, ES(1+1) and EvoEngineer adapters."""
+        return f'name: {{{name}}}\ncode:\n```python\n{code}\n```\nthought: {name}\n'
+
+    @staticmethod
+    def _load_transcript(transcript: str | Sequence) -> List[Tuple[str, Optional[dict]]]:
+        if not isinstance(transcript, str):
+            return [(record, None) if isinstance(record, str) else (record['response'], record.get('usage'))
+                    for record in transcript]
+        if transcript.endswith('.jsonl'):
+            with open(transcript, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            return [(record['response'], record.get('usage')) for record in records]
+        conn = sqlite3.connect(transcript)
+        try:
+            rows = conn.execute('SELECT response, usage FROM responses ORDER BY created').fetchall()
+        finally:
+            conn.close()
+        return [(response, json.loads(usage)) for response, usage in rows]
+
+    @staticmethod
+    def _estimate_tokens(content: Any) -> int:
+        if not isinstance(content, str):
+            content = json.dumps(content, default=str)
+        return max(1, len(content) // 4)
+
+    def _make_chat_payload(self, prompt: str | Any, **generation_params) -> dict:
+        if isinstance(prompt, str):
+            prompt = [{'role': 'user', 'content': prompt.strip()}]
+        return dict(generation_params, model=self._model, messages=prompt)
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            if callable(self._latency):
+                return max(0.0, self._latency(self._rng))
+            if isinstance(self._latency, tuple):
+                return self._rng.uniform(*self._latency)
+            return self._latency
+
+    def sample_fault(self) -> Optional[str]:
+        """Draw the fault injected into the next request: ``timeout``, ``malformed`` or None."""
+        with self._lock:
+            self._stats['requests'] += 1
+            draw = self._rng.random()
+            if draw < self.timeout_rate:
+                self._stats['timeouts'] += 1
+                return 'timeout'
+            if draw < self.timeout_rate + self.malformed_rate:
+                self._stats['malformed'] += 1
+                return 'malformed'
+            return None
+
+    def next_response(self, prompt: str | Any) -> Tuple[str, dict]:
+        """The next response and its usage, without latency or faults."""
+        if self._response_fn is not None:
+            result = self._response_fn(prompt)
+            response, usage = result if isinstance(result, tuple) else (result, None)
+        else:
+            with self._lock:
+                response, usage = self._responses[self._next_index % len(self._responses)]
+                self._next_index += 1
+        if usage is None:
+            prompt_tokens = self._estimate_tokens(prompt)
+            completion_tokens = self._estimate_tokens(response)
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens}
+        return response, dict(usage, model=self._model)
+
+    def _inject(self) -> None:
+        fault = self.sample_fault()
+        if fault == 'timeout':
+            time.sleep(self.hang_seconds)
+            raise TimeoutError('MockLlm injected timeout')
+        time.sleep(self.sample_latency())
+        if fault == 'malformed':
+            decode_json_body('{"choices": [{"message": {"content": "trunc')
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        self._inject()
+        return self.next_response(prompt)
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        self._inject()
+        results = [self.next_response(prompt) for _ in range(n)]
+        usage = dict(results[0][1], n=n)
+        usage['completion_tokens'] = sum(result[1].get('completion_tokens', 0) for result in results)
+        usage['total_tokens'] = usage.get('prompt_tokens', 0) + usage['completion_tokens']
+        return [result[0] for result in results], usage
+
+    def embed(self, text: str | Any) -> List[float]:
+        """A deterministic unit-length pseudo-embedding of ``text``."""
+        digest = hashlib.sha256(str(text).encode('utf-8')).digest()
+        values = [digest[i % len(digest)] / 255.0 - 0.5 for i in range(self.embedding_dim)]
+        norm = sum(value * value for value in values) ** 0.5 or 1.0
+        return [value / norm for value in values]
+
+    def get_embedding(self, text: str | Any, *args, **kwargs) -> List[float]:
+        self._inject()
+        return self.embed(text)
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[List[float]]:
+        self._inject()
+        return [self.embed(text) for text in texts]
+
+    def get_stats(self) -> dict:
+        """Requests served and faults injected so far."""
+        with self._lock:
+            return dict(self._stats)
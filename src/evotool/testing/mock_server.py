@@ -0,0 +1,150 @@
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from evotool.tools.llm import HttpsApi
+from .mock_llm import MockLlm
+
+
+class MockLlmServer:
+    def __init__(self, mock: MockLlm, host: str = '127.0.0.1', port: int = 0, stream_chunk_chars: int = 16):
+        """
+        Local OpenAI-compatible HTTP server backed by a MockLlm, to exercise the real HttpsApi path
+        (connection pool, retries, streaming, timeouts) offline.
+
+        Serves ``/v1/chat/completions`` (including ``n`` and ``stream``) and ``/v1/embeddings``. The
+        mock's latency is applied before responding; an injected timeout stalls the response for
+        ``hang_seconds`` and an injected malformed response sends truncated JSON.
+
+        :param mock: The MockLlm providing responses, latency and faults.
+        :param host: Interface to listen on.
+        :param port: Port to listen on; 0 picks a free one.
+        :param stream_chunk_chars: Characters per streamed delta.
+        """
+        self.mock = mock
+        self.stream_chunk_chars = stream_chunk_chars
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        """The ``host`` to pass to HttpsApi."""
+        address, port = self._server.server_address[:2]
+        return f'http://{address}:{port}'
+
+    def start(self) -> 'MockLlmServer':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='MockLlmServer', daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockLlmServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def make_client(self, **kwargs) -> HttpsApi:
+        """An HttpsApi pointed at this server; keyword arguments are passed through."""
+        return HttpsApi(self.host, 'mock-key', self.mock._model, '/v1/chat/completions', **kwargs)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client dropped the connection, e.g. after stopping a stream early
+                    self.close_connection = True
+
+            def _send_json(self, data: dict | bytes, status: int = 200) -> None:
+                body = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, data: bytes) -> None:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                fault = server.mock.sample_fault()
+                try:
+                    if fault == 'timeout':
+                        time.sleep(server.mock.hang_seconds)
+                        self.close_connection = True
+                        return
+                    time.sleep(server.mock.sample_latency())
+                    if fault == 'malformed' and request.get('stream'):
+                        self.send_response(200)
+                        self.send_header('Transfer-Encoding', 'chunked')
+                        self.end_headers()
+                        self._send_chunk(b'data: {"choices": [{"index": 0, "delta": {"content": "trunc\n\n')
+                        self.wfile.write(b'0\r\n\r\n')
+                    elif fault == 'malformed':
+                        self._send_json(b'{"choices": [{"message": {"content": "trunc')
+                    elif self.path.endswith('/embeddings'):
+                        self._embeddings(request)
+                    elif request.get('stream'):
+                        self._stream_chat(request)
+                    else:
+                        self._chat(request)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _chat(self, request: dict) -> None:
+                n = request.get('n', 1)
+                results = [server.mock.next_response(request.get('messages')) for _ in range(n)]
+                usage = {key: value for key, value in results[0][1].items() if key != 'model'}
+                usage['completion_tokens'] = sum(result[1].get('completion_tokens', 0) for result in results)
+                usage['total_tokens'] = usage.get('prompt_tokens', 0) + usage['completion_tokens']
+                self._send_json({
+                    'model': server.mock._model,
+                    'choices': [{'index': index, 'message': {'role': 'assistant', 'content': response}}
+                                for index, (response, _) in enumerate(results)],
+                    'usage': usage,
+                })
+
+            def _stream_chat(self, request: dict) -> None:
+                response, usage = server.mock.next_response(request.get('messages'))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                step = server.stream_chunk_chars
+                for start in range(0, len(response), step):
+                    delta = {'choices': [{'index': 0, 'delta': {'content': response[start:start + step]}}]}
+                    self._send_chunk(f'data: {json.dumps(delta)}\n\n'.encode('utf-8'))
+                final = {'choices': [], 'usage': {key: value for key, value in usage.items() if key != 'model'}}
+                self._send_chunk(f'data: {json.dumps(final)}\n\ndata: [DONE]\n\n'.encode('utf-8'))
+                self.wfile.write(b'0\r\n\r\n')
+                self.wfile.flush()
+
+            def _embeddings(self, request: dict) -> None:
+                texts = request.get('input')
+                texts = texts if isinstance(texts, list) else [texts]
+                tokens = sum(server.mock._estimate_tokens(text) for text in texts)
+                self._send_json({
+                    'data': [{'index': index, 'embedding': server.mock.embed(text)} for index, text in enumerate(texts)],
+                    'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+                })
+
+        return Handler
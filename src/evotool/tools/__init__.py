@@ -1 +1,10 @@
-from .llm import HttpsApi
\ No newline at end of file
+from .llm import HttpsApi
+from .async_llm import AsyncHttpsApi
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy, LlmRequestError
+from .llm_cache import CachedLlm, LlmResponseCache, EmbeddingCache
+from .llm_router import LlmRouter
+from .cascade_llm import CascadeLlm
+from .llm_portfolio import LlmPortfolio
+from .transport import Transport, HttpsTransport, HttpTransport, UnixSocketTransport
+from .adaptive_timeout import AdaptiveTimeout
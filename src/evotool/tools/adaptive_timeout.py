@@ -0,0 +1,91 @@
+import threading
+from typing import Dict, List, Tuple
+
+from .latency import LatencyTracker
+
+
+# Latency kinds tracked separately
+RESPONSE = 'response'        # a whole non-streaming chat completion
+RESPONSES = 'responses'      # a whole n-completion request
+FIRST_TOKEN = 'first_token'  # request sent until the first streamed line
+STREAM_GAP = 'stream_gap'    # between two streamed lines
+EMBEDDING = 'embedding'
+
+
+class AdaptiveTimeout:
+    """Read timeouts derived from observed latency percentiles.
+
+    Latencies are tracked per endpoint, model and request kind. Once ``min_samples``
+    latencies of a kind are known, its read timeout is the ``percentile`` latency
+    times ``multiplier``, clamped to ``[min_timeout, max_timeout]``; before that it is
+    ``max_timeout``. A timed-out attempt is recorded at the time it waited, and every
+    timeout already hit by the current call doubles the next attempt's timeout, so
+    timeouts that turn out too tight widen themselves.
+
+    One instance may be shared by several clients.
+    """
+
+    def __init__(self, min_timeout: float = 5.0, max_timeout: float = 60.0, percentile: float = 99.0,
+                 multiplier: float = 3.0, min_samples: int = 20, window: int = 200):
+        """
+        :param min_timeout: Lower bound of a derived read timeout in seconds.
+        :param max_timeout: Upper bound, also used until enough latencies are known.
+        :param percentile: Latency percentile (0-100) the timeout is derived from.
+        :param multiplier: Factor applied to that percentile.
+        :param min_samples: Latencies needed before a timeout is derived.
+        :param window: Number of recent latencies kept per endpoint, model and kind.
+        """
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.window = window
+        self._lock = threading.Lock()
+        self._trackers: Dict[Tuple[str, str, str], LatencyTracker] = {}
+        self._timeouts: Dict[Tuple[str, str, str], int] = {}
+
+    def _tracker(self, endpoint: str, model: str, kind: str) -> LatencyTracker:
+        key = (endpoint, model, kind)
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = self._trackers[key] = LatencyTracker(window=self.window)
+            return tracker
+
+    def record(self, endpoint: str, model: str, kind: str, seconds: float) -> None:
+        """Record the latency of a successful request (or of one streamed line)."""
+        self._tracker(endpoint, model, kind).record(seconds)
+
+    def record_timeout(self, endpoint: str, model: str, kind: str, seconds: float) -> None:
+        """Record an attempt abandoned after waiting ``seconds``, as a lower bound of its latency."""
+        self._tracker(endpoint, model, kind).record(seconds)
+        with self._lock:
+            key = (endpoint, model, kind)
+            self._timeouts[key] = self._timeouts.get(key, 0) + 1
+
+    def read_timeout(self, endpoint: str, model: str, kind: str, timeouts_so_far: int = 0) -> float:
+        """
+        :param timeouts_so_far: Attempts of the current call that already timed out.
+        :return: The read timeout in seconds for the next attempt.
+        """
+        tracker = self._tracker(endpoint, model, kind)
+        if tracker.count < self.min_samples:
+            return self.max_timeout
+        timeout = tracker.percentile(self.percentile) * self.multiplier * 2 ** timeouts_so_far
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+
+    def get_stats(self) -> List[dict]:
+        """Per endpoint, model and kind: samples, percentile latency, current timeout and timeouts hit."""
+        with self._lock:
+            keys = list(self._trackers)
+            timeouts = dict(self._timeouts)
+        return [{
+            'endpoint': endpoint,
+            'model': model,
+            'kind': kind,
+            'samples': self._trackers[(endpoint, model, kind)].count,
+            f'p{self.percentile:g}': self._trackers[(endpoint, model, kind)].percentile(self.percentile),
+            'read_timeout': self.read_timeout(endpoint, model, kind),
+            'timeouts': timeouts.get((endpoint, model, kind), 0),
+        } for endpoint, model, kind in keys]
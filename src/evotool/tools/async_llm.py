@@ -0,0 +1,417 @@
+import json
+import time
+import asyncio
+import threading
+import weakref
+import concurrent.futures
+from typing import Any, List, Tuple
+
+from .adaptive_timeout import RESPONSE, RESPONSES, FIRST_TOKEN, STREAM_GAP, EMBEDDING
+from .llm import HttpsApi
+from .llm_cache import EmbeddingCache
+from .retry import (RetryState, LlmRequestError, MALFORMED, check_response_status, decode_json_body,
+                    parsing_response)
+from .streaming import ChatStreamAccumulator
+from .usage import merge_usage
+
+
+class _AsyncConnection:
+    """A single keep-alive HTTP/1.1 connection on top of asyncio streams."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    async def send(self, method: str, url: str, body: bytes, headers: dict) -> None:
+        lines = [f'{method} {url} HTTP/1.1', f'Host: {self.host}', f'Content-Length: {len(body)}']
+        lines += [f'{key}: {value}' for key, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+    async def read_head(self) -> Tuple[int, dict, bool]:
+        """Read the status line and headers.
+
+        :return: The status code, the lower-cased response headers and whether the
+            server will close the connection after this response.
+        """
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Remote end closed connection without response')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, value = line.decode('latin-1').split(':', 1)
+            headers[key.strip().lower()] = value.strip()
+
+        will_close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+        if headers.get('transfer-encoding', '').lower() != 'chunked' and 'content-length' not in headers:
+            will_close = True  # body is delimited by the end of the connection
+        return int(status), headers, will_close
+
+    async def read_body(self, headers: dict) -> bytes:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            return b''.join([chunk async for chunk in self._iter_chunks()])
+        if 'content-length' in headers:
+            return await self.reader.readexactly(int(headers['content-length']))
+        return await self.reader.read()
+
+    async def _iter_chunks(self):
+        while True:
+            size_line = await self.reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line
+                while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            yield await self.reader.readexactly(size)
+            await self.reader.readline()
+
+    async def iter_lines(self, headers: dict):
+        """Yield the body line by line as it arrives (used for server-sent events)."""
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            buffer = b''
+            async for chunk in self._iter_chunks():
+                buffer += chunk
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    yield line + b'\n'
+            if buffer:
+                yield buffer
+        elif 'content-length' in headers:
+            remaining = int(headers['content-length'])
+            while remaining > 0:
+                line = await self.reader.readline()
+                if not line:
+                    return
+                remaining -= len(line)
+                yield line
+        else:
+            while line := await self.reader.readline():
+                yield line
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _LoopState:
+    """Per-event-loop semaphore and idle connections (asyncio primitives are bound to one loop)."""
+
+    def __init__(self, max_in_flight: int):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.idle: List[_AsyncConnection] = []
+
+
+class AsyncHttpsApi(HttpsApi):
+    def __init__(self, host, key, model, url, timeout=60, max_in_flight=64, max_connections=64, **kwargs):
+        """
+        Asyncio-native counterpart of HttpsApi with the same (response, usage) contract.
+
+        The coroutines ``aget_response``/``aget_responses``/``aget_embedding``/``aget_embeddings``
+        can be awaited from any event loop. The sync methods of HttpsApi are a shim that runs the
+        matching coroutine on a background event loop thread, so existing configs can use this
+        class unchanged and every request is bounded by ``max_in_flight``.
+
+        :param host: The host of the API.
+        :param key: The API key.
+        :param model: The model to use.
+        :param url: The URL of the API.
+        :param timeout: The timeout for the API request.
+        :param max_in_flight: Maximum number of concurrent requests per event loop.
+        :param max_connections: Maximum number of idle keep-alive connections kept for reuse.
+        :param kwargs: Additional keyword arguments.
+        """
+        super().__init__(host, key, model, url, timeout=timeout, max_connections=max_connections, **kwargs)
+        self._max_in_flight = max_in_flight
+        self._max_connections = max_connections
+        self._loop_states = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+        self._connections_opened = 0
+        self._connections_reused = 0
+
+        self._loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+    def _get_loop_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loop_states.get(loop)
+        if state is None:
+            state = _LoopState(self._max_in_flight)
+            self._loop_states[loop] = state
+        return state
+
+    async def _open_connection(self) -> _AsyncConnection:
+        reader, writer = await self._transport.open_connection()
+        return _AsyncConnection(reader, writer, self._transport.host_header)
+
+    async def _send(self, state: _LoopState, url: str, body: bytes) -> Tuple[_AsyncConnection, int, dict, bool]:
+        """Send a request on a pooled connection and read the response head.
+
+        A reused connection that turns out to be stale is discarded and the
+        request is sent again on a freshly opened connection.
+        """
+        while True:
+            reused = bool(state.idle)
+            if reused:
+                conn = state.idle.pop()
+            else:
+                async with asyncio.timeout(self._connect_timeout):
+                    conn = await self._open_connection()
+            with self._stats_lock:
+                if reused:
+                    self._connections_reused += 1
+                else:
+                    self._connections_opened += 1
+            try:
+                await conn.send('POST', url, body, self._make_headers())
+                status, headers, will_close = await conn.read_head()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            return conn, status, headers, will_close
+
+    def _release(self, state: _LoopState, conn: _AsyncConnection, reusable: bool) -> None:
+        if reusable and len(state.idle) < self._max_connections:
+            state.idle.append(conn)
+        else:
+            conn.close()
+
+    async def _request(self, url: str, payload: str) -> Tuple[int, dict, bytes]:
+        state = self._get_loop_state()
+        conn, status, headers, will_close = await self._send(state, url, payload.encode('utf-8'))
+        try:
+            data = await conn.read_body(headers)
+        except BaseException:
+            conn.close()
+            raise
+        self._release(state, conn, not will_close)
+        return status, headers, data
+
+    async def _astream_chat(self, payload: dict, stream_parser, retry_state: RetryState) -> Tuple[str, dict]:
+        """
+        Stream a chat completion, stopping as soon as ``stream_parser`` reports a complete answer.
+
+        The first line and every following line get their own read timeout, as in HttpsApi.
+        """
+        payload = dict(payload, stream=True, stream_options={'include_usage': True})
+        accumulator = ChatStreamAccumulator(stream_parser)
+        state = self._get_loop_state()
+        kind = FIRST_TOKEN
+        last = time.monotonic()
+        try:
+            async with asyncio.timeout(self._read_timeout(FIRST_TOKEN, retry_state)) as line_timeout:
+                conn, status, headers, will_close = await self._send(
+                    state, self._url, json.dumps(payload).encode('utf-8')
+                )
+                try:
+                    if not 200 <= status < 300:
+                        data = await conn.read_body(headers)
+                        self._release(state, conn, not will_close)
+                        check_response_status(status, headers, data)
+                    lines = conn.iter_lines(headers)
+                    async for line in lines:
+                        if line.strip():
+                            now = time.monotonic()
+                            self._record_latency(kind, now - last)
+                            kind, last = STREAM_GAP, now
+                        line_timeout.reschedule(
+                            asyncio.get_running_loop().time() + self._read_timeout(STREAM_GAP, retry_state)
+                        )
+                        if accumulator.feed_line(line.decode('utf-8')):
+                            break
+                    if accumulator.complete:
+                        # Closing the connection with unread data cancels the rest of the generation
+                        await lines.aclose()
+                        conn.close()
+                    else:
+                        async for _ in lines:
+                            pass
+                        self._release(state, conn, not will_close)
+                except LlmRequestError:
+                    raise
+                except BaseException:
+                    conn.close()
+                    raise
+        except TimeoutError:
+            self._record_latency(kind, time.monotonic() - last, timed_out=True)
+            raise
+        return accumulator.result(payload)
+
+    def get_connection_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'connections_opened': self._connections_opened,
+                'connections_reused': self._connections_reused,
+                'idle_connections': sum(len(state.idle) for state in list(self._loop_states.values())),
+            }
+
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+    async def _apost_json(self, url: str, payload: str, kind: str, retry_state: RetryState) -> dict:
+        """Send one request and return the decoded JSON body, checking the HTTP status first."""
+        async with self._get_loop_state().semaphore:
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(self._read_timeout(kind, retry_state)):
+                    status, headers, data = await self._request(url, payload)
+            except TimeoutError:
+                self._record_latency(kind, time.monotonic() - start, timed_out=True)
+                raise
+        check_response_status(status, headers, data)
+        self._record_latency(kind, time.monotonic() - start)
+        return decode_json_body(data)
+
+    async def _achat_with_retry(self, attempt) -> Tuple[Any, dict]:
+        """Async ``_chat_with_retry``: await ``attempt(retry_state)`` under the rate limiter and retries."""
+        retry_state = self._retry_policy.new_call()
+        while True:
+            try:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.aacquire()
+                result, usage = await attempt(retry_state)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.record_usage(usage)
+                return result, usage
+            except Exception as e:
+                try:
+                    delay = retry_state.on_error(e)
+                except LlmRequestError as final_error:
+                    raise LlmRequestError(
+                        f'Model Response Error! {final_error} You may check your API host and API key.',
+                        final_error.error_class, final_error.status
+                    ) from e
+                print(f'Model Response Error ({retry_state.last_error_class})! Retrying in {delay:.1f}s...')
+                await asyncio.sleep(delay)
+
+    async def aget_response(self, prompt: str | Any, *args, stream_parser=None, **kwargs) -> Tuple[str, dict]:
+        payload_dict = self._make_chat_payload(prompt, **kwargs)
+        payload = json.dumps(payload_dict)
+
+        async def attempt(retry_state):
+            if stream_parser is not None:
+                async with self._get_loop_state().semaphore:
+                    return await self._astream_chat(payload_dict, stream_parser, retry_state)
+            return self._parse_chat_data(await self._apost_json(self._url, payload, RESPONSE, retry_state))
+
+        return await self._achat_with_retry(attempt)
+
+    async def aget_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """Async ``get_responses``: ``n`` completions of one prompt with the provider's ``n`` parameter."""
+        payload_dict = self._make_chat_payload(prompt, **kwargs)
+        responses, usages = [], []
+        while len(responses) < n:
+            payload = json.dumps(dict(payload_dict, n=n - len(responses)))
+
+            async def attempt(retry_state):
+                data = await self._apost_json(self._url, payload, RESPONSES, retry_state)
+                return self._parse_chat_choices(data)
+
+            choices, usage = await self._achat_with_retry(attempt)
+            if not choices:
+                raise LlmRequestError('Model Response Error! The response contains no choices.', MALFORMED)
+            responses += choices[:n - len(responses)]
+            usages.append(usage)
+        return responses, dict(merge_usage(usages), n=n)
+
+    async def aget_embedding(self, text: str | Any, *args, **kwargs) -> list:
+        data = await self._arequest_embeddings(text)
+        with parsing_response('embedding'):
+            return data['data'][0]['embedding']
+
+    async def aget_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        """Async ``get_embeddings``; the batches missing from the cache are requested concurrently."""
+        found, batches = self._plan_embeddings(texts)
+        datas = await asyncio.gather(*(self._arequest_embeddings(batch) for batch in batches))
+        for batch, data in zip(batches, datas):
+            self._store_embeddings(found, batch, self._parse_embedding_data(data))
+        return [found[EmbeddingCache.text_hash(text)] for text in texts]
+
+    async def _arequest_embeddings(self, text: str | List[str] | Any) -> dict:
+        payload = json.dumps(self._make_embedding_payload(text))
+
+        retry_state = self._retry_policy.new_call()
+        while True:
+            try:
+                if self._rate_limiter is not None:
+                    await self._rate_limiter.aacquire()
+                data = await self._apost_json("/v1/embeddings", payload, EMBEDDING, retry_state)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.record_usage(data.get('usage'))
+                return data
+            except Exception as e:
+                try:
+                    delay = retry_state.on_error(e)
+                except LlmRequestError as final_error:
+                    raise LlmRequestError(
+                        f'{self.__class__.__name__} error: {final_error}. You may check your API host and API key.',
+                        final_error.error_class, final_error.status
+                    ) from e
+                print(f'{self.__class__.__name__} error ({retry_state.last_error_class}): {e}. Retrying in {delay:.1f}s...')
+                await asyncio.sleep(delay)
+
+    async def aget_response_batch(self, prompts: List[str | Any]) -> List[Tuple[str, dict]]:
+        """Send all prompts concurrently, bounded by ``max_in_flight``."""
+        return list(await asyncio.gather(*(self.aget_response(prompt) for prompt in prompts)))
+
+    # ------------------------------------------------------------------
+    # Sync shim
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name=f'{self.__class__.__name__}-loop', daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def submit_response(self, prompt: str | Any, *args, **kwargs) -> concurrent.futures.Future:
+        """Schedule a request on the background loop without blocking a thread on it."""
+        return asyncio.run_coroutine_threadsafe(self.aget_response(prompt, *args, **kwargs), self._ensure_loop())
+
+    def _run(self, coroutine):
+        """Run ``coroutine`` on the background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop()).result()
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        return self.submit_response(prompt, *args, **kwargs).result()
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        return self._run(self.aget_responses(prompt, n, *args, **kwargs))
+
+    def get_embedding(self, text: str | Any, *args, **kwargs) -> list:
+        return self._run(self.aget_embedding(text, *args, **kwargs))
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        return self._run(self.aget_embeddings(texts, *args, **kwargs))
+
+    def get_response_batch(self, prompts: List[str | Any]) -> List[Tuple[str, dict]]:
+        """Sync helper that keeps all prompts in flight at once from the calling thread."""
+        return self._run(self.aget_response_batch(prompts))
+
+    def close(self) -> None:
+        """Stop the background event loop used by the sync shim."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            state = self._loop_states.pop(loop, None)
+            if state is not None:
+                for conn in state.idle:
+                    loop.call_soon_threadsafe(conn.close)
+            loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,140 @@
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from .usage import merge_usage
+
+
+class CascadeLlm:
+    def __init__(self, tiers: List, adapter=None, validator: Optional[Callable[[str, Any], bool]] = None):
+        """
+        Model cascade usable wherever HttpsApi is accepted: try a cheap model first and escalate
+        to the next tier when its answer is not usable.
+
+        A response is escalated when the adapter cannot parse it into a non-empty solution, when
+        ``validator`` rejects it, or when the tier's request fails. The last tier's answer is
+        always returned.
+
+        :param tiers: LLM clients ordered from cheapest/fastest to strongest.
+        :param adapter: Adapter whose ``parse_response`` checks each answer (optional).
+        :param validator: Optional ``validator(response, solution) -> bool``; ``solution`` is the
+            parsed Solution, or None without an adapter. Cheap checks (syntax, a quick smoke
+            evaluation) fit here.
+        """
+        if not tiers:
+            raise ValueError('CascadeLlm needs at least one tier')
+        self.tiers = tiers
+        self.adapter = adapter
+        self.validator = validator
+
+        self._lock = threading.Lock()
+        self._stats = [{'requests': 0, 'accepted': 0, 'errors': 0, 'usage': {}} for _ in tiers]
+
+    def _make_chat_payload(self, prompt: str | Any, **generation_params) -> dict:
+        return self.tiers[0]._make_chat_payload(prompt, **generation_params)
+
+    def _accepts(self, response: str) -> bool:
+        solution = None
+        if self.adapter is not None:
+            try:
+                solution = self.adapter.parse_response(response)
+            except Exception:
+                return False
+            if solution is None or not solution.sol_string.strip():
+                return False
+        if self.validator is not None:
+            try:
+                return bool(self.validator(response, solution))
+            except Exception:
+                return False
+        return True
+
+    def _record(self, tier: int, usage: Optional[dict], accepted: int, errors: int = 0, requests: int = 1) -> None:
+        with self._lock:
+            stats = self._stats[tier]
+            stats['requests'] += requests
+            stats['accepted'] += accepted
+            stats['errors'] += errors
+            if usage:
+                stats['usage'] = merge_usage([stats['usage'], {k: v for k, v in usage.items() if k != 'n'}])
+
+    @staticmethod
+    def _model_name(llm) -> str:
+        return getattr(llm, '_model', type(llm).__name__)
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        """
+        :return: The response of the first tier whose answer was accepted (or of the last tier), and
+            the usage summed over all tiers tried, with a per-tier breakdown under ``tiers``.
+        """
+        tier_usages = []
+        for tier, llm in enumerate(self.tiers):
+            last_tier = tier == len(self.tiers) - 1
+            try:
+                response, usage = llm.get_response(prompt, *args, **kwargs)
+            except Exception as e:
+                self._record(tier, None, accepted=0, errors=1)
+                tier_usages.append({'tier': tier, 'model': self._model_name(llm), 'error': str(e)})
+                if last_tier:
+                    raise
+                continue
+            accepted = last_tier or self._accepts(response)
+            self._record(tier, usage, accepted=int(accepted))
+            tier_usages.append({'tier': tier, 'model': self._model_name(llm), 'usage': usage, 'accepted': accepted})
+            if accepted:
+                return response, self._combine_usage(tier_usages, tier)
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """n-completion counterpart of ``get_response``: rejected completions are re-sampled on the next tier."""
+        responses: List[Optional[str]] = [None] * n
+        pending = list(range(n))
+        tier_usages = []
+        last_used_tier = 0
+        for tier, llm in enumerate(self.tiers):
+            if not pending:
+                break
+            last_tier = tier == len(self.tiers) - 1
+            last_used_tier = tier
+            try:
+                if len(pending) == 1:
+                    response, usage = llm.get_response(prompt, *args, **kwargs)
+                    tier_responses = [response]
+                else:
+                    tier_responses, usage = llm.get_responses(prompt, len(pending), *args, **kwargs)
+            except Exception as e:
+                self._record(tier, None, accepted=0, errors=1)
+                tier_usages.append({'tier': tier, 'model': self._model_name(llm), 'error': str(e)})
+                if last_tier:
+                    raise
+                continue
+            still_pending = []
+            for index, response in zip(pending, tier_responses):
+                if last_tier or self._accepts(response):
+                    responses[index] = response
+                else:
+                    still_pending.append(index)
+            accepted = len(pending) - len(still_pending)
+            self._record(tier, usage, accepted=accepted, requests=len(pending))
+            tier_usages.append({'tier': tier, 'model': self._model_name(llm), 'usage': usage, 'accepted': accepted})
+            pending = still_pending
+        usage = self._combine_usage(tier_usages, last_used_tier)
+        usage['n'] = n
+        return responses, usage
+
+    @staticmethod
+    def _combine_usage(tier_usages: List[dict], final_tier: int) -> dict:
+        usage = merge_usage([entry.get('usage') for entry in tier_usages])
+        usage.update(tiers=tier_usages, cascade_tier=final_tier)
+        return usage
+
+    def get_embedding(self, text: str | Any, *args, **kwargs):
+        return self.tiers[0].get_embedding(text, *args, **kwargs)
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        return self.tiers[0].get_embeddings(texts, *args, **kwargs)
+
+    def get_cascade_stats(self) -> List[dict]:
+        """Per-tier request, acceptance and token counts."""
+        with self._lock:
+            return [dict(stats, tier=tier, model=self._model_name(self.tiers[tier]),
+                         acceptance_rate=stats['accepted'] / stats['requests'] if stats['requests'] else 0.0)
+                    for tier, stats in enumerate(self._stats)]
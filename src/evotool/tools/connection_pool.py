@@ -0,0 +1,179 @@
+import time
+import threading
+import http.client
+from collections import deque
+from contextlib import contextmanager
+from typing import Tuple
+
+from .transport import Transport, make_transport
+
+
+# Errors raised when a pooled keep-alive socket was closed by the server
+# while it sat idle. A request that fails with one of these on a reused
+# connection is retried once on a fresh connection.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class HttpsConnectionPool:
+    def __init__(self, host, timeout=60, max_size=10, idle_timeout=60.0, transport: Transport = None):
+        """
+        Thread-safe pool of persistent connections to a single host.
+
+        :param host: The host to connect to; a scheme (``http://``, ``unix://``) selects the transport.
+        :param timeout: The socket timeout of each connection.
+        :param max_size: Maximum number of idle connections kept for reuse.
+        :param idle_timeout: Idle connections older than this (seconds) are closed instead of reused.
+        :param transport: How connections are opened; by default chosen from ``host``.
+        """
+        self._host = host
+        self._transport = transport or make_transport(host)
+        self._timeout = timeout
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle = deque()  # (connection, last_used_time), most recently used on the right
+        self._connections_opened = 0
+        self._connections_reused = 0
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return self._transport.new_connection(self._timeout)
+
+    @staticmethod
+    def _apply_timeout(conn: http.client.HTTPConnection, timeout: Tuple[float, float] | None) -> None:
+        """Connect a fresh connection within the connect timeout, then switch its socket to the read timeout."""
+        if timeout is None:
+            return
+        connect_timeout, read_timeout = timeout
+        if conn.sock is None:
+            conn.timeout = connect_timeout
+            conn.connect()
+        conn.sock.settimeout(read_timeout)
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection if one is available, otherwise open a new one.
+
+        :return: The connection and whether it was reused from the pool.
+        """
+        expired = []
+        conn = None
+        with self._lock:
+            now = time.monotonic()
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used > self._idle_timeout:
+                    expired.append(candidate)
+                    continue
+                conn = candidate
+                self._connections_reused += 1
+                break
+            # Anything left on the left side is older than what we just looked at
+            while self._idle and now - self._idle[0][1] > self._idle_timeout:
+                expired.append(self._idle.popleft()[0])
+            if conn is None:
+                self._connections_opened += 1
+        for candidate in expired:
+            candidate.close()
+        if conn is None:
+            return self._new_connection(), False
+        return conn, True
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True) -> None:
+        """Return a connection to the pool, or close it if it cannot be reused."""
+        if reusable:
+            with self._lock:
+                if len(self._idle) < self._max_size:
+                    self._idle.append((conn, time.monotonic()))
+                    return
+        conn.close()
+
+    def request(self, method: str, url: str, body=None, headers=None,
+                timeout: Tuple[float, float] = None) -> Tuple[int, dict, bytes]:
+        """Send a request on a pooled connection and read the whole response.
+
+        A reused connection that turns out to be stale is discarded and the
+        request is sent again on a freshly opened connection.
+
+        :param timeout: Optional (connect, read) timeouts overriding the pool's timeout.
+        :return: The status code, the lower-cased response headers and the raw body.
+        """
+        headers = headers or {}
+        while True:
+            conn, reused = self.acquire()
+            try:
+                self._apply_timeout(conn, timeout)
+                conn.request(method, url, body, headers)
+                res = conn.getresponse()
+                data = res.read()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            self.release(conn, reusable=not res.will_close)
+            return res.status, {key.lower(): value for key, value in res.getheaders()}, data
+
+    @contextmanager
+    def stream(self, method: str, url: str, body=None, headers=None, timeout: Tuple[float, float] = None):
+        """Send a request on a pooled connection and yield the unread response and its socket.
+
+        The caller may change the socket timeout while reading, e.g. to bound the
+        gap between streamed chunks. The connection goes back to the pool only if
+        the caller read the response to the end; abandoning it early closes the
+        socket, which cancels the request on the server side.
+
+        :param timeout: Optional (connect, read) timeouts overriding the pool's timeout.
+        """
+        headers = headers or {}
+        while True:
+            conn, reused = self.acquire()
+            try:
+                self._apply_timeout(conn, timeout)
+                conn.request(method, url, body, headers)
+                sock = conn.sock
+                res = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            break
+        try:
+            yield res, sock
+        except BaseException:
+            conn.close()
+            raise
+        if res.isclosed() and not res.will_close:
+            self.release(conn)
+        else:
+            conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+    def get_stats(self) -> dict:
+        """Counters for confirming the connection reuse rate."""
+        with self._lock:
+            return {
+                'connections_opened': self._connections_opened,
+                'connections_reused': self._connections_reused,
+                'idle_connections': len(self._idle),
+            }
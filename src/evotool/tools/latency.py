@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    """Thread-safe latency statistics for one endpoint.
+
+    Keeps an exponentially weighted moving average for routing decisions and a
+    window of recent samples for percentile estimates.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        """
+        :param alpha: Weight of the newest sample in the moving average.
+        :param window: Number of recent samples kept for percentiles.
+        """
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self._ewma: Optional[float] = None
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._ewma = seconds if self._ewma is None else self.alpha * seconds + (1 - self.alpha) * self._ewma
+            self.count += 1
+
+    @property
+    def ewma(self) -> Optional[float]:
+        """The moving average in seconds, or None before the first sample."""
+        with self._lock:
+            return self._ewma
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The ``q``-th percentile (0-100) of the recent samples, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q / 100.0 * (len(samples) - 1)))))
+        return samples[index]
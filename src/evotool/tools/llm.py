@@ -1,105 +1,348 @@
 import json
-import traceback
-import http.client
-from typing import Any, Tuple
+import time
+from typing import Any, List, Tuple
+
+from .adaptive_timeout import AdaptiveTimeout, RESPONSE, RESPONSES, FIRST_TOKEN, STREAM_GAP, EMBEDDING
+from .connection_pool import HttpsConnectionPool
+from .transport import make_transport
+from .rate_limiter import RateLimiter
+from .retry import (RetryPolicy, RetryState, LlmRequestError, MALFORMED, TIMEOUT, check_response_status,
+                    decode_json_body, parsing_response)
+from .streaming import ChatStreamAccumulator
+from .llm_cache import EmbeddingCache
+from .usage import merge_usage
+
+
+# Sampling parameters forwarded to the chat completion payload
+GENERATION_PARAMS = ('temperature', 'max_tokens', 'top_p', 'stop', 'seed', 'response_format')
 
 
 class HttpsApi:
-    def __init__(self, host, key, model, url, timeout=60, **kwargs):
+    def __init__(self, host, key, model, url, timeout=60, max_connections=10, idle_timeout=60.0,
+                 rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None,
+                 embedding_batch_size: int = 64, embedding_cache: EmbeddingCache | str = None,
+                 connect_timeout: float = 10.0, adaptive_timeout: AdaptiveTimeout | bool = False, **kwargs):
         """
         Initialize the HttpsApi class.
 
-        :param host: The host of the API.
+        :param host: The host of the API. Plain hosts use HTTPS; ``http://host:port`` and
+            ``unix:///path/to.sock`` reach local OpenAI-compatible servers without TLS.
         :param key: The API key.
         :param model: The model to use.
         :param url: The URL of the API.
-        :param timeout: The timeout for the API request.
-        :param kwargs: Additional keyword arguments.
+        :param timeout: The longest read timeout of an API request.
+        :param max_connections: Maximum number of idle keep-alive connections kept for reuse.
+        :param idle_timeout: Seconds after which an idle keep-alive connection is closed instead of reused.
+        :param rate_limiter: Optional RateLimiter (possibly shared with other instances) that requests
+            wait on.
+        :param retry_policy: Per-error-class retry/backoff policy; defaults to RetryPolicy().
+        :param embedding_batch_size: Maximum number of texts sent in one ``get_embeddings`` request.
+        :param embedding_cache: Optional EmbeddingCache (or path to its SQLite file) consulted by
+            ``get_embeddings`` before calling the API.
+        :param connect_timeout: The timeout for opening a connection, independent of the read timeout.
+        :param adaptive_timeout: AdaptiveTimeout (possibly shared) deriving read timeouts from the observed
+            latency percentiles of this endpoint and model, bounded by ``timeout``. True creates one;
+            the default False always waits ``timeout``.
+        :param kwargs: Additional keyword arguments. Generation parameters (temperature, max_tokens,
+            top_p, stop, seed, response_format) given here are the defaults of every request.
         """
         self._host = host
         self._key = key
         self._model = model
         self._url = url
         self._timeout = timeout
+        self._connect_timeout = min(connect_timeout, timeout)
+        if adaptive_timeout is True:
+            adaptive_timeout = AdaptiveTimeout(max_timeout=timeout)
+        self._adaptive_timeout = adaptive_timeout or None
         self._kwargs = kwargs
-        self._max_retry = 10
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._rate_limiter = rate_limiter
+        self._embedding_batch_size = embedding_batch_size
+        if isinstance(embedding_cache, str):
+            embedding_cache = EmbeddingCache(embedding_cache)
+        self._embedding_cache = embedding_cache
+        self._transport = make_transport(host)
+        self._pool = HttpsConnectionPool(host, timeout=timeout, max_size=max_connections,
+                                         idle_timeout=idle_timeout, transport=self._transport)
 
-    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+    def get_connection_stats(self) -> dict:
+        """Return the connections opened/reused counters of the underlying pool."""
+        return self._pool.get_stats()
+
+    def _make_headers(self) -> dict:
+        return {
+            'Authorization': f'Bearer {self._key}',
+            'User-Agent': 'Apifox/1.0.0 (https://apifox.com)',
+            'Content-Type': 'application/json'
+        }
+
+    def _make_chat_payload(self, prompt: str | Any, **generation_params) -> dict:
+        """
+        Build the chat completion payload.
+
+        Generation parameters (see GENERATION_PARAMS) given here override those passed to the
+        constructor, other keyword arguments are ignored. Parameters that end up None are left out.
+        """
         if isinstance(prompt, str):
             prompt = [{'role': 'user', 'content': prompt.strip()}]
 
-        retry = 0
+        if self._model.startswith("o1-preview"):
+            for p in prompt:
+                if p['role'] == 'system':
+                    p['role'] = 'user'
+
+        payload = {
+            'temperature': self._kwargs.get('temperature', 1.0),
+            'model': self._model,
+            'messages': prompt
+        }
+        for name in GENERATION_PARAMS:
+            value = generation_params.get(name, self._kwargs.get(name))
+            if value is not None:
+                payload[name] = value
+            elif name in generation_params:
+                payload.pop(name, None)
+        return payload
+
+    @staticmethod
+    def _parse_chat_choices(data: dict) -> Tuple[List[str], dict]:
+        with parsing_response('chat completion'):
+            choices = sorted(data['choices'], key=lambda choice: choice.get('index', 0))
+            return [choice['message']['content'] for choice in choices], data['usage']
+
+    @staticmethod
+    def _parse_chat_data(data: dict) -> Tuple[str, dict]:
+        with parsing_response('chat completion'):
+            response = data['choices'][0]['message']['content']
+            usage = data['usage']
+        # if self._model.startswith('claude'):
+        #     response = data['content'][0]['text']
+        # else:
+        #     response = data['choices'][0]['message']['content']
+        return response, usage
+
+    def _make_embedding_payload(self, text: str | Any) -> dict:
+        return {'input': text, 'model': self._model}
+
+    @staticmethod
+    def _parse_embedding_data(data: dict) -> List[list]:
+        """The embeddings of a response, in input order (the API does not guarantee the order of the items)"""
+        with parsing_response('embedding'):
+            return [item['embedding'] for item in sorted(data['data'], key=lambda item: item['index'])]
+
+    def get_timeout_stats(self) -> List[dict]:
+        """Latency percentiles and read timeouts per request kind (empty without adaptive timeouts)."""
+        return self._adaptive_timeout.get_stats() if self._adaptive_timeout is not None else []
+
+    def _read_timeout(self, kind: str, retry_state: RetryState) -> float:
+        """Read timeout of the next attempt: adaptive if enabled, capped by ``timeout`` and the deadline."""
+        timeout = self._timeout
+        if self._adaptive_timeout is not None:
+            # A shared AdaptiveTimeout has its own max_timeout, which may exceed this client's timeout
+            timeout = min(timeout, self._adaptive_timeout.read_timeout(
+                self._host, self._model, kind, retry_state.retries.get(TIMEOUT, 0)
+            ))
+        remaining = retry_state.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise LlmRequestError('timeout error (call deadline exceeded before the request)', TIMEOUT)
+            timeout = min(timeout, remaining)
+        return timeout
+
+    def _record_latency(self, kind: str, seconds: float, timed_out: bool = False) -> None:
+        if self._adaptive_timeout is None:
+            return
+        if timed_out:
+            self._adaptive_timeout.record_timeout(self._host, self._model, kind, seconds)
+        else:
+            self._adaptive_timeout.record(self._host, self._model, kind, seconds)
+
+    def _post_json(self, url: str, payload: str, kind: str, retry_state: RetryState) -> dict:
+        """Send one request and return the decoded JSON body, checking the HTTP status first."""
+        start = time.monotonic()
+        try:
+            status, headers, data = self._pool.request(
+                'POST', url, payload, self._make_headers(),
+                timeout=(self._connect_timeout, self._read_timeout(kind, retry_state))
+            )
+        except TimeoutError:
+            self._record_latency(kind, time.monotonic() - start, timed_out=True)
+            raise
+        check_response_status(status, headers, data)
+        self._record_latency(kind, time.monotonic() - start)
+        return decode_json_body(data)
+
+    def _stream_chat(self, payload: dict, stream_parser, retry_state: RetryState) -> Tuple[str, dict]:
+        """
+        Stream a chat completion, stopping as soon as ``stream_parser`` reports a complete answer.
+
+        The first line and every following line get their own read timeout, so a stream that
+        stalls is abandoned long before a whole response could have timed out.
+        """
+        payload = dict(payload, stream=True, stream_options={'include_usage': True})
+        accumulator = ChatStreamAccumulator(stream_parser)
+        kind = FIRST_TOKEN
+        last = time.monotonic()
+        try:
+            timeout = (self._connect_timeout, self._read_timeout(FIRST_TOKEN, retry_state))
+            with self._pool.stream('POST', self._url, json.dumps(payload), self._make_headers(),
+                                   timeout=timeout) as (res, sock):
+                if not 200 <= res.status < 300:
+                    headers = {key.lower(): value for key, value in res.getheaders()}
+                    check_response_status(res.status, headers, res.read())
+                while True:
+                    line = res.readline()
+                    if line.strip():
+                        now = time.monotonic()
+                        self._record_latency(kind, now - last)
+                        if kind == FIRST_TOKEN:
+                            kind = STREAM_GAP
+                            sock.settimeout(self._read_timeout(STREAM_GAP, retry_state))
+                        last = now
+                    if not line or accumulator.feed_line(line.decode('utf-8')):
+                        break
+                if not accumulator.complete:
+                    res.read()  # drain the end of a finished stream so the connection can be reused
+        except TimeoutError:
+            self._record_latency(kind, time.monotonic() - last, timed_out=True)
+            raise
+        return accumulator.result(payload)
+
+    def _chat_with_retry(self, attempt) -> Tuple[Any, dict]:
+        """
+        Run ``attempt(retry_state)`` (one chat request returning (result, usage)) under the rate limiter
+        and retry policy.
+        """
+        retry_state = self._retry_policy.new_call()
         while True:
             try:
-                if self._model.startswith("o1-preview"):
-                    for p in prompt:
-                        if p['role'] == 'system':
-                            p['role'] = 'user'
-
-                conn = http.client.HTTPSConnection(self._host, timeout=self._timeout)
-                payload = json.dumps({
-                    # 'max_tokens': self._kwargs.get('max_tokens', 4096),
-                    # 'top_p': self._kwargs.get('top_p', None),
-                    'temperature': self._kwargs.get('temperature', 1.0),
-                    'model': self._model,
-                    'messages': prompt
-                })
-                headers = {
-                    'Authorization': f'Bearer {self._key}',
-                    'User-Agent': 'Apifox/1.0.0 (https://apifox.com)',
-                    'Content-Type': 'application/json'
-                }
-                conn.request('POST', self._url, payload, headers)
-                res = conn.getresponse()
-                data = res.read().decode('utf-8')
-                data = json.loads(data)
-                response = data['choices'][0]['message']['content']
-                usage = data['usage']
-                # if self._model.startswith('claude'):
-                #     response = data['content'][0]['text']
-                # else:
-                #     response = data['choices'][0]['message']['content']
-                return response, usage
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                result, usage = attempt(retry_state)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.record_usage(usage)
+                return result, usage
             except Exception as e:
-                retry += 1
-                if retry >= self._max_retry:
-                    raise RuntimeError(
-                        # f'{self.__class__.__name__} error: {traceback.format_exc()}.\n'
-                        f'Model Response Error! You may check your API host and API key.'
-                    )
-                else:
-                    print(f'Model Response Error! Retrying...')
-                    # print(f'{self.__class__.__name__} error: {traceback.format_exc()}. Retrying...\n')
+                try:
+                    delay = retry_state.on_error(e)
+                except LlmRequestError as final_error:
+                    raise LlmRequestError(
+                        f'Model Response Error! {final_error} You may check your API host and API key.',
+                        final_error.error_class, final_error.status
+                    ) from e
+                print(f'Model Response Error ({retry_state.last_error_class})! Retrying in {delay:.1f}s...')
+                time.sleep(delay)
+
+    def get_response(self, prompt: str | Any, *args, stream_parser=None, **kwargs) -> Tuple[str, dict]:
+        """
+        Send a chat completion request.
+
+        :param prompt: A string or a list of chat messages.
+        :param stream_parser: Optional incremental parser from the adapter. When given, the response is
+            streamed and the request is cancelled as soon as the parser reports a complete answer.
+        :param kwargs: Generation parameters overriding the instance defaults for this request.
+        :return: The response text and the usage dict.
+        """
+        payload_dict = self._make_chat_payload(prompt, **kwargs)
+        payload = json.dumps(payload_dict)
+
+        def attempt(retry_state):
+            if stream_parser is not None:
+                return self._stream_chat(payload_dict, stream_parser, retry_state)
+            return self._parse_chat_data(self._post_json(self._url, payload, RESPONSE, retry_state))
+
+        return self._chat_with_retry(attempt)
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """
+        Sample ``n`` completions of one prompt with the provider's ``n`` parameter.
+
+        The prompt is sent (and its tokens charged) once for all completions. Providers that return
+        fewer choices than requested are asked again for the rest.
+
+        :param prompt: A string or a list of chat messages.
+        :param n: The number of completions.
+        :param kwargs: Generation parameters overriding the instance defaults for this request.
+        :return: The response texts and the usage dict summed over all requests, with ``n`` added.
+        """
+        payload_dict = self._make_chat_payload(prompt, **kwargs)
+        responses, usages = [], []
+        while len(responses) < n:
+            payload = json.dumps(dict(payload_dict, n=n - len(responses)))
+            choices, usage = self._chat_with_retry(
+                lambda retry_state: self._parse_chat_choices(
+                    self._post_json(self._url, payload, RESPONSES, retry_state)
+                )
+            )
+            if not choices:
+                raise LlmRequestError('Model Response Error! The response contains no choices.', MALFORMED)
+            responses += choices[:n - len(responses)]
+            usages.append(usage)
+        return responses, dict(merge_usage(usages), n=n)
+
     def get_embedding(self, text: str | Any, *args, **kwargs) -> str:
+        data = self._request_embeddings(text)
+        with parsing_response('embedding'):
+            return data['data'][0]['embedding']
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        """
+        Embed several texts, ``embedding_batch_size`` texts per request.
+
+        Texts already in the embedding cache are not sent; new embeddings are added to it.
+
+        :param texts: The texts to embed.
+        :return: One embedding per text, in the order of ``texts``.
+        """
+        found, batches = self._plan_embeddings(texts)
+        for batch in batches:
+            self._store_embeddings(found, batch, self._parse_embedding_data(self._request_embeddings(batch)))
+        return [found[EmbeddingCache.text_hash(text)] for text in texts]
+
+    def _plan_embeddings(self, texts: List[str]) -> Tuple[dict, List[List[str]]]:
+        """The cached embeddings of ``texts`` by text hash, and the batches of new texts to request"""
+        cache = self._embedding_cache
+        found = cache.get_many(self._model, texts) if cache is not None else {}
+        missing = []
+        for text in texts:
+            if EmbeddingCache.text_hash(text) not in found and text not in missing:
+                missing.append(text)
+        size = self._embedding_batch_size
+        return found, [missing[start:start + size] for start in range(0, len(missing), size)]
+
+    def _store_embeddings(self, found: dict, batch: List[str], embeddings: List[list]) -> None:
+        """Add the embeddings received for ``batch`` to ``found`` and the embedding cache"""
+        if len(embeddings) != len(batch):
+            raise LlmRequestError(
+                f'Expected {len(batch)} embeddings, received {len(embeddings)}', MALFORMED
+            )
+        if self._embedding_cache is not None:
+            self._embedding_cache.put_many(self._model, list(zip(batch, embeddings)))
+        for text, embedding in zip(batch, embeddings):
+            found[EmbeddingCache.text_hash(text)] = embedding
 
-        content_embedding = {'input': text, 'model': self._model}
+    def _request_embeddings(self, text: str | List[str] | Any) -> dict:
+        payload = json.dumps(self._make_embedding_payload(text))
 
-        retry = 0
+        retry_state = self._retry_policy.new_call()
         while True:
             try:
-                conn = http.client.HTTPSConnection(self._host, timeout=self._timeout)
-                payload = json.dumps(content_embedding)
-                headers = {
-                    'Authorization': f'Bearer {self._key}',
-                    'User-Agent': 'Apifox/1.0.0 (https://apifox.com)',
-                    'Content-Type': 'application/json'
-                }
-                conn.request('POST', "/v1/embeddings", payload, headers)
-                res = conn.getresponse()
-                data = res.read().decode('utf-8')
-                data = json.loads(data)
-                response = data['data'][0]['embedding']
-                # if self._model.startswith('claude'):
-                #     response = data['content'][0]['text']
-                # else:
-                #     response = data['choices'][0]['message']['content']
-                return response
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                data = self._post_json("/v1/embeddings", payload, EMBEDDING, retry_state)
+                if self._rate_limiter is not None:
+                    self._rate_limiter.record_usage(data.get('usage'))
+                return data
             except Exception as e:
-                retry += 1
-                if retry >= self._max_retry:
-                    raise RuntimeError(
-                        f'{self.__class__.__name__} error: {traceback.format_exc()}.\n'
-                        f'You may check your API host and API key.'
-                    )
-                else:
-                    print(f'{self.__class__.__name__} error: {traceback.format_exc()}. Retrying...\n')
\ No newline at end of file
+                try:
+                    delay = retry_state.on_error(e)
+                except LlmRequestError as final_error:
+                    raise LlmRequestError(
+                        f'{self.__class__.__name__} error: {final_error}. '
+                        f'You may check your API host and API key.',
+                        final_error.error_class, final_error.status
+                    ) from e
+                print(f'{self.__class__.__name__} error ({retry_state.last_error_class}): {e}. '
+                      f'Retrying in {delay:.1f}s...')
+                time.sleep(delay)
@@ -0,0 +1,261 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .usage import merge_usage
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class LlmResponseCache:
+    def __init__(self, path: str, max_size_bytes: Optional[int] = None):
+        """
+        Content-addressed store of LLM responses in a SQLite file.
+
+        :param path: Path of the SQLite database file.
+        :param max_size_bytes: When the stored responses exceed this size, the least recently
+            used entries are evicted. None keeps everything.
+        """
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, response TEXT, usage TEXT, size INTEGER, '
+                'created REAL, last_access REAL)'
+            )
+
+    def get(self, key: str) -> Optional[Tuple[str, dict]]:
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT response, usage FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        return row[0], json.loads(row[1])
+
+    def put(self, key: str, response: str, usage: dict) -> None:
+        usage_str = json.dumps(usage)
+        size = len(response.encode('utf-8')) + len(usage_str)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, response, usage, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, response, usage_str, size, now, now)
+            )
+            if self.max_size_bytes is not None:
+                self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        excess = total - self.max_size_bytes
+        evicted = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'entries': count, 'size_bytes': total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str):
+        """
+        Persistent store of embeddings in a SQLite file, keyed by (model, sha256(text)).
+
+        Unlike LlmResponseCache, embeddings are deterministic, so one entry per text is kept
+        and shared by every task and run that points at the same file.
+
+        :param path: Path of the SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                'model TEXT, text_hash TEXT, embedding TEXT, created REAL, '
+                'PRIMARY KEY (model, text_hash))'
+            )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, list]:
+        """Look up several texts at once.
+
+        :return: Embeddings of the texts found in the cache, keyed by their text hash.
+        """
+        hashes = list({self.text_hash(text) for text in texts})
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on the number of bound parameters
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f'SELECT text_hash, embedding FROM embeddings WHERE model = ? '
+                    f'AND text_hash IN ({", ".join("?" * len(chunk))})',
+                    (model, *chunk)
+                ).fetchall()
+                for text_hash, embedding in rows:
+                    found[text_hash] = json.loads(embedding)
+            self.hits += sum(1 for text in texts if self.text_hash(text) in found)
+            self.misses += sum(1 for text in texts if self.text_hash(text) not in found)
+        return found
+
+    def put_many(self, model: str, items: List[Tuple[str, list]]) -> None:
+        """Store (text, embedding) pairs."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (model, text_hash, embedding, created) VALUES (?, ?, ?, ?)',
+                [(model, self.text_hash(text), json.dumps(embedding), now) for text, embedding in items]
+            )
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'entries': count}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedLlm:
+    READ_THROUGH = 'read_through'
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    def __init__(self, llm, cache: LlmResponseCache | str, mode: str = READ_THROUGH):
+        """
+        Opt-in response cache around an HttpsApi, usable wherever HttpsApi is accepted.
+
+        Requests are keyed by the full request payload (model, messages, temperature and other
+        sampling parameters) plus a sample index, the number of times the same payload has
+        already been requested through this wrapper. Repeated identical prompts therefore map
+        to distinct recorded samples, and re-running a config replays them in order.
+
+        :param llm: The HttpsApi (or compatible client) to wrap.
+        :param cache: An LlmResponseCache or a path to its SQLite file.
+        :param mode: ``read_through`` serves hits and records misses, ``record`` always calls
+            the API and overwrites recordings, ``replay`` never calls the API and raises
+            CacheMissError on a miss.
+        """
+        if mode not in (self.READ_THROUGH, self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.llm = llm
+        self.cache = cache if isinstance(cache, LlmResponseCache) else LlmResponseCache(cache)
+        self.mode = mode
+
+        self._lock = threading.Lock()
+        self._sample_counts: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _make_keys(self, prompt: str | Any, n: int = 1, **kwargs) -> List[str]:
+        # The payload picks the generation parameters out of kwargs, so they are part of the key
+        payload = self.llm._make_chat_payload(copy.deepcopy(prompt), **kwargs)
+        payload_hash = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+        with self._lock:
+            sample_index = self._sample_counts.get(payload_hash, 0)
+            self._sample_counts[payload_hash] = sample_index + n
+        return [f'{payload_hash}:{index}' for index in range(sample_index, sample_index + n)]
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        key = self._make_keys(prompt, **kwargs)[0]
+        if self.mode != self.RECORD:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                response, usage = cached
+                return response, dict(usage, cached=True)
+            if self.mode == self.REPLAY:
+                raise CacheMissError(f'No recorded response for request {key} in {self.cache.path}')
+        with self._lock:
+            self.misses += 1
+        response, usage = self.llm.get_response(prompt, *args, **kwargs)
+        self.cache.put(key, response, usage)
+        return response, usage
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """n-completion counterpart of ``get_response``; each completion is cached as its own sample."""
+        keys = self._make_keys(prompt, n, **kwargs)
+        cached = {}
+        if self.mode != self.RECORD:
+            for key in keys:
+                entry = self.cache.get(key)
+                if entry is not None:
+                    cached[key] = entry
+            missing = [key for key in keys if key not in cached]
+            if missing and self.mode == self.REPLAY:
+                raise CacheMissError(f'No recorded response for request {missing[0]} in {self.cache.path}')
+        else:
+            missing = keys
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(missing)
+
+        cached_usage = merge_usage([usage for _, usage in cached.values()])
+        if missing:
+            responses, usage = self.llm.get_responses(prompt, len(missing), *args, **kwargs)
+            for index, (key, response) in enumerate(zip(missing, responses)):
+                # The combined usage is stored once so that replayed totals match the original run
+                self.cache.put(key, response, usage if index == 0 else {})
+                cached[key] = (response, usage)
+            # Only the API call is spent; the replayed part is reported on the side
+            usage = dict(usage)
+            if cached_usage:
+                usage['cached_usage'] = cached_usage
+        else:
+            usage = dict(cached_usage, cached=True)
+        usage['n'] = n
+        return [cached[key][0] for key in keys], usage
+
+    def get_embedding(self, text: str | Any, *args, **kwargs):
+        return self.llm.get_embedding(text, *args, **kwargs)
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        return self.llm.get_embeddings(texts, *args, **kwargs)
+
+    def get_cache_stats(self) -> dict:
+        with self._lock:
+            stats = {'hits': self.hits, 'misses': self.misses}
+        stats.update(self.cache.get_stats())
+        return stats
+
+    def __getattr__(self, name):
+        # Forward everything else (stats, model info, ...) to the wrapped client
+        return getattr(self.llm, name)
@@ -0,0 +1,192 @@
+import math
+import time
+import random
+import threading
+from typing import Any, List, Optional, Tuple
+
+
+class _Arm:
+    def __init__(self, llm):
+        self.llm = llm
+        self.pulls = 0
+        self.pending = 0.0
+        self.outcomes = 0.0
+        self.reward_sum = 0.0
+        self.valid = 0.0
+        self.improvements = 0
+        self.cost_spent = 0.0
+
+
+class LlmPortfolio:
+    UCB = 'ucb'
+    THOMPSON = 'thompson'
+
+    def __init__(self, arms: List, strategy: str = UCB, reward: str = 'improvement', cost: str = 'tokens',
+                 exploration: float = 1.0):
+        """
+        Multi-armed bandit over several models, usable wherever HttpsApi is accepted.
+
+        Each request is served by the arm picked by the bandit. The method reports how the resulting
+        candidate did through ``record_outcome``, and the reward (score improvement or validity, per
+        1k tokens or per second) steers later requests toward the model that produces improvements
+        fastest for the task at hand. Candidates that are dropped before their evaluation are handed
+        back through ``release_outcome``.
+
+        :param arms: The LLM clients to choose from.
+        :param strategy: ``ucb`` (UCB1) or ``thompson`` (Thompson sampling).
+        :param reward: ``improvement`` rewards the score gain over the baseline passed to
+            ``record_outcome``; ``valid`` rewards every valid candidate.
+        :param cost: ``tokens`` divides the reward by thousands of total tokens, ``seconds`` by
+            request latency.
+        :param exploration: Weight of the UCB exploration term.
+        """
+        if not arms:
+            raise ValueError('LlmPortfolio needs at least one arm')
+        if strategy not in (self.UCB, self.THOMPSON):
+            raise ValueError(f'Unknown bandit strategy: {strategy}')
+        if reward not in ('improvement', 'valid') or cost not in ('tokens', 'seconds'):
+            raise ValueError(f'Unknown reward/cost: {reward}/{cost}')
+        self._arms = [_Arm(llm) for llm in arms]
+        self.strategy = strategy
+        self.reward = reward
+        self.cost = cost
+        self.exploration = exploration
+        self._lock = threading.Lock()
+        self._max_reward = 0.0
+
+    @property
+    def arms(self) -> list:
+        return [arm.llm for arm in self._arms]
+
+    def _make_chat_payload(self, prompt: str | Any, **generation_params) -> dict:
+        return self._arms[0].llm._make_chat_payload(prompt, **generation_params)
+
+    def _normalized_mean(self, arm: _Arm) -> float:
+        if arm.outcomes == 0 or self._max_reward == 0:
+            return 0.0
+        return arm.reward_sum / arm.outcomes / self._max_reward
+
+    def _select(self) -> int:
+        with self._lock:
+            # Candidates already in flight count as pulls, so parallel samplers spread over the arms
+            counts = [arm.outcomes + arm.pending for arm in self._arms]
+            untried = [index for index, count in enumerate(counts) if count == 0]
+            if untried:
+                index = untried[0]
+            elif self.strategy == self.UCB:
+                total = sum(counts)
+                index = max(range(len(self._arms)), key=lambda i: self._normalized_mean(self._arms[i])
+                            + self.exploration * math.sqrt(2 * math.log(total) / counts[i]))
+            else:
+                def sample(arm: _Arm) -> float:
+                    # Beta posterior over the normalized reward, treated as a fractional success
+                    successes = self._normalized_mean(arm) * arm.outcomes
+                    return random.betavariate(1 + successes, 1 + max(0.0, arm.outcomes - successes))
+                index = max(range(len(self._arms)), key=lambda i: sample(self._arms[i]))
+            arm = self._arms[index]
+            arm.pulls += 1
+            arm.pending += 1
+            return index
+
+    def _tag_usage(self, index: int, usage: dict, latency: float) -> dict:
+        return dict(usage, portfolio_arm=index, portfolio_latency=latency,
+                    model=usage.get('model', getattr(self._arms[index].llm, '_model', None)))
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        """
+        :return: The response and its usage, tagged with ``portfolio_arm`` and ``portfolio_latency``
+            so the outcome can be reported back through ``record_outcome``.
+        """
+        index = self._select()
+        start = time.monotonic()
+        try:
+            response, usage = self._arms[index].llm.get_response(prompt, *args, **kwargs)
+        except Exception:
+            # A failed request is a zero-reward outcome for its arm
+            self.record_outcome({'portfolio_arm': index, 'portfolio_latency': time.monotonic() - start}, valid=False)
+            raise
+        return response, self._tag_usage(index, usage, time.monotonic() - start)
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """n-completion request on one arm; report each completion's outcome with the shared usage."""
+        index = self._select()
+        start = time.monotonic()
+        try:
+            responses, usage = self._arms[index].llm.get_responses(prompt, n, *args, **kwargs)
+        except Exception:
+            self.record_outcome({'portfolio_arm': index, 'portfolio_latency': time.monotonic() - start}, valid=False)
+            raise
+        return responses, self._tag_usage(index, dict(usage, n=n), time.monotonic() - start)
+
+    def get_embedding(self, text: str | Any, *args, **kwargs):
+        return self._arms[0].llm.get_embedding(text, *args, **kwargs)
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        return self._arms[0].llm.get_embeddings(texts, *args, **kwargs)
+
+    def record_outcome(self, usage: dict, valid: bool, score: Optional[float] = None,
+                       baseline_score: Optional[float] = None) -> None:
+        """
+        Feed back how a candidate produced by this portfolio did.
+
+        :param usage: The usage dict returned with the response (identifies the arm and the cost).
+            For an n-completion response, call once per completion with the same usage.
+        :param valid: Whether the candidate was valid.
+        :param score: Its score (higher is better).
+        :param baseline_score: The best score before the candidate, for improvement rewards.
+        """
+        index = (usage or {}).get('portfolio_arm')
+        if index is None:
+            return
+        share = 1.0 / usage.get('n', 1)
+        if self.reward == 'valid':
+            gain = 1.0 if valid else 0.0
+        elif valid and score is not None and baseline_score is not None and score > baseline_score:
+            gain = score - baseline_score
+        else:
+            gain = 0.0
+        if self.cost == 'tokens':
+            spent = usage.get('total_tokens', 0) * share
+            cost = spent / 1000.0
+        else:
+            spent = usage.get('portfolio_latency', 0.0) * share
+            cost = spent
+        reward = gain / max(cost, 1e-6) if gain > 0 else 0.0
+
+        with self._lock:
+            arm = self._arms[index]
+            arm.pending = max(0.0, arm.pending - share)
+            arm.outcomes += share
+            arm.reward_sum += reward * share
+            arm.valid += share if valid else 0.0
+            arm.improvements += int(gain > 0 and self.reward == 'improvement')
+            arm.cost_spent += spent
+            self._max_reward = max(self._max_reward, reward)
+
+    def release_outcome(self, usage: dict) -> None:
+        """
+        Forget a candidate that will never be evaluated (discarded, dropped or cancelled), without an outcome.
+
+        :param usage: The usage dict returned with the response. For an n-completion response, call once
+            per such completion.
+        """
+        index = (usage or {}).get('portfolio_arm')
+        if index is None:
+            return
+        with self._lock:
+            arm = self._arms[index]
+            arm.pending = max(0.0, arm.pending - 1.0 / usage.get('n', 1))
+
+    def get_portfolio_stats(self) -> List[dict]:
+        """Per-arm pulls, reward and validity statistics."""
+        with self._lock:
+            return [{
+                'arm': index,
+                'model': getattr(arm.llm, '_model', type(arm.llm).__name__),
+                'pulls': arm.pulls,
+                'outcomes': arm.outcomes,
+                'mean_reward': arm.reward_sum / arm.outcomes if arm.outcomes else 0.0,
+                'valid_rate': arm.valid / arm.outcomes if arm.outcomes else 0.0,
+                'improvements': arm.improvements,
+                self.cost: arm.cost_spent,
+            } for index, arm in enumerate(self._arms)]
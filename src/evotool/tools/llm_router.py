@@ -0,0 +1,343 @@
+import copy
+import time
+import threading
+import concurrent.futures
+from typing import Any, List, Optional, Tuple
+
+from .latency import LatencyTracker
+from .retry import LlmRequestError, BAD_REQUEST, CONNECTION
+
+
+class _Endpoint:
+    def __init__(self, llm, max_in_flight: int, ewma_alpha: float):
+        self.llm = llm
+        self.max_in_flight = max_in_flight
+        self.latency = LatencyTracker(alpha=ewma_alpha)
+        self.in_flight = 0
+        self.consecutive_errors = 0
+        self.ejected_until: Optional[float] = None
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def name(self) -> str:
+        return getattr(self.llm, '_host', repr(self.llm))
+
+
+class LlmRouter:
+    def __init__(self, endpoints: List, max_in_flight_per_endpoint: int = 16, eject_after_errors: int = 3,
+                 probe_interval: float = 30.0, ewma_alpha: float = 0.2, hedge_percentile: Optional[float] = None,
+                 hedge_budget: float = 0.1, hedge_min_delay: float = 1.0, hedge_min_samples: int = 20):
+        """
+        Route requests over several endpoints serving the same model; usable wherever HttpsApi is accepted.
+
+        Each request goes to the endpoint with the lowest latency moving average that still has free
+        capacity (endpoints without samples yet are tried first). A failed request fails over to the
+        next best endpoint. An endpoint that fails ``eject_after_errors`` times in a row is taken out
+        of rotation and, after ``probe_interval`` seconds, receives a single probe request that puts
+        it back on success.
+
+        Each endpoint still applies its own RetryPolicy before the router fails over, so give the
+        endpoints a small policy (e.g. ``RetryPolicy(max_attempts=2)``) for fast failover.
+
+        :param endpoints: HttpsApi (or compatible) clients, one per replica.
+        :param max_in_flight_per_endpoint: Concurrent requests allowed per endpoint; callers beyond
+            the total capacity wait for a free slot.
+        :param eject_after_errors: Consecutive failures after which an endpoint is ejected.
+        :param probe_interval: Seconds an ejected endpoint stays out of rotation before a probe.
+        :param ewma_alpha: Weight of the newest latency sample in the moving average.
+        :param hedge_percentile: Enables request hedging. A ``get_response`` call still running after
+            this latency percentile (e.g. 95) of its endpoint sends a duplicate request to another
+            endpoint, or to the same one if it is the only one with capacity. The first answer wins
+            and the other request is cancelled. Clients that only offer a blocking call cannot be
+            cancelled: the losing request runs to completion, its answer is discarded and its usage is
+            kept for ``pop_late_usage``. None disables hedging.
+        :param hedge_budget: Maximum fraction of requests that may be hedged.
+        :param hedge_min_delay: Never hedge a request earlier than this many seconds.
+        :param hedge_min_samples: Latency samples an endpoint needs before its requests are hedged.
+        """
+        if not endpoints:
+            raise ValueError('LlmRouter needs at least one endpoint')
+        self._endpoints = [_Endpoint(llm, max_in_flight_per_endpoint, ewma_alpha) for llm in endpoints]
+        self._eject_after_errors = eject_after_errors
+        self._probe_interval = probe_interval
+        self._cond = threading.Condition()
+
+        self._hedge_percentile = hedge_percentile
+        self._hedge_budget = hedge_budget
+        self._hedge_min_delay = hedge_min_delay
+        self._hedge_min_samples = hedge_min_samples
+        self._executor = None
+        self._hedge_stats = {'requests': 0, 'hedged': 0, 'hedge_won': 0, 'budget_exhausted': 0}
+        self._late_usage: List[dict] = []
+
+    @property
+    def endpoints(self) -> list:
+        return [endpoint.llm for endpoint in self._endpoints]
+
+    def _make_chat_payload(self, prompt: str | Any, **generation_params) -> dict:
+        # All endpoints serve the same model, so the payload (and any cache key derived from it) is shared
+        return self._endpoints[0].llm._make_chat_payload(prompt, **generation_params)
+
+    def _available(self, endpoint: _Endpoint, now: float) -> bool:
+        if endpoint.ejected_until is not None:
+            return not endpoint.probing and now >= endpoint.ejected_until
+        return endpoint.in_flight < endpoint.max_in_flight
+
+    def _acquire(self, tried: List[_Endpoint], block: bool = True) -> Optional[_Endpoint]:
+        """Block until an endpoint that was not tried yet has capacity and reserve a slot on it.
+
+        With ``block=False``, return None instead of waiting.
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                candidates = [e for e in self._endpoints if e not in tried and self._available(e, now)]
+                if candidates:
+                    endpoint = min(candidates, key=lambda e: (e.latency.ewma or 0.0, e.in_flight))
+                    if endpoint.ejected_until is not None:
+                        endpoint.probing = True
+                    endpoint.in_flight += 1
+                    endpoint.requests += 1
+                    return endpoint
+                if not block:
+                    return None
+                healthy_left = [e for e in self._endpoints if e not in tried and e.ejected_until is None]
+                if not healthy_left and tried:
+                    raise LlmRequestError('All endpoints failed or are ejected', CONNECTION)
+                # Wake up for freed slots, and in time for the next probe of an ejected endpoint
+                probe_times = [e.ejected_until - now for e in self._endpoints
+                               if e not in tried and e.ejected_until is not None and not e.probing]
+                self._cond.wait(timeout=max(0.01, min(probe_times)) if probe_times else None)
+
+    def _release(self, endpoint: _Endpoint, latency: Optional[float], error: Optional[BaseException]) -> None:
+        with self._cond:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+            if error is None:
+                if latency is not None:
+                    endpoint.latency.record(latency)
+                endpoint.consecutive_errors = 0
+                if endpoint.ejected_until is not None:
+                    print(f'LlmRouter: endpoint {endpoint.name} is healthy again.')
+                    endpoint.ejected_until = None
+            else:
+                endpoint.errors += 1
+                endpoint.consecutive_errors += 1
+                if endpoint.ejected_until is not None or endpoint.consecutive_errors >= self._eject_after_errors:
+                    if endpoint.ejected_until is None:
+                        print(f'LlmRouter: ejecting endpoint {endpoint.name} after '
+                              f'{endpoint.consecutive_errors} consecutive errors.')
+                    endpoint.ejected_until = time.monotonic() + self._probe_interval
+            self._cond.notify_all()
+
+    def _release_slot(self, endpoint: _Endpoint) -> None:
+        """Give back the slot of a request that was cancelled, which says nothing about the endpoint's health."""
+        with self._cond:
+            endpoint.in_flight -= 1
+            endpoint.probing = False
+            self._cond.notify_all()
+
+    def _call(self, method: str, *args, **kwargs):
+        tried: List[_Endpoint] = []
+        while True:
+            try:
+                endpoint = self._acquire(tried)
+            except LlmRequestError:
+                raise last_error
+            start = time.monotonic()
+            try:
+                result = getattr(endpoint.llm, method)(*args, **kwargs)
+            except Exception as e:
+                # The request itself is invalid, so every other endpoint would reject it as well
+                if isinstance(e, LlmRequestError) and e.error_class == BAD_REQUEST:
+                    self._release(endpoint, None, None)
+                    raise
+                self._release(endpoint, None, e)
+                tried.append(endpoint)
+                last_error = e
+                if len(tried) < len(self._endpoints):
+                    print(f'LlmRouter: endpoint {endpoint.name} failed ({e}); failing over.')
+                    continue
+                raise
+            self._release(endpoint, time.monotonic() - start, None)
+            return endpoint, result
+
+    def _submit(self, endpoint: _Endpoint, args, kwargs) -> Tuple[concurrent.futures.Future, float]:
+        """Start a request on ``endpoint`` without waiting for it; its slot is released when it finishes."""
+        # Clients with a native submit_response (AsyncHttpsApi) can really cancel a losing request
+        if hasattr(type(endpoint.llm), 'submit_response'):
+            future = endpoint.llm.submit_response(*args, **kwargs)
+        else:
+            with self._cond:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=sum(e.max_in_flight for e in self._endpoints),
+                        thread_name_prefix='LlmRouter'
+                    )
+            future = self._executor.submit(endpoint.llm.get_response, *args, **kwargs)
+        start = time.monotonic()
+
+        def release(done: concurrent.futures.Future):
+            if done.cancelled():
+                self._release_slot(endpoint)
+                return
+            error = done.exception()
+            if error is None:
+                self._release(endpoint, time.monotonic() - start, None)
+            elif isinstance(error, LlmRequestError) and error.error_class == BAD_REQUEST:
+                self._release(endpoint, None, None)
+            else:
+                self._release(endpoint, None, error)
+
+        future.add_done_callback(release)
+        return future, start
+
+    def _abandon(self, pending: dict) -> None:
+        """Cancel the requests that lost; the usage of those that cannot be cancelled is kept once they finish."""
+        for future, endpoint in pending.items():
+            if future.cancel():
+                continue
+
+            def keep_usage(done: concurrent.futures.Future, endpoint=endpoint):
+                if done.cancelled() or done.exception() is not None:
+                    return
+                _, usage = done.result()
+                with self._cond:
+                    self._late_usage.append(dict(usage, endpoint=endpoint.name, hedged=True, hedge_won=False))
+
+            future.add_done_callback(keep_usage)
+
+    def _hedge_delay(self, endpoint: _Endpoint) -> Optional[float]:
+        if endpoint.latency.count < self._hedge_min_samples:
+            return None
+        return max(self._hedge_min_delay, endpoint.latency.percentile(self._hedge_percentile))
+
+    def _take_hedge_budget(self) -> bool:
+        with self._cond:
+            stats = self._hedge_stats
+            if stats['hedged'] + 1 > self._hedge_budget * stats['requests']:
+                stats['budget_exhausted'] += 1
+                return False
+            stats['hedged'] += 1
+            return True
+
+    def _hedged_response(self, args, kwargs) -> Tuple[_Endpoint, Tuple[str, dict], Optional[bool]]:
+        """Run one get_response call with hedging and failover.
+
+        :return: The winning endpoint, its result and whether the hedge won (None if no hedge was sent).
+        """
+        with self._cond:
+            self._hedge_stats['requests'] += 1
+        tried: List[_Endpoint] = []
+        pending = {}
+        hedge_future = None
+        hedge_checked = False
+        last_error = None
+
+        primary = self._acquire(tried)
+        tried.append(primary)
+        future, start = self._submit(primary, args, kwargs)
+        pending[future] = primary
+        while pending:
+            timeout = None
+            if not hedge_checked:
+                delay = self._hedge_delay(primary)
+                if delay is None:
+                    hedge_checked = True
+                else:
+                    timeout = max(0.0, start + delay - time.monotonic())
+            done, _ = concurrent.futures.wait(pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                # The primary request is in its latency tail: send one duplicate if the budget allows
+                hedge_checked = True
+                if self._take_hedge_budget():
+                    endpoint = self._acquire([primary], block=False) or self._acquire([], block=False)
+                    if endpoint is not None:
+                        # The hedge streams into its own parser, the primary may still be feeding the caller's
+                        hedge_kwargs = dict(kwargs)
+                        if hedge_kwargs.get('stream_parser') is not None:
+                            hedge_kwargs['stream_parser'] = copy.deepcopy(hedge_kwargs['stream_parser'])
+                        hedge_future, _ = self._submit(endpoint, args, hedge_kwargs)
+                        pending[hedge_future] = endpoint
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if isinstance(e, LlmRequestError) and e.error_class == BAD_REQUEST:
+                        self._abandon(pending)
+                        raise
+                    last_error = e
+                    continue
+                self._abandon(pending)
+                hedge_won = None if hedge_future is None else future is hedge_future
+                if hedge_won:
+                    with self._cond:
+                        self._hedge_stats['hedge_won'] += 1
+                return endpoint, result, hedge_won
+            if not pending:
+                # Every request in flight failed: fail over to an endpoint that was not tried yet
+                try:
+                    endpoint = self._acquire(tried)
+                except LlmRequestError:
+                    raise last_error
+                print(f'LlmRouter: request failed ({last_error}); failing over to {endpoint.name}.')
+                tried.append(endpoint)
+                future, _ = self._submit(endpoint, args, kwargs)
+                pending[future] = endpoint
+        raise last_error
+
+    def get_response(self, prompt: str | Any, *args, **kwargs) -> Tuple[str, dict]:
+        if self._hedge_percentile is None:
+            endpoint, (response, usage) = self._call('get_response', prompt, *args, **kwargs)
+            return response, dict(usage, endpoint=endpoint.name)
+        endpoint, (response, usage), hedge_won = self._hedged_response((prompt, *args), kwargs)
+        usage = dict(usage, endpoint=endpoint.name)
+        if hedge_won is not None:
+            usage.update(hedged=True, hedge_won=hedge_won)
+        return response, usage
+
+    def get_responses(self, prompt: str | Any, n: int, *args, **kwargs) -> Tuple[List[str], dict]:
+        """n-completion request on one endpoint (not hedged, since it already carries several samples)."""
+        endpoint, (responses, usage) = self._call('get_responses', prompt, n, *args, **kwargs)
+        return responses, dict(usage, endpoint=endpoint.name)
+
+    def get_embedding(self, text: str | Any, *args, **kwargs):
+        return self._call('get_embedding', text, *args, **kwargs)[1]
+
+    def get_embeddings(self, texts: List[str], *args, **kwargs) -> List[list]:
+        return self._call('get_embeddings', texts, *args, **kwargs)[1]
+
+    def pop_late_usage(self) -> List[dict]:
+        """Usage of hedged requests that lost but still ran to completion since the last call.
+
+        These calls were paid for without producing the returned answer; the evolutionary methods add
+        them to the run's usage ledger so they count against its budget.
+        """
+        with self._cond:
+            late_usage, self._late_usage = self._late_usage, []
+        return late_usage
+
+    def get_stats(self) -> List[dict]:
+        """Per-endpoint routing statistics."""
+        with self._cond:
+            now = time.monotonic()
+            return [{
+                'endpoint': endpoint.name,
+                'requests': endpoint.requests,
+                'errors': endpoint.errors,
+                'in_flight': endpoint.in_flight,
+                'ewma_latency': endpoint.latency.ewma,
+                'ejected': endpoint.ejected_until is not None,
+                'probe_in': max(0.0, endpoint.ejected_until - now) if endpoint.ejected_until is not None else None,
+            } for endpoint in self._endpoints]
+
+    def get_hedge_stats(self) -> dict:
+        """How many requests were hedged and how often the hedge answered first."""
+        with self._cond:
+            stats = dict(self._hedge_stats)
+        stats['hedge_win_rate'] = stats['hedge_won'] / stats['hedged'] if stats['hedged'] else 0.0
+        return stats
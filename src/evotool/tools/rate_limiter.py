@@ -0,0 +1,116 @@
+import time
+import asyncio
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """A token bucket that refills continuously up to its capacity.
+
+    The level may go negative when actual consumption is only known after the
+    fact (e.g. tokens reported in a response's usage); later requests then
+    wait until the debt has been refilled.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._level = capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._last_refill) * self.refill_per_second)
+        self._last_refill = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        # Never wait for more than a full bucket, otherwise oversized requests would block forever
+        needed = min(amount, self.capacity)
+        if self._level >= needed:
+            return 0.0
+        return (needed - self._level) / self.refill_per_second
+
+    def debit(self, amount: float) -> None:
+        self._level -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter for one provider account.
+
+    ``acquire()`` blocks the caller until both buckets have capacity, so callers
+    queue up at the provider limit instead of failing with rate-limit errors.
+    Tokens are charged from the ``usage`` dict returned by the API through
+    ``record_usage()``. Use ``RateLimiter.shared(key, ...)`` to let several
+    HttpsApi instances (e.g. all samplers using one API key) share the limits.
+    """
+
+    _shared: Dict[str, 'RateLimiter'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        :param requests_per_minute: Maximum requests per minute, or None for no limit.
+        :param tokens_per_minute: Maximum total tokens per minute, or None for no limit.
+        """
+        self._lock = threading.Lock()
+        self._rpm_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self._tpm_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+
+    @classmethod
+    def shared(cls, key: str, requests_per_minute: Optional[float] = None,
+               tokens_per_minute: Optional[float] = None) -> 'RateLimiter':
+        """Return the limiter registered under ``key``, creating it on first use."""
+        with cls._shared_lock:
+            limiter = cls._shared.get(key)
+            if limiter is None:
+                limiter = cls(requests_per_minute, tokens_per_minute)
+                cls._shared[key] = limiter
+            return limiter
+
+    def try_acquire(self, estimated_tokens: float = 0) -> float:
+        """Take one request slot (and ``estimated_tokens``) if both buckets allow it.
+
+        :return: 0 on success, otherwise the number of seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._rpm_bucket is not None:
+                wait = max(wait, self._rpm_bucket.wait_time(1, now))
+            if self._tpm_bucket is not None:
+                # A zero estimate still has to wait for earlier debt to be paid back
+                wait = max(wait, self._tpm_bucket.wait_time(max(estimated_tokens, 1e-9), now))
+            if wait > 0:
+                return wait
+            if self._rpm_bucket is not None:
+                self._rpm_bucket.debit(1)
+            if self._tpm_bucket is not None:
+                self._tpm_bucket.debit(estimated_tokens)
+            return 0.0
+
+    def acquire(self, estimated_tokens: float = 0) -> None:
+        """Block until a request may be sent."""
+        while True:
+            wait = self.try_acquire(estimated_tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens: float = 0) -> None:
+        """Wait on the event loop until a request may be sent."""
+        while True:
+            wait = self.try_acquire(estimated_tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def record_usage(self, usage: Optional[dict], estimated_tokens: float = 0) -> None:
+        """Charge the tokens reported by the API, minus what was reserved up front."""
+        if self._tpm_bucket is None or not usage:
+            return
+        tokens = usage.get('total_tokens')
+        if tokens is None:
+            tokens = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+        with self._lock:
+            self._tpm_bucket.debit(tokens - estimated_tokens)
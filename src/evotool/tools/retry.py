@@ -0,0 +1,193 @@
+import json
+import time
+import random
+import http.client
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+# Error classes used to pick a retry policy
+TIMEOUT = 'timeout'
+CONNECTION = 'connection'
+RATE_LIMIT = 'rate_limit'
+SERVER = 'server'
+MALFORMED = 'malformed'
+AUTH = 'auth'
+BAD_REQUEST = 'bad_request'
+
+
+class LlmRequestError(RuntimeError):
+    """An LLM API request failed.
+
+    :param error_class: One of the error classes above, used to decide whether and how to retry.
+    :param status: The HTTP status code, if a response was received.
+    :param retry_after: Seconds the server asked us to wait (from ``Retry-After``), if any.
+    """
+
+    def __init__(self, message: str, error_class: str, status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.error_class = error_class
+        self.status = status
+        self.retry_after = retry_after
+
+
+class MalformedResponseError(LlmRequestError):
+    """A response body that is not valid JSON or lacks the fields the client reads from it."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message, MALFORMED, status)
+
+
+def decode_json_body(data: bytes | str) -> Any:
+    """Decode a JSON response body, raising MalformedResponseError if it is not valid UTF-8 JSON."""
+    try:
+        return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise MalformedResponseError(f'Response body is not valid JSON: {e}') from e
+
+
+@contextmanager
+def parsing_response(what: str = 'response'):
+    """Read fields of a decoded response body; a missing or mistyped field raises MalformedResponseError."""
+    try:
+        yield
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise MalformedResponseError(f'Unexpected {what} shape: {e!r}') from e
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def check_response_status(status: int, headers: dict, data: bytes) -> None:
+    """Raise an LlmRequestError for non-2xx responses, before the body is parsed as JSON.
+
+    :param headers: Response headers with lower-cased names.
+    """
+    if 200 <= status < 300:
+        return
+    body = data[:500].decode('utf-8', errors='replace')
+    message = f'HTTP {status}: {body}'
+    if status == 429:
+        raise LlmRequestError(message, RATE_LIMIT, status, parse_retry_after(headers.get('retry-after')))
+    if status == 408:
+        raise LlmRequestError(message, TIMEOUT, status)
+    if status >= 500:
+        raise LlmRequestError(message, SERVER, status, parse_retry_after(headers.get('retry-after')))
+    if status in (401, 403):
+        raise LlmRequestError(message, AUTH, status)
+    raise LlmRequestError(message, BAD_REQUEST, status)
+
+
+class RetryPolicy:
+    """Per-error-class retry policy with decorrelated-jitter backoff.
+
+    Timeouts, connection errors, HTTP 429, 5xx and malformed responses are
+    retried with their own attempt limits; auth and bad-request errors fail
+    immediately. Any other exception is a bug rather than a failed request and
+    propagates unchanged. A ``Retry-After`` header is honored when present. An optional
+    per-call deadline bounds the total time spent in one call, including backoff.
+    """
+
+    DEFAULT_MAX_RETRIES = {
+        TIMEOUT: 5,
+        CONNECTION: 5,
+        RATE_LIMIT: 10,
+        SERVER: 5,
+        MALFORMED: 3,
+        AUTH: 0,
+        BAD_REQUEST: 0,
+    }
+
+    def __init__(self, max_retries: Optional[Dict[str, int]] = None, max_attempts: int = 10,
+                 base_delay: float = 0.5, max_delay: float = 30.0, deadline: Optional[float] = None):
+        """
+        :param max_retries: Overrides of the number of retries per error class.
+        :param max_attempts: Upper bound on the total number of attempts of one call.
+        :param base_delay: Minimum backoff delay in seconds.
+        :param max_delay: Maximum backoff delay in seconds (a longer Retry-After is still honored).
+        :param deadline: Optional time budget in seconds for one call, including all retries.
+        """
+        self.max_retries = dict(self.DEFAULT_MAX_RETRIES)
+        self.max_retries.update(max_retries or {})
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    @staticmethod
+    def classify(error: BaseException) -> Optional[str]:
+        """The error class of a failed attempt, or None if the error did not come from the request."""
+        if isinstance(error, LlmRequestError):
+            return error.error_class
+        if isinstance(error, TimeoutError):
+            return TIMEOUT
+        if isinstance(error, (ConnectionError, EOFError, OSError, http.client.HTTPException)):
+            return CONNECTION
+        return None
+
+    def new_call(self) -> 'RetryState':
+        return RetryState(self)
+
+
+class RetryState:
+    """Retry bookkeeping for a single call."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.attempts = 0
+        self.retries: Dict[str, int] = {}
+        self.prev_delay = policy.base_delay
+        self.deadline_at = time.monotonic() + policy.deadline if policy.deadline is not None else None
+        self.last_error_class = None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the call deadline, or None without a deadline."""
+        if self.deadline_at is None:
+            return None
+        return self.deadline_at - time.monotonic()
+
+    def on_error(self, error: BaseException) -> float:
+        """Record a failed attempt and return how long to sleep before the next one.
+
+        :raises LlmRequestError: If the error should not (or no longer) be retried.
+        :raises: ``error`` itself if it is not a request error.
+        """
+        policy = self.policy
+        error_class = policy.classify(error)
+        if error_class is None:
+            raise error
+        self.last_error_class = error_class
+        self.attempts += 1
+        self.retries[error_class] = self.retries.get(error_class, 0) + 1
+
+        status = getattr(error, 'status', None)
+        if self.retries[error_class] > policy.max_retries.get(error_class, 0):
+            reason = 'not retryable' if policy.max_retries.get(error_class, 0) == 0 else 'retries exhausted'
+            raise LlmRequestError(f'{error_class} error ({reason}): {error}', error_class, status) from error
+        if self.attempts >= policy.max_attempts:
+            raise LlmRequestError(f'{error_class} error (attempts exhausted): {error}', error_class, status) from error
+
+        # Decorrelated jitter: sleep = min(cap, uniform(base, prev_sleep * 3))
+        delay = min(policy.max_delay, random.uniform(policy.base_delay, self.prev_delay * 3))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        self.prev_delay = delay
+
+        remaining = self.remaining()
+        if remaining is not None and delay >= remaining:
+            raise LlmRequestError(f'{error_class} error (call deadline exceeded): {error}', error_class, status) from error
+        return delay
@@ -0,0 +1,61 @@
+import json
+from typing import Tuple
+
+from .retry import decode_json_body, parsing_response
+
+
+class ChatStreamAccumulator:
+    """Collects an OpenAI-compatible server-sent-event chat completion stream.
+
+    Each ``data:`` line is decoded and its content delta handed to the stream
+    parser supplied by the adapter; reading stops as soon as the parser reports
+    a complete answer or the stream ends.
+    """
+
+    def __init__(self, stream_parser):
+        self.stream_parser = stream_parser
+        self.stream_parser.reset()
+        self.chunks = []
+        self.num_deltas = 0
+        self.usage = None
+        self.complete = False
+
+    def feed_line(self, line: str) -> bool:
+        """Process one line of the stream and return True when reading should stop."""
+        line = line.strip()
+        if not line.startswith('data:'):
+            return False
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return True
+        chunk = decode_json_body(data)
+        with parsing_response('stream event'):
+            if chunk.get('usage'):
+                self.usage = chunk['usage']
+            contents = [(choice.get('delta') or {}).get('content') for choice in chunk.get('choices') or []
+                        if choice.get('index', 0) == 0]
+        for content in contents:
+            if content:
+                self.chunks.append(content)
+                self.num_deltas += 1
+                if self.stream_parser.feed(content):
+                    self.complete = True
+                    return True
+        return False
+
+    def result(self, payload: dict) -> Tuple[str, dict]:
+        response = ''.join(self.chunks)
+        if self.usage is not None:
+            return response, self.usage
+        # The provider reports usage in the last event, which we never see when the stream is cut
+        # short. Estimate it: one token per content delta, about four characters per prompt token.
+        prompt_tokens = len(json.dumps(payload['messages'], ensure_ascii=False)) // 4
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': self.num_deltas,
+            'total_tokens': prompt_tokens + self.num_deltas,
+            'estimated': True,
+        }
+        if self.complete:
+            usage['early_stopped'] = True
+        return response, usage
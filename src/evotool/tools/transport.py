@@ -0,0 +1,105 @@
+import ssl
+import socket
+import asyncio
+import http.client
+from typing import Tuple
+from urllib.parse import unquote, urlsplit
+
+
+class Transport:
+    """How connections to an API endpoint are opened.
+
+    Both the blocking connection pool and the asyncio client go through a
+    transport, so the same ``host`` string selects HTTPS, plain HTTP or a Unix
+    domain socket for every client.
+    """
+
+    #: Value of the ``Host`` header sent with each request
+    host_header: str
+
+    def new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        raise NotImplementedError()
+
+    async def open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        raise NotImplementedError()
+
+
+class HttpsTransport(Transport):
+    default_port = 443
+
+    def __init__(self, host: str, port: int | None = None):
+        self.host = host
+        self.port = port or self.default_port
+        self.host_header = host if port is None else f'{host}:{port}'
+
+    def new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+
+    async def open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port, ssl=ssl.create_default_context())
+
+
+class HttpTransport(HttpsTransport):
+    """Plain HTTP, e.g. for a local vLLM or llama.cpp server without TLS."""
+
+    default_port = 80
+
+    def new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    async def open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(self.host, self.port)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except BaseException:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class UnixSocketTransport(Transport):
+    """Plain HTTP over a Unix domain socket."""
+
+    host_header = 'localhost'
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        return _UnixHTTPConnection(self.path, timeout)
+
+    async def open_connection(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_unix_connection(self.path)
+
+
+def make_transport(host: str) -> Transport:
+    """Choose the transport from the scheme of ``host``.
+
+    ``api.example.com`` and ``https://api.example.com:8443`` use HTTPS,
+    ``http://localhost:8000`` plain HTTP, and ``unix:///run/vllm.sock`` (or
+    ``http+unix://%2Frun%2Fvllm.sock``) a Unix domain socket.
+    """
+    if '://' not in host:
+        host, _, port = host.partition(':')
+        return HttpsTransport(host, int(port) if port else None)
+    parts = urlsplit(host)
+    scheme = parts.scheme.lower()
+    if scheme == 'https':
+        return HttpsTransport(parts.hostname, parts.port)
+    if scheme == 'http':
+        return HttpTransport(parts.hostname, parts.port)
+    if scheme == 'unix':
+        return UnixSocketTransport(parts.path)
+    if scheme == 'http+unix':
+        return UnixSocketTransport(unquote(parts.netloc))
+    raise ValueError(f'Unsupported scheme in API host: {host}')
@@ -0,0 +1,17 @@
+from typing import List
+
+
+def merge_usage(usages: List[dict]) -> dict:
+    """Sum the token counts of several usage dicts (nested counts such as token details included)."""
+    merged = {}
+    for usage in usages:
+        for key, value in (usage or {}).items():
+            if isinstance(value, bool):
+                merged[key] = merged.get(key, False) or value
+            elif isinstance(value, (int, float)):
+                merged[key] = merged.get(key, 0) + value
+            elif isinstance(value, dict):
+                merged[key] = merge_usage([merged.get(key, {}), value])
+            else:
+                merged.setdefault(key, value)
+    return merged
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from evotool.testing import MockLlm
+from evotool.task.python_task.func_approx import (
+    FuncApproxEvaluator, EohFuncApproxAdapter, EvoEngineerFuncApproxAdapter, Es1p1FuncApproxAdapter,
+    FunSearchFuncApproxAdapter, generate_noisy_polynomial
+)
+from evotool.evo_method.eoh.eoh import Eoh
+from evotool.evo_method.eoh.run_config import EohConfig
+from evotool.evo_method.evoengineer.evoengineer import EvoEngineer
+from evotool.evo_method.evoengineer.run_config import EvoEngineerConfig
+from evotool.evo_method.es_1p1.es_1p1 import Es1p1
+from evotool.evo_method.es_1p1.run_config import Es1p1Config
+from evotool.evo_method.funsearch.funsearch import FunSearch
+from evotool.evo_method.funsearch.run_config import FunSearchConfig
+
+
+def polyfit_response(prompt) -> str:
+    """A function approximation answer fitting a polynomial of random degree, parsable by every adapter"""
+    degree = random.randint(1, 4)
+    code = (
+        "def approximate(x):\n"
+        "    import numpy as np\n"
+        f"    coefficients = np.polyfit(x_train, y_train, {degree})\n"
+        "    return np.polyval(coefficients, x)"
+    )
+    return MockLlm.make_solution_response(code, name=f"degree {degree} polynomial")
+
+
+class ScoredEvoEngineerFuncApproxAdapter(EvoEngineerFuncApproxAdapter):
+    """EvoEngineer builds its first prompts from the baseline's score, which the plain adapter leaves unset"""
+
+    def __init__(self, task_info: dict, evaluator: FuncApproxEvaluator):
+        super().__init__(task_info)
+        self.evaluator = evaluator
+
+    def make_init_sol(self):
+        solution = super().make_init_sol()
+        solution.evaluation_res = self.evaluator.evaluate_code(solution.sol_string)
+        return solution
+
+
+@pytest.fixture(scope="session")
+def func_approx_evaluator():
+    x_data, y_data, y_true = generate_noisy_polynomial()
+    return FuncApproxEvaluator(x_data, y_data, y_true)
+
+
+@pytest.fixture
+def make_method(tmp_path, func_approx_evaluator):
+    """Build an Eoh, EvoEngineer, Es1p1 or FunSearch run on the function approximation task, sampling from a MockLlm"""
+    methods = {
+        'eoh': (Eoh, EohConfig, EohFuncApproxAdapter),
+        'evoengineer': (EvoEngineer, EvoEngineerConfig,
+                        lambda task_info: ScoredEvoEngineerFuncApproxAdapter(task_info, func_approx_evaluator)),
+        'es_1p1': (Es1p1, Es1p1Config, Es1p1FuncApproxAdapter),
+        'funsearch': (FunSearch, FunSearchConfig, FunSearchFuncApproxAdapter),
+    }
+
+    def make(name: str, llm=None, **config_kwargs):
+        method_class, config_class, adapter_class = methods[name]
+        config_kwargs.setdefault('verbose', False)
+        task_info = {}
+        config = config_class(
+            task_info,
+            str(tmp_path / name),
+            running_llm=llm if llm is not None else MockLlm(polyfit_response),
+            evaluator=func_approx_evaluator,
+            adapter=adapter_class(task_info),
+            **config_kwargs
+        )
+        (tmp_path / name).mkdir(exist_ok=True)
+        return method_class(config)
+
+    return make
@@ -0,0 +1,43 @@
+import pytest
+
+from evotool.tools import AdaptiveTimeout
+from evotool.tools.adaptive_timeout import RESPONSE, FIRST_TOKEN
+
+
+def test_max_timeout_until_enough_samples():
+    timeouts = AdaptiveTimeout(min_timeout=1.0, max_timeout=60.0, min_samples=5)
+    for _ in range(4):
+        timeouts.record('host', 'model', RESPONSE, 2.0)
+    assert timeouts.read_timeout('host', 'model', RESPONSE) == 60.0
+    timeouts.record('host', 'model', RESPONSE, 2.0)
+    assert timeouts.read_timeout('host', 'model', RESPONSE) == pytest.approx(6.0)
+
+
+def test_timeouts_are_clamped():
+    timeouts = AdaptiveTimeout(min_timeout=5.0, max_timeout=20.0, min_samples=1)
+    timeouts.record('host', 'model', RESPONSE, 0.1)
+    timeouts.record('host', 'model', FIRST_TOKEN, 30.0)
+    assert timeouts.read_timeout('host', 'model', RESPONSE) == 5.0
+    assert timeouts.read_timeout('host', 'model', FIRST_TOKEN) == 20.0
+
+
+def test_kinds_endpoints_and_models_are_tracked_separately():
+    timeouts = AdaptiveTimeout(min_timeout=0.0, min_samples=1, multiplier=1.0)
+    timeouts.record('a', 'model', RESPONSE, 1.0)
+    timeouts.record('b', 'model', RESPONSE, 2.0)
+    timeouts.record('a', 'other', RESPONSE, 3.0)
+    timeouts.record('a', 'model', FIRST_TOKEN, 4.0)
+    assert [timeouts.read_timeout(*key, RESPONSE) for key in [('a', 'model'), ('b', 'model'), ('a', 'other')]] \
+        == [1.0, 2.0, 3.0]
+    assert timeouts.read_timeout('a', 'model', FIRST_TOKEN) == 4.0
+
+
+def test_hit_timeouts_widen_the_next_attempt():
+    timeouts = AdaptiveTimeout(min_timeout=0.0, max_timeout=60.0, min_samples=1, multiplier=1.0)
+    timeouts.record('host', 'model', RESPONSE, 2.0)
+    assert timeouts.read_timeout('host', 'model', RESPONSE, timeouts_so_far=2) == 8.0
+
+    timeouts.record_timeout('host', 'model', RESPONSE, 10.0)
+    stats, = timeouts.get_stats()
+    assert stats['samples'] == 2 and stats['timeouts'] == 1
+    assert stats['p99'] == 10.0 and stats['read_timeout'] == 10.0
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from evotool.testing import MockLlm, MockLlmServer
+from evotool.tools.async_llm import AsyncHttpsApi
+from evotool.tools.llm_cache import EmbeddingCache
+
+
+@pytest.fixture
+def make_client():
+    servers, clients = [], []
+
+    def make(mock: MockLlm, **kwargs) -> AsyncHttpsApi:
+        server = MockLlmServer(mock).start()
+        servers.append(server)
+        clients.append(AsyncHttpsApi(server.host, 'mock-key', mock._model, '/v1/chat/completions', **kwargs))
+        return clients[-1]
+
+    yield make
+    for client in clients:
+        client.close()
+    for server in servers:
+        server.close()
+
+
+def test_get_responses_runs_on_the_event_loop(make_client):
+    client = make_client(MockLlm(["a", "b", "c"]))
+    responses, usage = client.get_responses("prompt", 3)
+    assert sorted(responses) == ["a", "b", "c"]
+    assert usage['n'] == 3
+    # The request went over the async client's connections, not the inherited blocking pool
+    assert client.get_connection_stats()['connections_opened'] == 1
+
+
+def test_get_responses_respects_max_in_flight(make_client):
+    client = make_client(MockLlm(["a"], latency=0.1), max_in_flight=1)
+
+    async def three_calls():
+        return await asyncio.gather(*(client.aget_responses("prompt", 2) for _ in range(3)))
+
+    start = time.monotonic()
+    results = client._run(three_calls())
+    assert time.monotonic() - start >= 0.3
+    assert [responses for responses, _ in results] == [["a", "a"]] * 3
+
+
+def test_get_embeddings_batches_and_caches(make_client, tmp_path):
+    mock = MockLlm(["a"])
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    client = make_client(mock, embedding_batch_size=2, embedding_cache=cache)
+    texts = ["x", "y", "z", "x"]
+    assert client.get_embeddings(texts) == [mock.embed(text) for text in texts]
+    assert mock._stats['requests'] == 2
+
+    assert client.get_embeddings(["z", "y"]) == [mock.embed("z"), mock.embed("y")]
+    assert mock._stats['requests'] == 2
+    assert client.get_embedding("x") == mock.embed("x")
+
+
+def test_get_response_batch_sends_different_prompts(make_client):
+    client = make_client(MockLlm(lambda messages: f"answer to {messages[-1]['content']}"))
+    results = client.get_response_batch(["p", "q"])
+    assert [response for response, _ in results] == ["answer to p", "answer to q"]
@@ -0,0 +1,49 @@
+import pytest
+
+from evotool.evo_method.budget import Budget
+from evotool.evo_method.usage_ledger import UsageLedger
+
+
+def make_ledger(total_tokens=0, evaluator_seconds=0.0):
+    ledger = UsageLedger(prices={'big': {'prompt': 0.0, 'completion': 1e6}})
+    ledger.record({'prompt_tokens': 0, 'completion_tokens': total_tokens, 'total_tokens': total_tokens},
+                  model='big')
+    ledger.record_evaluation(evaluator_seconds)
+    return ledger
+
+
+def test_no_limits_are_never_exceeded():
+    assert Budget().exceeded(make_ledger(10 ** 9, 10 ** 6)) is None
+
+
+@pytest.mark.parametrize('budget, reached', [
+    (Budget(max_total_tokens=100), 'total tokens 100 reached the limit of 100'),
+    (Budget(max_cost=50.0), 'estimated cost 100 USD reached the limit of 50 USD'),
+    (Budget(max_evaluator_seconds=2.0), 'evaluator time 3s reached the limit of 2s'),
+    (Budget(max_wall_seconds=0.0), 'wall time'),
+])
+def test_the_reached_limit_is_described(budget, reached):
+    assert reached in budget.exceeded(make_ledger(100, 3.0))
+
+
+def test_limits_below_the_usage_are_not_reached():
+    budget = Budget(max_wall_seconds=3600, max_total_tokens=101, max_cost=101.0, max_evaluator_seconds=3.5)
+    assert budget.exceeded(make_ledger(100, 3.0)) is None
+
+
+def test_fraction_scales_the_limits():
+    budget = Budget(max_total_tokens=150, init_fraction=0.5)
+    ledger = make_ledger(100)
+    assert budget.exceeded(ledger) is None
+    assert budget.exceeded(ledger, fraction=budget.init_fraction) == 'total tokens 100 reached the limit of 75'
+
+
+def test_replayed_usage_does_not_count():
+    ledger = make_ledger(0)
+    ledger.record({'total_tokens': 1000, 'cached': True})
+    assert Budget(max_total_tokens=100).exceeded(ledger) is None
+
+
+def test_init_sample_limit():
+    assert Budget().init_sample_limit(10) == 10
+    assert Budget(init_fraction=0.25).init_sample_limit(10) == 2
@@ -0,0 +1,58 @@
+import pytest
+
+from evotool.testing import MockLlm
+from evotool.tools import CascadeLlm
+from evotool.task.python_task.func_approx import EohFuncApproxAdapter
+from conftest import polyfit_response
+
+CHEAP_USAGE = {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+STRONG_USAGE = {'prompt_tokens': 10, 'completion_tokens': 50, 'total_tokens': 60}
+
+
+def test_accepted_answers_stay_on_the_cheap_tier():
+    cheap, strong = MockLlm(polyfit_response, model='cheap'), MockLlm(["strong"], model='strong')
+    cascade = CascadeLlm([cheap, strong], adapter=EohFuncApproxAdapter({}))
+    response, usage = cascade.get_response("prompt")
+    assert "np.polyfit" in response
+    assert usage['cascade_tier'] == 0
+    assert strong._stats['requests'] == 0
+
+
+def test_empty_answers_escalate_and_usage_is_summed():
+    cheap = MockLlm(lambda prompt: ("", CHEAP_USAGE), model='cheap')
+    strong = MockLlm(lambda prompt: (polyfit_response(prompt), STRONG_USAGE), model='strong')
+    cascade = CascadeLlm([cheap, strong], adapter=EohFuncApproxAdapter({}))
+    response, usage = cascade.get_response("prompt")
+    assert "np.polyfit" in response
+    assert usage['cascade_tier'] == 1
+    assert usage['total_tokens'] == 75
+    assert [tier['accepted'] for tier in usage['tiers']] == [False, True]
+
+    stats = cascade.get_cascade_stats()
+    assert [tier['acceptance_rate'] for tier in stats] == [0.0, 1.0]
+    assert stats[0]['usage']['total_tokens'] == 15
+
+
+def test_failed_tiers_escalate_and_the_last_tier_error_is_raised():
+    cascade = CascadeLlm([MockLlm(["cheap"], timeout_rate=1.0), MockLlm(["strong"])])
+    response, usage = cascade.get_response("prompt")
+    assert response == "strong"
+    assert 'error' in usage['tiers'][0]
+    assert cascade.get_cascade_stats()[0]['errors'] == 1
+
+    with pytest.raises(TimeoutError):
+        CascadeLlm([MockLlm(["a"], timeout_rate=1.0), MockLlm(["b"], timeout_rate=1.0)]).get_response("prompt")
+
+
+def test_the_last_tier_is_returned_even_when_rejected():
+    cascade = CascadeLlm([MockLlm(["a"]), MockLlm(["b"])], validator=lambda response, solution: False)
+    assert cascade.get_response("prompt")[0] == "b"
+
+
+def test_get_responses_resamples_only_the_rejected_completions():
+    cheap, strong = MockLlm(["good", "bad", "good"]), MockLlm(["fixed"])
+    cascade = CascadeLlm([cheap, strong], validator=lambda response, solution: response != "bad")
+    responses, usage = cascade.get_responses("prompt", 3)
+    assert responses == ["good", "fixed", "good"]
+    assert usage['n'] == 3 and usage['cascade_tier'] == 1
+    assert [tier['requests'] for tier in cascade.get_cascade_stats()] == [3, 1]
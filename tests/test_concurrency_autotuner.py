@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from evotool.task.base_task.base_evaluator import EvaluationResult
+from evotool.evo_method.concurrency_autotuner import ConcurrencyAutotuner
+from evotool.evo_method.sampling_engine import SamplingEngine
+
+
+@pytest.fixture
+def engine():
+    engine = SamplingEngine(lambda task: ([], {}), lambda code: EvaluationResult(True, 0.0, {}),
+                            num_samplers=8, num_evaluators=8, sampler_limit=4, evaluator_limit=4)
+    yield engine
+    engine.close()
+
+
+def decide_after(autotuner: ConcurrencyAutotuner, seconds: float, samples=(), evaluations=()) -> str:
+    """Feed a window of ``seconds`` with completions given as ``(seconds, items, failed)`` and decide"""
+    autotuner._window_start = time.monotonic() - seconds
+    for completion in samples:
+        autotuner._sample.add(*completion)
+    for completion in evaluations:
+        autotuner._evaluate.add(*completion)
+    return autotuner._decide()
+
+
+def test_slow_evaluators_raise_both_limits_one_step(engine):
+    autotuner = ConcurrencyAutotuner(verbose=False)
+    autotuner.attach(engine)
+    # One candidate per second taking 8s to evaluate needs about 10 evaluators
+    message = decide_after(autotuner, 10.0, samples=[(1.0, 1, False)] * 10, evaluations=[(8.0, 1, False)] * 4)
+    assert (engine.sampler_limit, engine.evaluator_limit) == (5, 5)
+    assert "evaluators 4 -> 5 (target 10)" in message
+
+
+def test_few_arrivals_move_slots_from_the_evaluators_to_the_samplers(engine):
+    autotuner = ConcurrencyAutotuner(verbose=False)
+    autotuner.attach(engine)
+    # Fast evaluations of rare candidates: fewer evaluators suffice, and more samplers keep them busy
+    decide_after(autotuner, 10.0, samples=[(0.1, 1, False)], evaluations=[(0.1, 1, False)])
+    assert (engine.sampler_limit, engine.evaluator_limit) == (5, 3)
+
+
+def test_errors_cut_the_limit(engine):
+    autotuner = ConcurrencyAutotuner(verbose=False, backoff=0.5)
+    autotuner.attach(engine)
+    decide_after(autotuner, 10.0, samples=[(1.0, 1, True), (1.0, 1, False)])
+    assert engine.sampler_limit == 2
+    # Without evaluations the evaluator limit is left alone
+    assert engine.evaluator_limit == 4
+
+
+def test_limits_stay_within_the_bounds(engine):
+    autotuner = ConcurrencyAutotuner(max_samplers=4, min_evaluators=3, verbose=False)
+    autotuner.attach(engine)
+    decide_after(autotuner, 10.0, samples=[(0.1, 1, False)])  # Evaluators idle: one more sampler
+    decide_after(autotuner, 10.0, evaluations=[(1.0, 1, True)])
+    assert (engine.sampler_limit, engine.evaluator_limit) == (4, 3)
+
+
+def test_observe_decides_once_the_interval_passed(engine):
+    autotuner = ConcurrencyAutotuner(interval=60.0, verbose=False)
+    autotuner.attach(engine)
+    autotuner.observe('sample', 1.0, 1, False)
+    assert engine.sampler_limit == 4
+
+    autotuner.interval = 0.0
+    autotuner.observe('sample', 1.0, 1, False)
+    assert engine.sampler_limit == 5
+    assert autotuner._sample.count == 0
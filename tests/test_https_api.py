@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from evotool.testing import MockLlm, MockLlmServer
+from evotool.tools import RetryPolicy, LlmRequestError, AdaptiveTimeout
+from evotool.task.base_task import StreamParser, CodeBlockStreamParser
+
+ANSWER = "Here you go:\n```python\ndef f(x):\n    return x\n```\n" + "Some explanation that follows. " * 20
+
+
+class ScriptedFaults(MockLlm):
+    """MockLlm injecting the given faults into its first requests, in order"""
+
+    def __init__(self, faults, **kwargs):
+        super().__init__([ANSWER], **kwargs)
+        self.faults = list(faults)
+
+    def sample_fault(self):
+        with self._lock:
+            self._stats['requests'] += 1
+        return self.faults.pop(0) if self.faults else None
+
+
+def fast_retries(**max_retries) -> RetryPolicy:
+    return RetryPolicy(max_retries=max_retries, base_delay=0.01, max_delay=0.02)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(mock: MockLlm) -> MockLlmServer:
+        servers.append(MockLlmServer(mock).start())
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_get_response(serve):
+    client = serve(MockLlm([ANSWER])).make_client()
+    response, usage = client.get_response("prompt")
+    assert response == ANSWER
+    assert usage['total_tokens'] == usage['prompt_tokens'] + usage['completion_tokens'] > 0
+
+
+def test_get_responses_returns_n_completions(serve):
+    client = serve(MockLlm(["a", "b", "c"])).make_client()
+    responses, usage = client.get_responses("prompt", 3)
+    assert sorted(responses) == ["a", "b", "c"]
+    assert usage['n'] == 3
+
+
+def test_malformed_responses_are_retried(serve):
+    mock = ScriptedFaults(['malformed', 'malformed'])
+    client = serve(mock).make_client(retry_policy=fast_retries())
+    assert client.get_response("prompt")[0] == ANSWER
+    assert mock._stats['requests'] == 3
+
+
+def test_timeouts_are_retried(serve):
+    mock = ScriptedFaults(['timeout'], hang_seconds=0.5)
+    client = serve(mock).make_client(timeout=0.2, retry_policy=fast_retries())
+    assert client.get_response("prompt")[0] == ANSWER
+    assert mock._stats['requests'] == 2
+
+
+def test_shared_adaptive_timeout_is_capped_by_the_client_timeout(serve):
+    mock = ScriptedFaults(['timeout'], hang_seconds=2.0)
+    shared = AdaptiveTimeout(max_timeout=60.0)
+    client = serve(mock).make_client(timeout=0.2, adaptive_timeout=shared, retry_policy=fast_retries())
+    start = time.monotonic()
+    assert client.get_response("prompt")[0] == ANSWER
+    assert time.monotonic() - start < 1.5
+
+
+def test_passed_call_deadline_fails_instead_of_a_zero_timeout(serve):
+    client = serve(MockLlm([ANSWER])).make_client()
+    retry_state = RetryPolicy(deadline=0.01).new_call()
+    time.sleep(0.02)
+    with pytest.raises(LlmRequestError) as error:
+        client._read_timeout('response', retry_state)
+    assert error.value.error_class == 'timeout'
+
+
+def test_retries_give_up_per_error_class(serve):
+    mock = ScriptedFaults(['malformed'] * 3)
+    client = serve(mock).make_client(retry_policy=fast_retries(malformed=1))
+    with pytest.raises(LlmRequestError) as error:
+        client.get_response("prompt")
+    assert error.value.error_class == 'malformed'
+    assert mock._stats['requests'] == 2
+
+
+def test_stream_stops_once_the_answer_is_complete(serve):
+    client = serve(MockLlm([ANSWER])).make_client()
+    response, usage = client.get_response("prompt", stream_parser=CodeBlockStreamParser())
+    assert "```python\ndef f(x):\n    return x\n```" in response
+    assert len(response) < len(ANSWER)
+    assert usage['early_stopped'] and usage['estimated']
+
+
+def test_stream_reads_to_the_end_without_a_complete_answer(serve):
+    client = serve(MockLlm([ANSWER])).make_client()
+    response, usage = client.get_response("prompt", stream_parser=StreamParser())
+    assert response == ANSWER
+    assert not usage.get('estimated')
+
+
+def test_malformed_streams_are_retried(serve):
+    mock = ScriptedFaults(['malformed'])
+    client = serve(mock).make_client(retry_policy=fast_retries())
+    response, _ = client.get_response("prompt", stream_parser=StreamParser())
+    assert response == ANSWER
+    assert mock._stats['requests'] == 2
+
+
+def test_get_embeddings(serve):
+    mock = MockLlm([ANSWER])
+    client = serve(mock).make_client(embedding_batch_size=2)
+    texts = ["a", "b", "c"]
+    assert client.get_embeddings(texts) == [mock.embed(text) for text in texts]
+    assert client.get_embedding("a") == mock.embed("a")
+
+
+def test_get_embeddings_only_requests_uncached_texts(serve, tmp_path):
+    mock = MockLlm([ANSWER])
+    path = str(tmp_path / "embeddings.sqlite")
+    serve(mock).make_client(embedding_cache=path).get_embeddings(["a", "b"])
+    client = serve(mock).make_client(embedding_cache=path)
+    assert client.get_embeddings(["b", "c", "a"]) == [mock.embed(text) for text in ["b", "c", "a"]]
+    assert mock._stats['requests'] == 2
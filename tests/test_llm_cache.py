@@ -0,0 +1,89 @@
+import pytest
+
+from evotool.testing import MockLlm
+from evotool.tools import CachedLlm, LlmResponseCache, EmbeddingCache
+from evotool.tools.llm_cache import CacheMissError
+
+
+def test_read_through_serves_repeated_prompts_as_distinct_samples(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    mock = MockLlm(["a", "b", "c"])
+    llm = CachedLlm(mock, path)
+    assert [llm.get_response("prompt")[0] for _ in range(2)] == ["a", "b"]
+    assert mock._stats['requests'] == 2
+
+    # A new run replays the recorded samples in order, then calls the API for the next one
+    replayed = CachedLlm(mock, path)
+    first, usage = replayed.get_response("prompt")
+    assert first == "a" and usage['cached'] is True
+    assert replayed.get_response("prompt")[0] == "b"
+    assert replayed.get_response("prompt")[0] == "c"
+    assert mock._stats['requests'] == 3
+    assert replayed.get_cache_stats()['hits'] == 2
+    assert replayed.get_cache_stats()['misses'] == 1
+
+
+def test_generation_parameters_are_part_of_the_key(tmp_path):
+    mock = MockLlm(["a", "b"])
+    llm = CachedLlm(mock, str(tmp_path / "responses.sqlite"))
+    llm.get_response("prompt", temperature=0.5)
+    replayed = CachedLlm(mock, llm.cache)
+    assert replayed.get_response("prompt", temperature=1.0)[0] == "b"
+    assert mock._stats['requests'] == 2
+
+
+def test_replay_raises_on_a_miss(tmp_path):
+    mock = MockLlm(["a"])
+    llm = CachedLlm(mock, str(tmp_path / "responses.sqlite"), mode=CachedLlm.REPLAY)
+    with pytest.raises(CacheMissError):
+        llm.get_response("prompt")
+    assert mock._stats['requests'] == 0
+
+
+def test_record_overwrites_previous_recordings(tmp_path):
+    cache = LlmResponseCache(str(tmp_path / "responses.sqlite"))
+    CachedLlm(MockLlm(["old"]), cache).get_response("prompt")
+    CachedLlm(MockLlm(["new"]), cache, mode=CachedLlm.RECORD).get_response("prompt")
+    assert CachedLlm(MockLlm(["unused"]), cache, mode=CachedLlm.REPLAY).get_response("prompt")[0] == "new"
+
+
+def test_get_responses_only_requests_the_missing_samples(tmp_path):
+    cache = LlmResponseCache(str(tmp_path / "responses.sqlite"))
+    CachedLlm(MockLlm(["a", "b"]), cache).get_responses("prompt", 2)
+
+    mock = MockLlm(["c"])
+    responses, usage = CachedLlm(mock, cache).get_responses("prompt", 3)
+    assert responses == ["a", "b", "c"]
+    assert usage['n'] == 3
+    assert 'cached' not in usage
+    assert usage['cached_usage']['completion_tokens'] > 0
+    assert mock._stats['requests'] == 1
+
+    responses, usage = CachedLlm(mock, cache, mode=CachedLlm.REPLAY).get_responses("prompt", 3)
+    assert responses == ["a", "b", "c"]
+    assert usage['cached'] is True
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LlmResponseCache(str(tmp_path / "responses.sqlite"), max_size_bytes=100)
+    cache.put("first", "x" * 40, {})
+    cache.put("second", "y" * 40, {})
+    assert cache.get("first") is not None  # Now more recently used than "second"
+    cache.put("third", "z" * 40, {})
+    assert cache.get("second") is None
+    assert cache.get("first") is not None and cache.get("third") is not None
+    assert cache.get_stats()['entries'] == 2
+
+
+def test_embedding_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(path)
+    assert cache.get_many("model", ["x"]) == {}
+    cache.put_many("model", [("x", [0.1, 0.2]), ("y", [0.3, 0.4])])
+    cache.close()
+
+    cache = EmbeddingCache(path)
+    found = cache.get_many("model", ["x", "y", "z", "x"])
+    assert found == {EmbeddingCache.text_hash("x"): [0.1, 0.2], EmbeddingCache.text_hash("y"): [0.3, 0.4]}
+    assert cache.get_many("other-model", ["x"]) == {}
+    assert cache.get_stats() == {'hits': 3, 'misses': 2, 'entries': 2}
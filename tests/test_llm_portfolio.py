@@ -0,0 +1,62 @@
+import pytest
+
+from evotool.testing import MockLlm
+from evotool.tools import LlmPortfolio
+
+
+def test_pending_candidates_spread_requests_over_untried_arms():
+    portfolio = LlmPortfolio([MockLlm(["a"]), MockLlm(["b"])])
+    assert [portfolio.get_response("prompt")[0] for _ in range(2)] == ["a", "b"]
+    assert [arm['pulls'] for arm in portfolio.get_portfolio_stats()] == [1, 1]
+
+
+@pytest.mark.parametrize('strategy', [LlmPortfolio.UCB, LlmPortfolio.THOMPSON])
+def test_requests_move_to_the_arm_that_improves(strategy):
+    portfolio = LlmPortfolio([MockLlm(["weak"]), MockLlm(["strong"])], strategy=strategy, exploration=0.1)
+    best = 0.0
+    for _ in range(60):
+        response, usage = portfolio.get_response("prompt")
+        score = best + 1.0 if response == "strong" else best - 1.0
+        portfolio.record_outcome(usage, valid=True, score=score, baseline_score=best)
+        best = max(best, score)
+    weak, strong = portfolio.get_portfolio_stats()
+    assert strong['pulls'] > 2 * weak['pulls']
+    assert strong['improvements'] == strong['pulls'] and weak['improvements'] == 0
+    assert weak['mean_reward'] == 0.0 < strong['mean_reward']
+
+
+def test_released_candidates_free_their_pending_share():
+    portfolio = LlmPortfolio([MockLlm(["a"]), MockLlm(["b"])])
+    responses, usage = portfolio.get_responses("prompt", 2)
+    assert usage['portfolio_arm'] == 0 and usage['n'] == 2
+    portfolio.release_outcome(usage)
+    portfolio.record_outcome(usage, valid=True)
+    # Both completions are accounted for, so arm 0 has one outcome and nothing in flight
+    assert portfolio.get_portfolio_stats()[0]['outcomes'] == 0.5
+    assert portfolio._arms[0].pending == 0.0
+
+
+def test_failed_requests_are_zero_reward_outcomes():
+    portfolio = LlmPortfolio([MockLlm(["a"], timeout_rate=1.0)], reward='valid')
+    with pytest.raises(TimeoutError):
+        portfolio.get_response("prompt")
+    stats = portfolio.get_portfolio_stats()[0]
+    assert stats['outcomes'] == 1.0 and stats['valid_rate'] == 0.0
+
+
+def test_valid_reward_per_second():
+    portfolio = LlmPortfolio([MockLlm(["a"])], reward='valid', cost='seconds')
+    response, usage = portfolio.get_response("prompt")
+    portfolio.record_outcome(usage, valid=True)
+    stats = portfolio.get_portfolio_stats()[0]
+    assert stats['valid_rate'] == 1.0 and stats['mean_reward'] > 0
+    assert stats['seconds'] == usage['portfolio_latency']
+
+
+def test_unknown_options_are_rejected():
+    with pytest.raises(ValueError):
+        LlmPortfolio([])
+    with pytest.raises(ValueError):
+        LlmPortfolio([MockLlm(["a"])], strategy='greedy')
+    with pytest.raises(ValueError):
+        LlmPortfolio([MockLlm(["a"])], cost='dollars')
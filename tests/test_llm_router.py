@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from evotool.testing import MockLlm
+from evotool.tools import LlmRouter, LlmRequestError
+from evotool.tools.retry import BAD_REQUEST
+
+
+class BadRequestLlm(MockLlm):
+    """MockLlm rejecting every request as invalid"""
+
+    def get_response(self, prompt, *args, **kwargs):
+        self.sample_fault()
+        raise LlmRequestError('invalid request', BAD_REQUEST)
+
+
+def test_requests_prefer_the_faster_endpoint():
+    slow, fast = MockLlm(["slow"], latency=0.05), MockLlm(["fast"])
+    router = LlmRouter([slow, fast])
+    responses = [router.get_response("prompt")[0] for _ in range(5)]
+    # Both are tried once while they have no latency samples, then the faster one wins
+    assert responses == ["slow", "fast", "fast", "fast", "fast"]
+
+
+def test_failed_requests_fail_over_and_eject_the_endpoint():
+    bad, good = MockLlm(["bad"], timeout_rate=1.0), MockLlm(["good"])
+    router = LlmRouter([bad, good], eject_after_errors=2, probe_interval=0.2)
+    for _ in range(3):
+        response, usage = router.get_response("prompt")
+        assert response == "good" and usage['endpoint'] == repr(good)
+    assert bad._stats['requests'] == 2
+    assert router.get_stats()[0]['ejected'] and router.get_stats()[0]['errors'] == 2
+
+    # After the probe interval, one successful probe puts the endpoint back in rotation
+    bad.timeout_rate = 0.0
+    time.sleep(0.25)
+    assert router.get_response("prompt")[0] == "bad"
+    assert not router.get_stats()[0]['ejected']
+
+
+def test_the_last_error_is_raised_when_every_endpoint_fails():
+    router = LlmRouter([MockLlm(["a"], timeout_rate=1.0), MockLlm(["b"], timeout_rate=1.0)])
+    with pytest.raises(TimeoutError):
+        router.get_response("prompt")
+
+
+def test_invalid_requests_are_not_failed_over():
+    invalid, good = BadRequestLlm(["unused"]), MockLlm(["good"])
+    router = LlmRouter([invalid, good], eject_after_errors=1)
+    with pytest.raises(LlmRequestError):
+        router.get_response("prompt")
+    assert good._stats['requests'] == 0
+    assert router.get_stats()[0]['errors'] == 0 and not router.get_stats()[0]['ejected']
+
+
+def test_get_responses_and_embeddings_are_routed():
+    mock = MockLlm(["a", "b"])
+    router = LlmRouter([MockLlm(["x"], timeout_rate=1.0), mock])
+    responses, usage = router.get_responses("prompt", 2)
+    assert responses == ["a", "b"] and usage['endpoint'] == repr(mock)
+    assert router.get_embeddings(["t"]) == [mock.embed("t")]
+
+
+def scripted_latency(*seconds, then=0.01):
+    """Latency function returning the given latencies in order, then ``then``"""
+    remaining = list(seconds)
+    return lambda rng: remaining.pop(0) if remaining else then
+
+
+def test_slow_requests_are_hedged_and_the_loser_usage_is_kept():
+    mock = MockLlm(["answer"], latency=scripted_latency(0.01, 0.01, 0.01, 0.5, 0.0))
+    router = LlmRouter([mock], hedge_percentile=50, hedge_budget=1.0, hedge_min_delay=0.05, hedge_min_samples=3)
+    for _ in range(3):
+        assert 'hedged' not in router.get_response("prompt")[1]
+
+    start = time.monotonic()
+    response, usage = router.get_response("prompt")
+    assert time.monotonic() - start < 0.4
+    assert response == "answer" and usage['hedged'] and usage['hedge_won']
+    assert router.get_hedge_stats()['hedge_win_rate'] == 1.0
+
+    # The blocking primary cannot be cancelled, so its usage shows up once it finishes
+    assert router.pop_late_usage() == []
+    time.sleep(0.6)
+    late_usage = router.pop_late_usage()
+    assert len(late_usage) == 1 and late_usage[0]['hedge_won'] is False
+    assert router.pop_late_usage() == []
+
+
+def test_hedges_are_limited_by_the_budget():
+    mock = MockLlm(["answer"], latency=scripted_latency(0.01, 0.01, 0.01, 0.2))
+    router = LlmRouter([mock], hedge_percentile=50, hedge_budget=0.1, hedge_min_delay=0.05, hedge_min_samples=3)
+    for _ in range(4):
+        usage = router.get_response("prompt")[1]
+    assert 'hedged' not in usage
+    assert mock._stats['requests'] == 4
+    assert router.get_hedge_stats()['budget_exhausted'] == 1
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from evotool.testing import MockLlm, MockLlmServer
+from evotool.evo_method.budget import Budget
+
+from conftest import polyfit_response
+
+
+def best_score(method) -> float | None:
+    scores = [solution.evaluation_res.score for solution in method.run_state_dict.sol_history
+              if solution.evaluation_res and solution.evaluation_res.valid]
+    return max(scores) if scores else None
+
+
+@pytest.mark.parametrize('name', ['eoh', 'evoengineer', 'es_1p1'])
+def test_run(make_method, name):
+    llm = MockLlm(polyfit_response)
+    method = make_method(name, llm=llm, max_sample_nums=12, num_samplers=3, num_evaluators=3)
+    method.run()
+
+    run_state = method.run_state_dict
+    # A generation always runs to completion, so the last one may overshoot ``max_sample_nums``
+    assert 0 < run_state.tot_sample_nums < 12 + 3
+    assert best_score(method) is not None
+    # Every LLM request is in the usage ledger
+    assert run_state.usage_ledger.totals()['calls'] == llm._stats['requests']
+    assert os.path.exists(os.path.join(method.config.output_path, "run_state.json"))
+
+
+@pytest.mark.parametrize('name', ['eoh', 'evoengineer'])
+def test_steady_state_run(make_method, name):
+    method = make_method(name, max_sample_nums=12, num_samplers=3, num_evaluators=3, steady_state=True)
+    method.run()
+    assert method.run_state_dict.tot_sample_nums == 12
+    assert len(method.run_state_dict.population) <= method.config.pop_size
+
+
+def test_steady_state_registers_stragglers_of_initialization(make_method):
+    calls = []
+
+    def first_request_slow(rng):
+        calls.append(None)
+        return 0.3 if len(calls) == 1 else 0.01
+
+    # The first initialization request outlives its generation and arrives during the steady state
+    llm = MockLlm(polyfit_response, latency=first_request_slow)
+    method = make_method('eoh', llm=llm, max_sample_nums=200, num_samplers=3, num_evaluators=3,
+                         steady_state=True, generation_timeout=0.15)
+    method.run()
+    stats = method.run_state_dict.straggler_stats
+    assert stats['abandoned'] == 1 and stats['carried'] == 1
+    assert method.run_state_dict.tot_sample_nums == 200
+
+
+@pytest.mark.parametrize('continuous', [False, True])
+def test_funsearch_run(make_method, continuous):
+    llm = MockLlm(polyfit_response)
+    method = make_method('funsearch', llm=llm, max_sample_nums=12, num_samplers=3, num_evaluators=3,
+                         num_islands=2, continuous=continuous)
+    method.run()
+
+    run_state = method.run_state_dict
+    if continuous:
+        # The continuous mode keeps exactly the free sampler slots busy, so it stops at the limit
+        assert run_state.tot_sample_nums == 12
+    else:
+        assert 0 < run_state.tot_sample_nums < 12 + 3
+    assert best_score(method) is not None
+    assert run_state.usage_ledger.totals()['calls'] == llm._stats['requests']
+    assert os.path.exists(run_state.database_file)
+
+
+@pytest.mark.parametrize('name', ['eoh', 'evoengineer'])
+def test_speculative_run(make_method, name):
+    method = make_method(name, max_sample_nums=20, num_samplers=4, num_evaluators=4,
+                         speculative_fraction=0.5, speculative_policy='discard')
+    method.run()
+    stats = method.run_state_dict.speculation_stats
+    assert stats['issued'] > 0
+    assert stats['hits'] + stats['discarded'] == stats['issued']
+    assert method.run_state_dict.tot_sample_nums <= 20
+
+
+def test_run_stops_at_budget(make_method):
+    method = make_method('es_1p1', max_sample_nums=100, num_samplers=2, num_evaluators=2,
+                         budget=Budget(max_total_tokens=2000))
+    method.run()
+    assert method.run_state_dict.tot_sample_nums < 100
+
+
+def test_run_resumes_from_run_state(make_method):
+    make_method('es_1p1', max_sample_nums=6, num_samplers=2, num_evaluators=2).run()
+    method = make_method('es_1p1', max_sample_nums=10, num_samplers=2, num_evaluators=2)
+    assert method.run_state_dict.tot_sample_nums == 6
+    method.run()
+    assert method.run_state_dict.tot_sample_nums == 10
+
+
+def test_run_through_https_api_with_streaming(make_method):
+    with MockLlmServer(MockLlm(polyfit_response)) as server:
+        method = make_method('eoh', llm=server.make_client(), max_sample_nums=8, num_samplers=2,
+                             num_evaluators=2, stream_responses=True)
+        method.run()
+    assert method.run_state_dict.tot_sample_nums > 0
+    assert best_score(method) is not None
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from evotool.tools import RateLimiter
+from evotool.tools.rate_limiter import TokenBucket
+
+
+def test_token_bucket_waits_for_the_refill():
+    bucket = TokenBucket(capacity=2, refill_per_second=10)
+    now = time.monotonic()
+    assert bucket.wait_time(1, now) == 0.0
+    bucket.debit(2)
+    assert bucket.wait_time(1, now) == pytest.approx(0.1, abs=0.01)
+    assert bucket.wait_time(1, now + 0.1) == 0.0
+
+
+def test_token_bucket_never_waits_for_more_than_its_capacity():
+    bucket = TokenBucket(capacity=10, refill_per_second=1)
+    assert bucket.wait_time(1000, time.monotonic()) == 0.0
+
+
+def test_requests_per_minute_limit():
+    limiter = RateLimiter(requests_per_minute=120)  # A burst of 120, then one every 0.5s
+    assert all(limiter.try_acquire() == 0.0 for _ in range(120))
+    assert limiter.try_acquire() == pytest.approx(0.5, abs=0.05)
+
+
+def test_reported_tokens_hold_back_later_requests():
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens per second
+    assert limiter.try_acquire() == 0.0
+    limiter.record_usage({'prompt_tokens': 4000, 'completion_tokens': 2050})
+    assert limiter.try_acquire() == pytest.approx(0.5, abs=0.05)
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert 0.4 < time.monotonic() - start < 1.0
+
+
+def test_usage_without_token_limit_is_ignored():
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter.record_usage({'total_tokens': 10 ** 9})
+    assert limiter.try_acquire() == 0.0
+
+
+def test_async_acquire_waits_on_the_event_loop():
+    limiter = RateLimiter(requests_per_minute=600)  # One every 0.1s once the burst is used
+    for _ in range(600):
+        limiter.try_acquire()
+
+    async def acquire_twice():
+        await asyncio.gather(limiter.aacquire(), limiter.aacquire())
+
+    start = time.monotonic()
+    asyncio.run(acquire_twice())
+    assert 0.15 < time.monotonic() - start < 1.0
+
+
+def test_shared_limiters_are_registered_by_key():
+    first = RateLimiter.shared('test-shared-key', requests_per_minute=60)
+    assert RateLimiter.shared('test-shared-key') is first
+    assert RateLimiter.shared('test-other-key', requests_per_minute=60) is not first
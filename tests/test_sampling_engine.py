@@ -0,0 +1,279 @@
+import time
+import threading
+
+from evotool.testing import MockLlm
+from evotool.task.base_task import Solution
+from evotool.task.base_task.base_evaluator import EvaluationResult
+from evotool.evo_method.budget import Budget
+from evotool.evo_method.concurrency_autotuner import ConcurrencyAutotuner
+from evotool.evo_method.sampling_engine import SamplingEngine
+
+from conftest import polyfit_response
+
+
+def sample_candidates(n: int):
+    return lambda task: ([Solution(f"candidate {task}.{index}") for index in range(n)], {'total_tokens': 1})
+
+
+def evaluate_length(code: str) -> EvaluationResult:
+    return EvaluationResult(True, len(code), {})
+
+
+def run_in_thread(fn, timeout: float = 20.0) -> None:
+    """Run ``fn`` on a helper thread and fail if it does not return within ``timeout`` (a deadlock)"""
+    errors = []
+
+    def target():
+        try:
+            fn()
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"did not finish within {timeout}s"
+    if errors:
+        raise errors[0]
+
+
+def wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+class TestSamplingEngine:
+    def test_every_candidate_of_a_task_is_delivered_once(self):
+        with SamplingEngine(sample_candidates(3), evaluate_length, num_samplers=2, num_evaluators=2) as engine:
+            task_ids = [engine.submit(task) for task in range(4)]
+            results = [engine.next_result(timeout=5) for _ in range(12)]
+            assert engine.next_result(timeout=0.05) is None
+            assert engine.in_flight == 0
+
+        for task_id in task_ids:
+            task_results = [result for result in results if result.task_id == task_id]
+            assert sorted(result.index for result in task_results) == [0, 1, 2]
+            # Only the last delivered result of a task closes it
+            assert [result.task_done for result in task_results] == [False, False, True]
+            assert all(result.solution.evaluation_res.valid for result in task_results)
+
+    def test_sampling_errors_are_delivered_as_results(self):
+        def fail(task):
+            raise ValueError("no answer")
+
+        with SamplingEngine(fail, evaluate_length, num_samplers=1, num_evaluators=1) as engine:
+            task_id = engine.submit("task")
+            result = engine.next_result(timeout=5)
+
+        assert result.task_id == task_id
+        assert result.solution is None and isinstance(result.error, ValueError)
+        assert result.task_done
+
+    def test_failing_observer_does_not_lose_results(self):
+        def observer(stage, seconds, items, failed):
+            raise ZeroDivisionError("observer bug")
+
+        with SamplingEngine(sample_candidates(2), evaluate_length, num_samplers=1, num_evaluators=1,
+                            observer=observer) as engine:
+            engine.submit("first")
+            engine.submit("second")
+            results = [engine.next_result(timeout=5) for _ in range(4)]
+
+        assert all(result is not None and result.solution.evaluation_res.valid for result in results)
+        assert sum(result.task_done for result in results) == 2
+
+    def test_cancel_pending_drops_queued_tasks(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_sample(task):
+            started.set()
+            release.wait(5)
+            return [Solution(f"candidate {task}")], {}
+
+        with SamplingEngine(blocking_sample, evaluate_length, num_samplers=1, num_evaluators=1,
+                            max_queued_tasks=3) as engine:
+            running = engine.submit("running")
+            started.wait(5)
+            queued = [engine.submit("queued 1"), engine.submit("queued 2")]
+
+            cancelled = engine.cancel_pending()
+            assert cancelled == [(queued[0], "queued 1"), (queued[1], "queued 2")]
+            assert engine.in_flight == 1
+
+            release.set()
+            result = engine.next_result(timeout=5)
+            assert result.task_id == running and result.task_done
+            assert engine.next_result(timeout=0.1) is None
+            assert engine.in_flight == 0
+
+    def test_cancel_pending_delivers_queued_evaluations_as_cancelled(self):
+        evaluating, release = threading.Event(), threading.Event()
+
+        def blocking_evaluate(code):
+            evaluating.set()
+            release.wait(5)
+            return evaluate_length(code)
+
+        with SamplingEngine(sample_candidates(3), blocking_evaluate, num_samplers=1, num_evaluators=1,
+                            max_queued_evaluations=2) as engine:
+            engine.submit("task")
+            evaluating.wait(5)
+            wait_until(lambda: engine._queued_evaluations == 2)
+
+            assert engine.cancel_pending(evaluations=True) == []
+            cancelled = [engine.next_result(timeout=5) for _ in range(2)]
+            assert all(result.cancelled and result.error is not None for result in cancelled)
+
+            release.set()
+            evaluated = engine.next_result(timeout=5)
+            assert not evaluated.cancelled and evaluated.solution.evaluation_res.valid
+            assert evaluated.task_done and engine.in_flight == 0
+
+    def test_close_without_wait_abandons_running_work(self):
+        release = threading.Event()
+
+        def blocking_sample(task):
+            release.wait(5)
+            return [Solution("late")], {}
+
+        engine = SamplingEngine(blocking_sample, evaluate_length, num_samplers=2, num_evaluators=1)
+        engine.submit("running")
+        start = time.monotonic()
+        engine.close(wait=False)
+        assert time.monotonic() - start < 1.0
+        try:
+            engine.submit("after close")
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("submit after close should fail")
+        release.set()
+
+    def test_close_timeout_bounds_waiting_for_stragglers(self):
+        release = threading.Event()
+
+        def blocking_sample(task):
+            release.wait(5)
+            return [Solution("late")], {}
+
+        engine = SamplingEngine(blocking_sample, evaluate_length, num_samplers=1, num_evaluators=1,
+                                close_timeout=0.1)
+        engine.submit("running")
+        start = time.monotonic()
+        engine.close()
+        assert time.monotonic() - start < 2.0
+        release.set()
+
+    def test_more_tasks_than_samplers_with_full_queues(self):
+        def slow_evaluate(code):
+            time.sleep(0.001)
+            return evaluate_length(code)
+
+        results = []
+        with SamplingEngine(sample_candidates(3), slow_evaluate, num_samplers=2, num_evaluators=1,
+                            max_queued_tasks=1, max_queued_evaluations=1) as engine:
+            run_in_thread(lambda: engine.run_batch(range(20), results.append))
+            assert engine.in_flight == 0
+        assert len(results) == 60
+        assert sum(result.task_done for result in results) == 20
+
+    def test_lowered_limits_hold_back_new_work(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def tracked_sample(task):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return [Solution(f"candidate {task}")], {}
+
+        with SamplingEngine(tracked_sample, evaluate_length, num_samplers=4, num_evaluators=2,
+                            sampler_limit=1) as engine:
+            run_in_thread(lambda: engine.run_batch(range(8), lambda result: None))
+        assert peak[0] == 1
+
+
+class TestRunGeneration:
+    def make_tasks(self, method, count: int, n: int = 1) -> list:
+        prompt = method.config.adapter.get_prompt_i1()
+        return [("I1", prompt, n, index, []) for index in range(count)]
+
+    def test_every_candidate_reaches_on_result(self, make_method):
+        method = make_method('eoh', num_samplers=2, num_evaluators=2)
+        results = []
+        with method._make_sampling_engine(method._sample_task) as method._sampling_engine:
+            run_in_thread(lambda: method._run_generation(lambda: self.make_tasks(method, 7, n=2), results.append))
+            assert method._sampling_engine.in_flight == 0
+        assert len(results) == 14
+        assert sum(result.task_done for result in results) == 7
+        assert all(result.solution.evaluation_res.valid for result in results)
+
+    def test_deadline_carries_late_results_into_the_next_generation(self, make_method):
+        calls = []
+
+        def first_request_slow(rng):
+            calls.append(None)
+            return 1.0 if len(calls) == 1 else 0.0
+
+        llm = MockLlm(polyfit_response, latency=first_request_slow)
+        method = make_method('eoh', llm=llm, num_samplers=3, num_evaluators=3, generation_timeout=0.3)
+        first, second = [], []
+        with method._make_sampling_engine(method._sample_task) as method._sampling_engine:
+            method._run_generation(lambda: self.make_tasks(method, 3), first.append)
+            stats = method.run_state_dict.straggler_stats
+            assert len(first) == 2
+            assert stats['deadlines'] == 1 and stats['abandoned'] == 1
+
+            time.sleep(1.0)
+            method._run_generation(lambda: self.make_tasks(method, 2), second.append)
+        assert len(second) == 3
+        assert stats['carried'] == 1
+        assert not any(result.discarded for result in second)
+
+    def test_deadline_can_drop_late_results(self, make_method):
+        calls = []
+
+        def first_request_slow(rng):
+            calls.append(None)
+            return 1.0 if len(calls) == 1 else 0.0
+
+        llm = MockLlm(polyfit_response, latency=first_request_slow)
+        method = make_method('eoh', llm=llm, num_samplers=3, num_evaluators=3, generation_timeout=0.3,
+                             late_results='drop')
+        second = []
+        with method._make_sampling_engine(method._sample_task) as method._sampling_engine:
+            method._run_generation(lambda: self.make_tasks(method, 3), lambda result: None)
+            time.sleep(1.0)
+            method._run_generation(lambda: self.make_tasks(method, 2), second.append)
+        assert [result.discarded for result in second].count(True) == 1
+        assert method.run_state_dict.straggler_stats['dropped'] == 1
+
+    def test_exhausted_budget_cancels_queued_tasks(self, make_method):
+        llm = MockLlm(polyfit_response, latency=0.1)
+        method = make_method('eoh', llm=llm, num_samplers=1, num_evaluators=1,
+                             budget=Budget(max_total_tokens=1))
+        results = []
+
+        def on_result(result):
+            method._collect_sample_result(result, "I1")
+            results.append(result)
+
+        with method._make_sampling_engine(method._sample_task) as method._sampling_engine:
+            run_in_thread(lambda: method._run_generation(lambda: self.make_tasks(method, 4), on_result))
+            assert method._sampling_engine.in_flight == 0
+        assert 1 <= len(results) < 4
+
+    def test_engine_follows_config_and_autotuner(self, make_method):
+        autotuner = ConcurrencyAutotuner(max_samplers=6, max_evaluators=4, verbose=False)
+        method = make_method('eoh', num_samplers=2, num_evaluators=1, generation_timeout=5.0,
+                             autotuner=autotuner)
+        with method._make_sampling_engine(method._sample_task) as engine:
+            assert (engine.num_samplers, engine.num_evaluators) == (6, 4)
+            assert (engine.sampler_limit, engine.evaluator_limit) == (2, 1)
+            assert engine.close_timeout == 5.0
+            assert engine.observer == autotuner.observe
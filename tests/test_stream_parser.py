@@ -0,0 +1,64 @@
+import pytest
+
+from evotool.task.base_task import StreamParser, CodeBlockStreamParser, SchemaStreamParser
+
+CODE_ANSWER = "Here is the idea.\n```python\ndef f(x):\n    return x\n```\nAnd some explanation."
+SCHEMA_ANSWER = (
+    "name: identity\n"
+    "code:\n```python\ndef f(x):\n    return x\n```\n"
+    "thought: return the input unchanged\n\n"
+    "Anything after the blank line is not needed."
+)
+
+
+def first_complete_prefix(parser: StreamParser, text: str, chunk_size: int) -> int | None:
+    """Feed ``text`` in chunks and return the length received when the parser reported completion"""
+    for end in range(chunk_size, len(text) + chunk_size, chunk_size):
+        if parser.feed(text[end - chunk_size:end]):
+            return min(end, len(text))
+    return None
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1000])
+def test_code_block_completes_when_the_fence_closes(chunk_size):
+    received = first_complete_prefix(CodeBlockStreamParser(), CODE_ANSWER, chunk_size)
+    closed_at = CODE_ANSWER.index("```\n", 20) + 3
+    assert closed_at <= received < closed_at + chunk_size
+
+
+def test_code_block_is_complete_at_the_first_closed_block():
+    parser = CodeBlockStreamParser()
+    assert not parser.is_complete("```python\ndef f(x):\n    return x\n")
+    assert not parser.is_complete("Signature: ``` inline")
+    assert parser.is_complete("Signature:\n```python\ndef f(x): ...\n```\nFull code follows")
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1000])
+def test_schema_completes_at_the_blank_line_after_the_thought(chunk_size):
+    received = first_complete_prefix(SchemaStreamParser(), SCHEMA_ANSWER, chunk_size)
+    blank_line = SCHEMA_ANSWER.index("\n\n") + 2
+    assert blank_line <= received < blank_line + chunk_size
+
+
+def test_schema_needs_name_and_code_labels():
+    parser = SchemaStreamParser()
+    assert not parser.is_complete("```python\nx = 1\n```\nthought: no labels\n\n")
+    assert not parser.is_complete("code:\n```python\nx = 1\n```\nthought: no name\n\n")
+    assert parser.is_complete("```json\n{\"name\": \"a\", \"code\": \"x = 1\"}\n```")
+
+
+def test_reset_forgets_the_previous_attempt():
+    parser = CodeBlockStreamParser()
+    parser.feed("```python\nx = 1\n")
+    parser.reset()
+    assert not parser.feed("\n```")
+    assert parser.feed("python\nx = 1\n```")
+
+
+def test_long_streams_are_scanned_incrementally():
+    parser = SchemaStreamParser()
+    parser.feed("name: long\ncode:\n```python\n")
+    # Each delta only looks at the new text; rescanning all of it made this take about a minute
+    assert not any(parser.feed("y = 1\n") for _ in range(30000))
+    assert not parser.feed("```\nthought: long")
+    assert parser.feed(" answer\n\n")
@@ -0,0 +1,76 @@
+import socketserver
+import threading
+
+import pytest
+
+from evotool.testing import MockLlm, MockLlmServer
+from evotool.tools import HttpsApi
+from evotool.tools.async_llm import AsyncHttpsApi
+from evotool.tools.transport import make_transport, HttpsTransport, HttpTransport, UnixSocketTransport
+
+
+@pytest.mark.parametrize('host, transport_type, address, host_header', [
+    ('api.example.com', HttpsTransport, ('api.example.com', 443), 'api.example.com'),
+    ('api.example.com:8443', HttpsTransport, ('api.example.com', 8443), 'api.example.com:8443'),
+    ('https://api.example.com', HttpsTransport, ('api.example.com', 443), 'api.example.com'),
+    ('http://localhost:8000', HttpTransport, ('localhost', 8000), 'localhost:8000'),
+    ('http://localhost', HttpTransport, ('localhost', 80), 'localhost'),
+])
+def test_tcp_hosts(host, transport_type, address, host_header):
+    transport = make_transport(host)
+    assert type(transport) is transport_type
+    assert (transport.host, transport.port) == address
+    assert transport.host_header == host_header
+
+
+@pytest.mark.parametrize('host', ['unix:///run/vllm.sock', 'http+unix://%2Frun%2Fvllm.sock'])
+def test_unix_socket_hosts(host):
+    transport = make_transport(host)
+    assert isinstance(transport, UnixSocketTransport)
+    assert transport.path == '/run/vllm.sock'
+
+
+def test_unsupported_scheme():
+    with pytest.raises(ValueError):
+        make_transport('ftp://example.com')
+
+
+def test_plain_http_clients():
+    mock = MockLlm(["answer"])
+    with MockLlmServer(mock) as server:
+        assert server.make_client().get_response("prompt")[0] == "answer"
+        client = AsyncHttpsApi(server.host, 'mock-key', mock._model, '/v1/chat/completions')
+        try:
+            assert client.get_response("prompt")[0] == "answer"
+        finally:
+            client.close()
+
+
+@pytest.fixture
+def unix_socket_server(tmp_path):
+    """A MockLlmServer's request handler served over a Unix domain socket"""
+    mock = MockLlm(["answer"])
+    path = str(tmp_path / "llm.sock")
+    tcp_server = MockLlmServer(mock)
+    handler = tcp_server._make_handler()
+    tcp_server.close()
+    server = socketserver.ThreadingUnixStreamServer(path, handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'unix://{path}', mock
+    server.shutdown()
+    server.server_close()
+
+
+def test_unix_socket_clients(unix_socket_server):
+    host, mock = unix_socket_server
+    client = HttpsApi(host, 'mock-key', mock._model, '/v1/chat/completions')
+    assert [client.get_response("prompt")[0] for _ in range(2)] == ["answer", "answer"]
+    assert client.get_connection_stats()['connections_opened'] == 1
+
+    async_client = AsyncHttpsApi(host, 'mock-key', mock._model, '/v1/chat/completions')
+    try:
+        assert async_client.get_response("prompt")[0] == "answer"
+    finally:
+        async_client.close()
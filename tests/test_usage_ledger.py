@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from evotool.evo_method.usage_ledger import UsageLedger
+
+PRICES = {'big': {'prompt': 10.0, 'completion': 30.0}}
+
+
+def usage(prompt_tokens, completion_tokens, **extra):
+    return dict(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens, **extra)
+
+
+def test_totals_and_cost_by_stage_operator_and_model():
+    ledger = UsageLedger(prices=PRICES)
+    ledger.record(usage(1000, 2000, model='big'), operator='e1')
+    ledger.record(usage(100, 200), operator='m1', model='small')
+    ledger.record(usage(10, 20), stage='init', model='small')
+
+    totals = ledger.totals()
+    assert totals['calls'] == 3 and totals['total_tokens'] == 3330
+    assert totals['cost'] == pytest.approx(0.07)
+    assert ledger.totals(stage='sample', model='small')['total_tokens'] == 300
+    assert set(ledger.breakdown('operator')) == {'e1', 'm1', 'None'}
+    assert ledger.breakdown()['small']['cost'] == 0.0
+
+
+def test_cascade_usage_is_split_over_its_tiers():
+    ledger = UsageLedger(prices=PRICES)
+    ledger.record({'total_tokens': 3300, 'tiers': [
+        {'tier': 0, 'model': 'small', 'usage': usage(100, 200)},
+        {'tier': 1, 'model': 'big', 'usage': usage(1000, 2000)},
+    ]})
+    assert ledger.totals(model='small')['total_tokens'] == 300
+    assert ledger.totals(model='big')['cost'] == pytest.approx(0.07)
+    assert ledger.totals()['calls'] == 2
+
+
+def test_replayed_usage_stays_out_of_the_spend():
+    ledger = UsageLedger(prices=PRICES)
+    ledger.record(usage(1000, 2000, model='big', cached=True))
+    ledger.record(usage(10, 20, model='big', cached_usage=usage(100, 200)))
+    totals = ledger.totals()
+    assert totals['calls'] == 1 and totals['total_tokens'] == 30
+    assert totals['cached_calls'] == 1 and totals['cached_tokens'] == 3300
+
+
+def test_json_round_trip_keeps_totals_and_counters():
+    ledger = UsageLedger(prices=PRICES)
+    ledger.record(usage(1000, 2000, model='big'), operator='e1')
+    ledger.record_solution(valid=True)
+    ledger.record_solution(valid=False)
+    ledger.record_evaluation(1.5)
+
+    data = json.loads(json.dumps(ledger.to_json()))
+    restored = UsageLedger.from_json(data)
+    restored.configure(prices=PRICES)
+    assert restored.totals() == ledger.totals()
+    assert restored.evaluator_seconds == 1.5
+    assert restored.elapsed >= data['elapsed']
+    summary = restored.summary()
+    assert summary['solutions'] == 2 and summary['valid_solutions'] == 1
+    assert summary['cost_per_valid_solution'] == pytest.approx(0.07)
+
+
+def test_run_states_with_usage_history_are_migrated():
+    ledger = UsageLedger.from_run_state_json({'usage_history': {'sample': [usage(1, 2), usage(3, 4)]}})
+    assert ledger.totals(stage='sample')['total_tokens'] == 10
+
+
+def test_side_log_gets_every_call(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    ledger = UsageLedger(log_path=str(path))
+    ledger.record(usage(1, 2), operator='e1', model='small')
+    ledger.record(usage(3, 4), operator='m1', model='small')
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record['operator'] for record in records] == ['e1', 'm1']
+    assert records[1]['usage']['total_tokens'] == 7